@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class CatsittingConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'catsitting'
+
+    def ready(self):
+        if settings.QUERY_INSTRUMENTATION_SERIALIZERS:
+            from catsitting.instrumentation import install_serializer_timing
+            install_serializer_timing()
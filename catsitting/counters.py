@@ -0,0 +1,37 @@
+"""
+Helpers shared by the denormalized counter columns of posts, comments
+and profiles. Each app keeps its own increments and recomputes in its
+``counters`` module.
+"""
+from django.db.models import IntegerField, Subquery
+
+
+class CounterFieldsMixin:
+    """
+    For models whose ``COUNTER_FIELDS`` are only moved by atomic
+    UPDATEs. Saving an existing row leaves them out, so a plain
+    ``save()`` never writes stale in-memory counters back over
+    concurrent updates.
+    """
+    COUNTER_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
+class SubqueryCount(Subquery):
+    """
+    COUNT(*) of a correlated subquery, 0 when it matches no rows.
+    """
+    template = "(SELECT COUNT(*) FROM (%(subquery)s) _count)"
+    output_field = IntegerField()
+
+
+def count_rows(queryset):
+    return SubqueryCount(queryset.order_by().values("pk"))
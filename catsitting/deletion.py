@@ -0,0 +1,243 @@
+"""
+Set-based deletion of posts and whole accounts.
+
+Django's cascade loads every dependent row and sends ``post_delete`` for
+each one, so deleting a heavy account runs the activity, KPI, cache and
+notification receivers once per post, comment, like and notification.
+``Deletion`` instead collects the ids of everything that goes up front,
+empties each table with ``DELETE ... WHERE ... IN`` statements of at most
+``CHUNK_SIZE`` ids, and then repairs what the receivers would have
+maintained once per affected set: activity entries, post, comment and
+follower counters, unread notification counts, the search index, KPI
+snapshots and the anonymous response cache.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from comments.counters import recompute_comment_counters
+from comments.models import Comment
+from likes.models import CommentLike, Like
+from notifications.counters import recompute_unread_counts
+from notifications.models import Notification
+from posts.cache import invalidate_anonymous_cache
+from posts.counters import recompute_post_counters
+from posts.models import Post, SittingRequest, SittingResponseMessage
+from posts.search import get_search_backend
+from profiles.counters import Follow, recompute_followers_counts
+from profiles.kpis import invalidate_kpis
+from profiles.models import Activity, FollowRequest, Profile
+
+CHUNK_SIZE = 1000
+
+NotificationActor = Notification.actors.through
+
+
+def chunked(ids):
+    ids = sorted(ids)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def rows_where(model, field, ids, *columns):
+    """
+    The ``columns`` of every row whose ``field`` is in ``ids``.
+    """
+    rows = set()
+    for chunk in chunked(ids):
+        rows.update(
+            model.objects.filter(**{f"{field}__in": chunk}).values_list(*columns)
+        )
+    return rows
+
+
+def ids_where(model, field, ids, column="pk"):
+    return {row[0] for row in rows_where(model, field, ids, column)}
+
+
+def delete_where(model, field, ids, **filters):
+    """
+    Delete the rows whose ``field`` is in ``ids`` without loading them
+    or sending signals. Returns the number of deleted rows.
+    """
+    deleted = 0
+    for chunk in chunked(ids):
+        queryset = model.objects.filter(**{f"{field}__in": chunk}, **filters)
+        deleted += queryset._raw_delete(queryset.db)
+    return deleted
+
+
+def comment_tree(comment_ids):
+    """
+    The ids of the comments and of all their replies, one query per
+    level of nesting.
+    """
+    tree = set(comment_ids)
+    level = tree
+    while level:
+        level = ids_where(Comment, "parent_id", level) - tree
+        tree |= level
+    return tree
+
+
+class Deletion:
+    """
+    Collects accounts and posts to delete, then deletes them and
+    everything depending on them in one transaction.
+    """
+
+    def __init__(self):
+        self.user_ids = set()
+        self.profile_ids = set()
+        self.post_ids = set()
+        self.deleted = {}
+
+    def add_posts(self, post_ids):
+        self.post_ids.update(post_ids)
+
+    def add_account(self, user):
+        self.user_ids.add(user.pk)
+        self.profile_ids.update(Profile.objects.filter(user=user).values_list("pk", flat=True))
+        self.post_ids.update(Post.objects.filter(author=user).values_list("pk", flat=True))
+
+    def collect(self):
+        users, posts = self.user_ids, self.post_ids
+
+        self.comment_ids = comment_tree(
+            ids_where(Comment, "post_id", posts) | ids_where(Comment, "owner_id", users)
+        )
+        comments = rows_where(Comment, "pk", self.comment_ids, "post_id", "owner_id")
+
+        likes = (
+            rows_where(Like, "post_id", posts, "pk", "post_id", "owner_id")
+            | rows_where(Like, "owner_id", users, "pk", "post_id", "owner_id")
+        )
+        self.like_ids = {like_id for like_id, _, _ in likes}
+
+        liked_comments = rows_where(CommentLike, "owner_id", users, "pk", "comment_id")
+        self.comment_like_ids = (
+            ids_where(CommentLike, "comment_id", self.comment_ids)
+            | {row_id for row_id, _ in liked_comments}
+        )
+
+        sitting_requests = (
+            rows_where(SittingRequest, "post_id", posts, "pk", "sender_id", "receiver_id")
+            | rows_where(SittingRequest, "sender_id", users, "pk", "sender_id", "receiver_id")
+            | rows_where(SittingRequest, "receiver_id", users, "pk", "sender_id", "receiver_id")
+        )
+        self.sitting_request_ids = {row[0] for row in sitting_requests}
+        self.message_ids = (
+            ids_where(SittingResponseMessage, "sitting_request_id", self.sitting_request_ids)
+            | ids_where(SittingResponseMessage, "sender_id", users)
+        )
+
+        notifications = set()
+        for field, ids in [
+            ("user_id", users),
+            ("post_id", posts),
+            ("comment_id", self.comment_ids),
+            ("sitting_request_id", self.sitting_request_ids),
+        ]:
+            notifications |= rows_where(Notification, field, ids, "pk", "user_id", "is_read")
+        self.notification_ids = {row[0] for row in notifications}
+
+        follows = (
+            rows_where(Follow, "from_profile_id", self.profile_ids, "pk", "from_profile_id")
+            | rows_where(Follow, "to_profile_id", self.profile_ids, "pk", "from_profile_id")
+        )
+        self.follow_ids = {row_id for row_id, _ in follows}
+        self.follow_request_ids = (
+            ids_where(FollowRequest, "sender_id", self.profile_ids)
+            | ids_where(FollowRequest, "receiver_id", self.profile_ids)
+        )
+
+        # Rows that survive but count or cache what is being deleted.
+        self.counter_post_ids = (
+            {post_id for post_id, _ in comments} | {post_id for _, post_id, _ in likes}
+        ) - posts
+        self.counter_comment_ids = {comment_id for _, comment_id in liked_comments} - self.comment_ids
+        self.follower_profile_ids = {profile_id for _, profile_id in follows} - self.profile_ids
+        self.unread_user_ids = {
+            user_id for _, user_id, is_read in notifications if not is_read
+        } - users
+        self.kpi_user_ids = (
+            users
+            | {owner_id for _, owner_id in comments}
+            | {owner_id for _, _, owner_id in likes}
+            | {user_id for row in sitting_requests for user_id in row[1:]}
+            | ids_where(Post, "pk", posts | self.counter_post_ids, "author_id")
+            # Authors of the posts under the comments that lose likes.
+            | ids_where(Post, "comments", self.counter_comment_ids, "author_id")
+            | ids_where(Profile, "pk", self.follower_profile_ids, "user_id")
+        )
+
+    def activity_sources(self):
+        return [
+            (["post"], self.post_ids),
+            (["comment"], self.comment_ids),
+            (["like"], self.like_ids),
+            (["like_comment"], self.comment_like_ids),
+            (["sitting"], self.sitting_request_ids),
+            (["follow", "follow_accepted"], self.follow_request_ids),
+        ]
+
+    def delete_rows(self):
+        self.deleted = {
+            NotificationActor: delete_where(NotificationActor, "notification_id", self.notification_ids),
+            Notification: delete_where(Notification, "pk", self.notification_ids),
+            Activity: delete_where(Activity, "user_id", self.user_ids) + sum(
+                delete_where(Activity, "source_id", ids, type__in=types)
+                for types, ids in self.activity_sources()
+            ),
+            SittingResponseMessage: delete_where(SittingResponseMessage, "pk", self.message_ids),
+            SittingRequest: delete_where(SittingRequest, "pk", self.sitting_request_ids),
+            CommentLike: delete_where(CommentLike, "pk", self.comment_like_ids),
+            Like: delete_where(Like, "pk", self.like_ids),
+            Comment: delete_where(Comment, "pk", self.comment_ids),
+            Post: delete_where(Post, "pk", self.post_ids),
+            Follow: delete_where(Follow, "pk", self.follow_ids),
+            FollowRequest: delete_where(FollowRequest, "pk", self.follow_request_ids),
+        }
+        # Notifications sent by a deleted account stay, without a sender.
+        for chunk in chunked(self.profile_ids):
+            Notification.objects.filter(sender_profile_id__in=chunk).update(sender_profile=None)
+        if self.user_ids:
+            # Profiles, tokens, email addresses and the like. Everything
+            # with receivers is already gone, so this cascade is cheap.
+            _, deleted = get_user_model().objects.filter(pk__in=self.user_ids).delete()
+            self.deleted[get_user_model()] = deleted.get(get_user_model()._meta.label, 0)
+
+    def repair(self):
+        for chunk in chunked(self.counter_post_ids):
+            recompute_post_counters(Post.objects.filter(pk__in=chunk))
+        for chunk in chunked(self.counter_comment_ids):
+            recompute_comment_counters(Comment.objects.filter(pk__in=chunk))
+        for chunk in chunked(self.follower_profile_ids):
+            recompute_followers_counts(Profile.objects.filter(pk__in=chunk))
+        for chunk in chunked(self.unread_user_ids):
+            recompute_unread_counts(Profile.objects.filter(user_id__in=chunk))
+        get_search_backend().remove_posts(self.post_ids)
+        invalidate_kpis(*self.kpi_user_ids)
+        invalidate_anonymous_cache()
+
+    def run(self):
+        """
+        Delete everything collected. Returns the number of deleted rows
+        per model.
+        """
+        with transaction.atomic():
+            self.collect()
+            self.delete_rows()
+            self.repair()
+        return {model._meta.label: count for model, count in self.deleted.items()}
+
+
+def delete_posts(post_ids):
+    deletion = Deletion()
+    deletion.add_posts(post_ids)
+    return deletion.run()
+
+
+def delete_account(user):
+    deletion = Deletion()
+    deletion.add_account(user)
+    return deletion.run()
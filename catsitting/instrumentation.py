@@ -0,0 +1,230 @@
+"""
+Opt-in per-request SQL and serializer instrumentation.
+
+Enable it with ``QUERY_INSTRUMENTATION = True`` (or the environment
+variable of the same name). Every request then gets a ``Server-Timing``
+header and a JSON log line on the ``catsitting.instrumentation`` logger
+with the query count, DB time, repeated query fingerprints and the time
+spent serializing, keyed by the resolved URL name.
+
+Serializer time is measured by wrapping ``BaseSerializer.data``, which
+changes DRF for the whole process. That only happens when
+``QUERY_INSTRUMENTATION_SERIALIZERS`` is set at startup, from
+``CatsittingConfig.ready()``; without it the report shows no serializer
+time.
+
+``QUERY_BUDGETS`` maps URL names to the maximum number of queries the
+endpoint may run. Exceeding a budget logs a warning, or raises
+``QueryBudgetExceeded`` when ``QUERY_BUDGET_STRICT`` is set, which makes
+the offending request fail in tests.
+"""
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+_metrics = ContextVar("query_instrumentation_metrics", default=None)
+
+IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def fingerprint(sql):
+    """
+    Identify queries that only differ by their parameters, so an N+1
+    loop shows up as one fingerprint repeated N times.
+    """
+    normalized = WHITESPACE.sub(" ", IN_LIST.sub("IN (...)", sql)).strip()
+    return hashlib.md5(normalized.encode("utf-8")).hexdigest()[:12], normalized
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = []
+        self.serializer_time = 0.0
+        self.serializer_queries = 0
+        self._serializer_depth = 0
+        self._serializer_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+            if self._serializer_depth:
+                self.serializer_queries += 1
+
+    def enter_serializer(self):
+        if not self._serializer_depth:
+            self._serializer_started = time.perf_counter()
+        self._serializer_depth += 1
+
+    def exit_serializer(self):
+        self._serializer_depth -= 1
+        if not self._serializer_depth:
+            self.serializer_time += time.perf_counter() - self._serializer_started
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def db_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self, limit=5):
+        counts = Counter()
+        samples = {}
+        for sql, _ in self.queries:
+            key, normalized = fingerprint(sql)
+            counts[key] += 1
+            samples.setdefault(key, normalized)
+        return [
+            {"fingerprint": key, "count": count, "sql": samples[key][:200]}
+            for key, count in counts.most_common(limit)
+            if count > 1
+        ]
+
+
+def _instrumented_data(original):
+    def data(self):
+        metrics = _metrics.get()
+        if metrics is None:
+            return original.fget(self)
+        metrics.enter_serializer()
+        try:
+            return original.fget(self)
+        finally:
+            metrics.exit_serializer()
+    data._instrumented = True
+    return property(data)
+
+
+def install_serializer_timing():
+    """
+    Time ``serializer.data``. Every DRF serializer, list serializers
+    included, renders through ``BaseSerializer.data``.
+    """
+    if not getattr(BaseSerializer.data.fget, "_instrumented", False):
+        data = _instrumented_data(BaseSerializer.data)
+        data.fget._original = BaseSerializer.data
+        BaseSerializer.data = data
+
+
+def uninstall_serializer_timing():
+    original = getattr(BaseSerializer.data.fget, "_original", None)
+    if original is not None:
+        BaseSerializer.data = original
+
+
+def wrap_connections(stack, metrics):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(metrics))
+
+
+class QueryInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, "QUERY_INSTRUMENTATION", False):
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                wrap_connections(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            _metrics.reset(token)
+        return self.report(request, response, metrics, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not getattr(settings, "QUERY_INSTRUMENTATION", False):
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            # Connections belong to a thread, and the ORM calls of an
+            # ASGI request all run on the one thread that thread
+            # sensitive sync_to_async gives the request, so the wrappers
+            # go on that thread's connections.
+            stack = ExitStack()
+            await sync_to_async(wrap_connections)(stack, metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _metrics.reset(token)
+        return self.report(request, response, metrics, time.perf_counter() - started)
+
+    def report(self, request, response, metrics, total_time):
+        match = getattr(request, "resolver_match", None)
+        endpoint = match.view_name if match else None
+        report = {
+            "endpoint": endpoint,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": metrics.query_count,
+            "db_ms": round(metrics.db_time * 1000, 2),
+            "serializer_ms": round(metrics.serializer_time * 1000, 2),
+            "serializer_queries": metrics.serializer_queries,
+            "total_ms": round(total_time * 1000, 2),
+            "duplicates": metrics.duplicates(),
+        }
+        response["Server-Timing"] = self.server_timing(report)
+        logger.info(json.dumps(report), extra={"instrumentation": report})
+        self.check_budget(report)
+        return response
+
+    @staticmethod
+    def server_timing(report):
+        duplicated = sum(item["count"] for item in report["duplicates"])
+        return ", ".join([
+            f'db;desc="{report["queries"]} queries";dur={report["db_ms"]}',
+            f'dup;desc="{duplicated} repeated queries"',
+            f'serializer;desc="{report["serializer_queries"]} queries";dur={report["serializer_ms"]}',
+            f'total;dur={report["total_ms"]}',
+        ])
+
+    @staticmethod
+    def check_budget(report):
+        budget = getattr(settings, "QUERY_BUDGETS", {}).get(report["endpoint"])
+        if budget is None or report["queries"] <= budget:
+            return
+        message = (
+            f'{report["endpoint"]} ran {report["queries"]} queries, '
+            f"over its budget of {budget}"
+        )
+        if getattr(settings, "QUERY_BUDGET_STRICT", False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message, extra={"instrumentation": report})
@@ -72,11 +72,13 @@ INSTALLED_APPS = [
     'corsheaders',
     'drf_yasg',
 
+    'catsitting',
     'profiles',
     'posts',
     'notifications',
     'comments',
     'likes',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -90,6 +92,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'catsitting.instrumentation.QueryInstrumentationMiddleware',
+    'notifications.service.NotificationMiddleware',
 ]
 
 REST_FRAMEWORK = {
@@ -185,6 +189,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'catsitting.wsgi.application'
+ASGI_APPLICATION = 'catsitting.asgi.application'
 SITE_ID = 1
 ROOT_URLCONF = 'catsitting.urls'
 
@@ -223,6 +228,56 @@ if 'DATABASE_URL' not in os.environ:
         'NAME': BASE_DIR / "db.sqlite3",
     }
 
+# Cache
+# Redis (or any Redis-compatible server) when REDIS_URL is set,
+# per-process local memory otherwise (local development and tests).
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds an anonymous feed/detail response is cached, 0 disables it.
+ANONYMOUS_RESPONSE_CACHE_TIMEOUT = int(
+    os.getenv('ANONYMOUS_RESPONSE_CACHE_TIMEOUT', 60)
+)
+
+# Seconds a user's dashboard KPI snapshot is cached, 0 disables it.
+PROFILE_KPI_CACHE_TIMEOUT = int(os.getenv('PROFILE_KPI_CACHE_TIMEOUT', 300))
+
+# Per-request query instrumentation, see catsitting.instrumentation.
+QUERY_INSTRUMENTATION = os.getenv('QUERY_INSTRUMENTATION', 'False') == 'True'
+QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'False') == 'True'
+# Time serializers too. This wraps BaseSerializer.data for the whole
+# process at startup, so it is only read once, when the apps load.
+QUERY_INSTRUMENTATION_SERIALIZERS = os.getenv(
+    'QUERY_INSTRUMENTATION_SERIALIZERS', str(QUERY_INSTRUMENTATION)
+) == 'True'
+# Maximum number of queries per URL name.
+QUERY_BUDGETS = {
+    'post-feed': 3,
+    'post-detail': 3,
+    'comments-list': 6,
+    # The page, plus one query per activity type on it.
+    'activity-feed': 9,
+    'profile-kpis': 1,
+    'followers-list': 3,
+    'following-list': 3,
+    'top-followed-profiles': 2,
+    'notifications-feed': 1,
+    'dashboard-overview': 2,
+    'notifications-unread-count': 1,
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -279,3 +334,76 @@ STATICFILES_STORAGE = 'cloudinary_storage.storage.StaticCloudinaryStorage'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# How the activity feed is built: "timeline" reads the precomputed
+# activity table, "merge" merges the source tables per request.
+ACTIVITY_FEED_MODE = os.getenv('ACTIVITY_FEED_MODE', 'timeline')
+
+# How buffered notifications are written at the end of a request:
+# "request" inserts them before the response is returned, "thread"
+# hands them to a background worker thread, "job" queues them for the
+# job worker, which needs the Redis broker to reach the SSE streams
+# (notifications.E001).
+# See notifications.service.
+NOTIFICATIONS_DELIVERY = os.getenv('NOTIFICATIONS_DELIVERY', 'request')
+
+# Seconds during which new likes and comments on the same post are merged
+# into one unread notification, 0 disables coalescing.
+NOTIFICATIONS_COALESCE_WINDOW = int(
+    os.getenv('NOTIFICATIONS_COALESCE_WINDOW', 3600)
+)
+
+# Pub/sub feeding the notifications SSE stream, see notifications.broker.
+# Redis when REDIS_URL is set so every web process sees every
+# notification, in-process otherwise. Redis is required in production:
+# with NOTIFICATIONS_DELIVERY = "job" or more than one web process
+# (WEB_CONCURRENCY, several dynos) the in-process broker drops events,
+# and the checks refuse or warn about it (notifications.E001, W001).
+NOTIFICATIONS_REDIS_URL = os.environ.get('REDIS_URL')
+NOTIFICATIONS_BROKER = os.getenv(
+    'NOTIFICATIONS_BROKER',
+    'notifications.broker.RedisBroker' if NOTIFICATIONS_REDIS_URL
+    else 'notifications.broker.LocalBroker',
+)
+# Seconds between keep-alive comments on an idle stream.
+NOTIFICATIONS_STREAM_HEARTBEAT = int(
+    os.getenv('NOTIFICATIONS_STREAM_HEARTBEAT', 20)
+)
+# Seconds a ticket from /api/notifications/stream/ticket/ can open the
+# stream for. EventSource cannot send headers, and JWTs do not belong in
+# URLs.
+NOTIFICATIONS_STREAM_TICKET_AGE = int(
+    os.getenv('NOTIFICATIONS_STREAM_TICKET_AGE', 30)
+)
+
+# Defaults of the prune_notifications command: read notifications older
+# than this many days are pruned, and each user keeps at most this many
+# notifications (0 keeps all).
+NOTIFICATIONS_RETENTION_DAYS = int(os.getenv('NOTIFICATIONS_RETENTION_DAYS', 90))
+NOTIFICATIONS_MAX_PER_USER = int(os.getenv('NOTIFICATIONS_MAX_PER_USER', 1000))
+
+# How queued account deletions run: "job" on the job worker, "thread"
+# on a background thread of the web process, "inline" when the request
+# commits. Posts are deleted this many per transaction. See
+# profiles.account_deletion.
+ACCOUNT_DELETION_RUNNER = os.getenv('ACCOUNT_DELETION_RUNNER', 'job')
+ACCOUNT_DELETION_BATCH_SIZE = int(os.getenv('ACCOUNT_DELETION_BATCH_SIZE', 100))
+
+# Largest profile picture accepted, in bytes. Uploads wait in the
+# database for the job worker, see profiles.tasks.
+PROFILE_PICTURE_MAX_SIZE = int(os.getenv('PROFILE_PICTURE_MAX_SIZE', 5 * 1024 * 1024))
+
+# Background jobs, see jobs.service. "worker" leaves them to the
+# `worker` process of the Procfile (manage.py run_worker), which has to
+# be scaled up on Heroku. "inline" runs them in the enqueuing process
+# once its transaction commits, inside the request; only opt into it
+# for development. `manage.py check --database default` and `migrate`
+# warn about jobs nobody runs (jobs.W001).
+JOBS_MODE = os.getenv('JOBS_MODE', 'worker')
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', 5))
+# Seconds before the first retry of a failed job, doubled on each retry.
+JOBS_RETRY_BACKOFF = int(os.getenv('JOBS_RETRY_BACKOFF', 30))
+# Seconds after which a running job is considered abandoned by its worker.
+JOBS_LOCK_TIMEOUT = int(os.getenv('JOBS_LOCK_TIMEOUT', 600))
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', 1))
+JOBS_KEEP_DONE_DAYS = int(os.getenv('JOBS_KEEP_DONE_DAYS', 7))
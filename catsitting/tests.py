@@ -0,0 +1,240 @@
+import json
+from io import StringIO
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from comments.counters import recompute_comment_counters
+from comments.models import Comment
+from likes.models import Like
+from notifications.counters import get_unread_count, recompute_unread_counts
+from notifications.models import Notification
+from posts.counters import recompute_post_counters
+from posts.models import Post, SittingRequest
+from posts.search import get_search_backend
+from profiles.counters import recompute_followers_counts
+from profiles.models import Activity, Profile
+from catsitting.deletion import delete_account
+from catsitting.instrumentation import (
+    QueryBudgetExceeded, fingerprint, install_serializer_timing, uninstall_serializer_timing,
+)
+
+User = get_user_model()
+
+
+# Test Query Instrumentation
+
+@override_settings(QUERY_INSTRUMENTATION=True, QUERY_BUDGET_STRICT=True)
+class QueryInstrumentationTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        install_serializer_timing()
+        cls.addClassCleanup(uninstall_serializer_timing)
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username="viewer", email="viewer@example.com", password="password123")
+        self.user = User.objects.get(username="viewer")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        authors = [
+            User.objects.create_user(username=f"author{i}", email=f"author{i}@example.com", password="password123")
+            for i in range(5)
+        ]
+        for author in authors:
+            post = Post.objects.create(author=author, title="Cats", category="general", description="Cats")
+            Comment.objects.create(owner=author, post=post, content="Mine")
+            Like.objects.create(owner=self.user, post=post)
+            self.user.profile.followers.add(author.profile)
+        recompute_post_counters()
+        self.post = post
+
+    def test_server_timing_header_and_log(self):
+        with self.assertLogs("catsitting.instrumentation", level="INFO") as logs:
+            response = self.client.get("/api/posts/feed/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("db;desc=", response["Server-Timing"])
+        self.assertIn("serializer;desc=", response["Server-Timing"])
+
+        report = json.loads(logs.records[0].getMessage())
+        self.assertEqual(report["endpoint"], "post-feed")
+        self.assertGreater(report["queries"], 0)
+        self.assertGreater(report["serializer_ms"], 0)
+
+    def test_budgeted_endpoints_stay_within_budget(self):
+        urls = [
+            "/api/posts/feed/",
+            f"/api/posts/{self.post.id}/",
+            f"/api/comments/?post={self.post.id}",
+            "/api/profiles/activity/",
+            "/api/profiles/kpis/",
+            f"/api/profiles/{self.user.profile.id}/followers/",
+            f"/api/profiles/{self.user.profile.id}/following/",
+            "/api/profiles/top-followed/",
+            "/api/notifications/",
+            "/api/notifications/unread-count/",
+            "/api/notifications/overview/",
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    async def test_asgi_requests_are_measured(self):
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        with self.assertLogs("catsitting.instrumentation", level="INFO") as logs:
+            response = await self.async_client.get("/api/posts/feed/", headers={"authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("db;desc=", response["Server-Timing"])
+
+        report = json.loads(logs.records[0].getMessage())
+        self.assertEqual(report["endpoint"], "post-feed")
+        self.assertGreater(report["queries"], 0)
+
+    @override_settings(QUERY_BUDGETS={"post-feed": 1})
+    def test_strict_budget_fails_request(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get("/api/posts/feed/")
+
+    @override_settings(QUERY_INSTRUMENTATION=False)
+    def test_disabled_by_default(self):
+        response = self.client.get("/api/posts/feed/")
+        self.assertNotIn("Server-Timing", response)
+
+    def test_middleware_leaves_serializers_alone(self):
+        from rest_framework.serializers import BaseSerializer
+        from catsitting.instrumentation import QueryInstrumentationMiddleware
+
+        uninstall_serializer_timing()
+        self.addCleanup(install_serializer_timing)
+        data = BaseSerializer.data
+        QueryInstrumentationMiddleware(lambda request: None)
+        self.assertIs(BaseSerializer.data, data)
+
+    def test_fingerprint_ignores_parameters(self):
+        first, _ = fingerprint('SELECT * FROM "t" WHERE "id" IN (%s, %s)')
+        second, _ = fingerprint('SELECT * FROM  "t" WHERE "id" IN (%s)')
+        self.assertEqual(first, second)
+
+
+# Test Set-based Deletion
+
+class DeletionTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.heavy = User.objects.create_user(username="heavy", email="heavy@example.com", password="password123")
+        self.fans = [
+            User.objects.create_user(username=f"fan{i}", email=f"fan{i}@example.com", password="password123")
+            for i in range(2)
+        ]
+        self.fan_post = Post.objects.create(author=self.fans[0], title="Fan", category="offer", description="Fan")
+        self.fan_comment = Comment.objects.create(owner=self.fans[0], post=self.fan_post, content="Fan comment")
+
+    def add_heavy_content(self, posts):
+        for i in range(posts):
+            post = Post.objects.create(author=self.heavy, title=f"Heavy {i}", category="offer", description="Heavy")
+            for fan in self.fans:
+                Like.objects.create(owner=fan, post=post)
+                comment = Comment.objects.create(owner=fan, post=post, content="Nice")
+                Comment.objects.create(owner=self.heavy, post=post, parent=comment, content="Thanks")
+                Notification.objects.create(user=self.heavy, type="like", post=post, sender_profile=fan.profile)
+            Notification.objects.create(user=self.fans[0], type="comment", post=post, message="Heavy post")
+            SittingRequest.objects.create(sender=self.fans[1], receiver=self.heavy, post=post, message="Hi")
+        recompute_unread_counts()
+
+    def add_heavy_interactions(self):
+        Like.objects.create(owner=self.heavy, post=self.fan_post)
+        reply = Comment.objects.create(owner=self.heavy, post=self.fan_post, parent=self.fan_comment, content="Me")
+        Comment.objects.create(owner=self.fans[1], post=self.fan_post, parent=reply, content="Reply to heavy")
+        self.fan_comment.likes.add(self.heavy, self.fans[1])
+        self.heavy.profile.followers.add(self.fans[0].profile)
+        self.fans[0].profile.followers.add(self.heavy.profile)
+        Notification.objects.create(
+            user=self.fans[0], type="like", post=self.fan_post, sender_profile=self.heavy.profile, message="Liked"
+        )
+        recompute_post_counters()
+        recompute_comment_counters()
+        recompute_followers_counts()
+        recompute_unread_counts()
+
+    def test_account_deletion_removes_everything_and_repairs_counters(self):
+        self.add_heavy_content(2)
+        self.add_heavy_interactions()
+        heavy_profile_id = self.heavy.profile.id
+
+        delete_account(self.heavy)
+
+        self.assertFalse(User.objects.filter(pk=self.heavy.pk).exists())
+        self.assertFalse(Profile.objects.filter(pk=heavy_profile_id).exists())
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(list(Comment.objects.values_list("pk", flat=True)), [self.fan_comment.pk])
+        self.assertFalse(Like.objects.exists())
+        self.assertFalse(SittingRequest.objects.exists())
+        self.assertEqual(
+            list(Notification.objects.values_list("post", "sender_profile")), [(self.fan_post.pk, None)]
+        )
+        self.assertEqual(set(Activity.objects.values_list("type", flat=True)), {"post", "comment"})
+        self.assertEqual(Activity.objects.filter(user=self.heavy.pk).count(), 0)
+
+        self.fan_post.refresh_from_db()
+        self.fan_comment.refresh_from_db()
+        self.assertEqual((self.fan_post.likes_count, self.fan_post.comments_count), (0, 1))
+        self.assertEqual(self.fan_comment.likes_count, 1)
+        self.assertEqual(Profile.objects.get(user=self.fans[0]).followers_count, 0)
+        self.assertEqual(get_unread_count(self.fans[0]), 1)
+        self.assertEqual(get_search_backend().search(Post.objects.all(), "Heavy").count(), 0)
+
+    def test_query_count_does_not_grow_with_content(self):
+        def count_queries(user):
+            with CaptureQueriesContext(connection) as queries:
+                delete_account(user)
+            return len(queries)
+
+        self.add_heavy_content(1)
+        small = count_queries(self.heavy)
+
+        self.heavy = User.objects.create_user(username="heavier", email="heavier@example.com", password="password123")
+        self.add_heavy_content(6)
+        self.assertEqual(count_queries(self.heavy), small)
+
+    def test_post_deletion_keeps_other_posts(self):
+        self.add_heavy_content(2)
+        post = Post.objects.filter(author=self.heavy).first()
+        api = APIClient()
+        api.force_authenticate(user=User.objects.get(pk=self.heavy.pk))
+
+        response = api.delete(f"/api/posts/{post.pk}/")
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+        self.assertFalse(Comment.objects.filter(post=post.pk).exists())
+        self.assertEqual(Post.objects.filter(author=self.heavy).count(), 1)
+        self.assertEqual(Comment.objects.filter(post__author=self.heavy).count(), 4)
+        self.assertEqual(get_unread_count(self.fans[0]), 1)
+
+    @override_settings(ACCOUNT_DELETION_RUNNER="inline")
+    def test_delete_profile_view(self):
+        self.add_heavy_content(1)
+        api = APIClient()
+        api.force_authenticate(user=self.heavy)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = api.delete("/api/profiles/delete/")
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(User.objects.filter(pk=self.heavy.pk).exists())
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command(
+            "benchmark_deletion", posts=3, fans=2, notifications=5, json=True, stdout=out
+        )
+        results = json.loads(out.getvalue())
+        self.assertEqual(set(results), {"cascade", "set-based"})
+        self.assertEqual(User.objects.count(), 3)
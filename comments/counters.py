@@ -0,0 +1,17 @@
+from django.db.models import OuterRef
+
+from catsitting.counters import count_rows
+from .models import Comment
+
+
+def actual_likes_count():
+    return count_rows(Comment.likes.through.objects.filter(comment=OuterRef('pk')))
+
+
+def recompute_comment_counters(queryset=None):
+    """
+    Recompute the like counter of the given comments in a single UPDATE
+    statement. Returns the number of updated rows.
+    """
+    queryset = Comment.objects.all() if queryset is None else queryset
+    return queryset.update(likes_count=actual_likes_count())
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:22
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_likes_count(apps, schema_editor):
+    Comment = apps.get_model('comments', 'Comment')
+    CommentLike = Comment.likes.through
+    Comment.objects.update(
+        likes_count=Coalesce(
+            Subquery(
+                CommentLike.objects.filter(comment=OuterRef('pk'))
+                .order_by().values('comment')
+                .annotate(total=Count('pk')).values('total'),
+                output_field=IntegerField(),
+            ),
+            0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0004_comment_likes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_likes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:48
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_to_comment_likes(apps, schema_editor):
+    """
+    Move the likes of the old auto-created through table into
+    likes.CommentLike, which the activity feed and KPIs read.
+    """
+    Comment = apps.get_model('comments', 'Comment')
+    CommentLike = apps.get_model('likes', 'CommentLike')
+    rows = Comment.likes.through.objects.order_by('pk').values_list('pk', 'comment_id', 'user_id')
+    now = timezone.now()
+    last_pk = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last_pk)[:1000])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        CommentLike.objects.bulk_create(
+            [CommentLike(comment_id=comment_id, owner_id=user_id, created_at=now) for _, comment_id, user_id in batch],
+            ignore_conflicts=True,
+        )
+
+
+def copy_from_comment_likes(apps, schema_editor):
+    Comment = apps.get_model('comments', 'Comment')
+    CommentLike = apps.get_model('likes', 'CommentLike')
+    Through = Comment.likes.through
+    rows = CommentLike.objects.order_by('pk').values_list('pk', 'comment_id', 'owner_id')
+    last_pk = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last_pk)[:1000])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        Through.objects.bulk_create(
+            [Through(comment_id=comment_id, user_id=owner_id) for _, comment_id, owner_id in batch],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0005_comment_likes_count'),
+        ('likes', '0003_commentlike'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_to_comment_likes, copy_from_comment_likes),
+        # A many-to-many field cannot be altered to use a through model,
+        # so the old table goes and the field comes back on CommentLike.
+        migrations.RemoveField(
+            model_name='comment',
+            name='likes',
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='likes',
+            field=models.ManyToManyField(blank=True, related_name='liked_comments', through='likes.CommentLike', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
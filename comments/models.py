@@ -1,30 +1,32 @@
 from django.db import models
 from django.contrib.auth.models import User
+from catsitting.counters import CounterFieldsMixin
 from posts.models import Post
-from django.db.models.signals import post_delete
-from django.dispatch import receiver
-from notifications.models import Notification
 
 
-class Comment(models.Model):
+class Comment(CounterFieldsMixin, models.Model):
     """
     Comment model, related to User and Post
     """
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name="replies")
-    likes = models.ManyToManyField(User, related_name="liked_comments", blank=True)
+    # One row per like in likes.CommentLike, which also feeds activity
+    # entries and KPIs, see likes.store.
+    likes = models.ManyToManyField(
+        User, through='likes.CommentLike', related_name="liked_comments", blank=True
+    )
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Maintained in the same statement as the like rows, see likes.store.
+    COUNTER_FIELDS = ('likes_count',)
+
     class Meta:
         ordering = ['-created_at']
 
     def __str__(self):
         return f"Comment by {self.owner.username} on {self.post.title}"
 
-
-@receiver(post_delete, sender=Comment)
-def delete_related_notification(sender, instance, **kwargs):
-    Notification.objects.filter(post=instance.post, type="comment").delete()
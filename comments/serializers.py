@@ -1,14 +1,84 @@
+from collections import defaultdict
 from django.contrib.humanize.templatetags.humanize import naturaltime
+from django.urls import reverse
 from rest_framework import serializers
+from rest_framework.utils.urls import replace_query_param
 from .models import Comment
 from posts.models import Post
 
+# Reply levels nested inline when the client does not ask for fewer;
+# deeper replies are reached through ``replies_next``.
+DEFAULT_MAX_DEPTH = 10
+MAX_DEPTH_LIMIT = 50
+
+
+def build_comment_threads(comments, request=None):
+    """
+    Attach the reply tree and the viewer's liked flags to
+    a page of comments. All replies of the comments' posts are loaded in
+    one query and linked in memory, so the number of queries does not
+    grow with the size or depth of the threads.
+    """
+    comments = list(comments)
+    if not comments:
+        return comments
+
+    post_ids = {comment.post_id for comment in comments}
+    nodes = {comment.id: comment for comment in comments}
+    replies = (
+        Comment.objects.filter(post_id__in=post_ids, parent__isnull=False)
+        .select_related('owner__profile')
+        .order_by('-created_at', '-id')
+    )
+    for reply in replies:
+        nodes.setdefault(reply.id, reply)
+
+    children = defaultdict(list)
+    for node in nodes.values():
+        if node.parent_id is not None:
+            children[node.parent_id].append(node)
+    for siblings in children.values():
+        siblings.sort(key=lambda node: (node.created_at, node.id), reverse=True)
+
+    liked = set()
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        liked = set(
+            Comment.likes.through.objects.filter(
+                comment__post_id__in=post_ids, owner=user
+            ).values_list('comment_id', flat=True)
+        )
+
+    for node in nodes.values():
+        node.thread_children = children.get(node.id, [])
+        node.thread_has_liked = node.id in liked
+
+    stack = [(comment, 0) for comment in comments]
+    while stack:
+        node, depth = stack.pop()
+        node.thread_depth = depth
+        stack.extend((child, depth + 1) for child in node.thread_children)
+
+    return comments
+
+
+class CommentListSerializer(serializers.ListSerializer):
+    """
+    List serializer that builds the reply trees for the whole page
+    before serializing it.
+    """
+    def to_representation(self, data):
+        iterable = data.all() if hasattr(data, 'all') else data
+        comments = build_comment_threads(iterable, self.context.get('request'))
+        return [self.child.to_representation(comment) for comment in comments]
+
 
 class CommentSerializer(serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='owner.username')
     replies = serializers.SerializerMethodField()
     replies_count = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
+    replies_next = serializers.SerializerMethodField()
+    likes_count = serializers.ReadOnlyField()
     has_liked = serializers.SerializerMethodField()
     is_owner = serializers.SerializerMethodField()
     profile_id = serializers.ReadOnlyField(source='owner.profile.id')
@@ -21,29 +91,80 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'author', 'is_owner', 'profile_id', 'profile_image',
             'post', 'created_at', 'updated_at', 'content',
-            'replies', 'replies_count', 'parent', 'likes_count', 'has_liked'
+            'replies', 'replies_count', 'replies_next', 'parent',
+            'likes_count', 'has_liked'
         ]
+        list_serializer_class = CommentListSerializer
+
+    def _ensure_thread(self, obj):
+        if not hasattr(obj, 'thread_children'):
+            build_comment_threads([obj], self.context.get('request'))
+
+    def _visible_replies(self, obj):
+        """
+        Replies shown inline, limited by the ``max_depth`` (default
+        ``DEFAULT_MAX_DEPTH``) and ``replies_preview`` values in the
+        serializer context.
+        """
+        self._ensure_thread(obj)
+        max_depth = self.context.get('max_depth')
+        if max_depth is None:
+            max_depth = DEFAULT_MAX_DEPTH
+        if obj.thread_depth >= max_depth:
+            return []
+        preview = self.context.get('replies_preview')
+        if preview is not None:
+            return obj.thread_children[:preview]
+        return obj.thread_children
+
+    def to_representation(self, instance):
+        """
+        Serialize the comment and its visible replies with an explicit
+        stack, so deep threads never hit Python's recursion limit.
+        """
+        root = super().to_representation(instance)
+        stack = [(instance, root)]
+        while stack:
+            node, data = stack.pop()
+            for child in self._visible_replies(node):
+                child_data = super().to_representation(child)
+                data['replies'].append(child_data)
+                stack.append((child, child_data))
+        return root
 
     def get_replies(self, obj):
-        children = obj.replies.all().order_by("-created_at")
-        return CommentSerializer(
-            children, many=True, context=self.context
-        ).data
+        # Filled in by to_representation.
+        return []
 
     def get_replies_count(self, obj):
-        return obj.replies.count()
+        self._ensure_thread(obj)
+        return len(obj.thread_children)
 
-    def get_likes_count(self, obj):
-        return obj.likes.count()
+    def get_replies_next(self, obj):
+        """
+        Link to the full, paginated list of direct replies when some of
+        them were cut off by ``max_depth`` or ``replies_preview``.
+        """
+        if len(self._visible_replies(obj)) == len(obj.thread_children):
+            return None
+        request = self.context.get('request')
+        url = reverse('comments-list')
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        url = replace_query_param(url, 'parent', obj.id)
+        for param in ('max_depth', 'replies_preview'):
+            if self.context.get(param) is not None:
+                url = replace_query_param(url, param, self.context[param])
+        return url
 
     def get_has_liked(self, obj):
-        user = self.context.get("request").user
-        return user.is_authenticated and user in obj.likes.all()
+        self._ensure_thread(obj)
+        return obj.thread_has_liked
 
     def get_is_owner(self, obj):
         request = self.context.get('request')
         return (
-            request.user == obj.owner
+            request.user.id == obj.owner_id
             if request and request.user.is_authenticated
             else False
         )
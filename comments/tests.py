@@ -1,3 +1,126 @@
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from posts.models import Post
+from comments.counters import recompute_comment_counters
+from comments.models import Comment
+from comments.serializers import MAX_DEPTH_LIMIT, CommentSerializer
 
-# Create your tests here.
+User = get_user_model()
+
+
+def create_test_user(email, username, password="password123"):
+    User.objects.create_user(email=email, username=username, password=password)
+    # Reload so the profile picture is a Cloudinary resource, not the default string.
+    return User.objects.get(username=username)
+
+
+# Test Comment Threads
+class CommentThreadTestCase(TestCase):
+    def setUp(self):
+        self.user = create_test_user(email="testuser@example.com", username="testuser")
+        self.other = create_test_user(email="other@example.com", username="other")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.post = Post.objects.create(
+            author=self.user,
+            title="Test Post",
+            category="general",
+            description="This is a test post"
+        )
+        self.root = Comment.objects.create(owner=self.other, post=self.post, content="Root")
+
+    def add_chain(self, parent, length):
+        for i in range(length):
+            parent = Comment.objects.create(
+                owner=self.other, post=self.post, parent=parent, content=f"Reply {i}"
+            )
+        return parent
+
+    def get_thread(self, **params):
+        params['post'] = self.post.id
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/comments/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results'], len(queries)
+
+    def test_query_count_does_not_grow_with_thread_size(self):
+        self.add_chain(self.root, 2)
+        _, shallow = self.get_thread()
+
+        self.add_chain(self.root, 6)
+        for _ in range(5):
+            Comment.objects.create(owner=self.other, post=self.post, parent=self.root, content="Sibling")
+        _, deep = self.get_thread()
+
+        self.assertEqual(shallow, deep)
+
+    def test_thread_tree_and_likes(self):
+        reply = Comment.objects.create(owner=self.other, post=self.post, parent=self.root, content="Reply")
+        nested = Comment.objects.create(owner=self.user, post=self.post, parent=reply, content="Nested")
+        reply.likes.add(self.user, self.other)
+        nested.likes.add(self.other)
+        recompute_comment_counters()
+
+        results, _ = self.get_thread()
+        self.assertEqual(len(results), 1)
+        root = results[0]
+        self.assertEqual(root['replies_count'], 1)
+        self.assertEqual(root['replies'][0]['id'], reply.id)
+        self.assertEqual(root['replies'][0]['likes_count'], 2)
+        self.assertTrue(root['replies'][0]['has_liked'])
+
+        nested_data = root['replies'][0]['replies'][0]
+        self.assertEqual(nested_data['id'], nested.id)
+        self.assertEqual(nested_data['likes_count'], 1)
+        self.assertFalse(nested_data['has_liked'])
+        self.assertTrue(nested_data['is_owner'])
+
+    def test_max_depth_and_preview_truncate_with_load_more_link(self):
+        replies = [
+            Comment.objects.create(owner=self.other, post=self.post, parent=self.root, content=f"Reply {i}")
+            for i in range(4)
+        ]
+        self.add_chain(replies[-1], 2)
+
+        results, _ = self.get_thread(max_depth=1, replies_preview=2)
+        root = results[0]
+        self.assertEqual(root['replies_count'], 4)
+        self.assertEqual(len(root['replies']), 2)
+        self.assertIsNotNone(root['replies_next'])
+        self.assertEqual(root['replies'][0]['replies'], [])
+        self.assertIsNotNone(root['replies'][0]['replies_next'])
+
+        response = self.client.get(root['replies_next'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in response.data['results']],
+            [reply.id for reply in reversed(replies)]
+        )
+
+    def test_deep_thread_is_bounded_and_not_recursive(self):
+        parent = self.root
+        for i in range(1100):
+            parent = Comment(owner=self.other, post=self.post, parent=parent, content=f"Reply {i}")
+            parent.save()
+
+        results, _ = self.get_thread(max_depth=10000)
+        node, depth = results[0], 0
+        while node['replies']:
+            node, depth = node['replies'][0], depth + 1
+        self.assertEqual(depth, MAX_DEPTH_LIMIT)
+        self.assertIsNotNone(node['replies_next'])
+
+        data = CommentSerializer(self.root, context={'max_depth': 2000}).data
+        node, depth = data, 0
+        while node['replies']:
+            node, depth = node['replies'][0], depth + 1
+        self.assertEqual(depth, 1100)
+
+    def test_invalid_thread_limit(self):
+        response = self.client.get('/api/comments/', {'post': self.post.id, 'max_depth': 'deep'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,15 +1,19 @@
 from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from profiles.permissions import IsOwnerOrReadOnly
-from notifications.models import Notification
+from notifications.service import notify, retract
+from posts.counters import decrement_post_counter, increment_post_counter
+from likes.store import toggle_comment_like
 from posts.models import Post
 from .models import Comment
 from .pagination import CommentPagination
-from .serializers import CommentDetailSerializer
+from .serializers import MAX_DEPTH_LIMIT, CommentDetailSerializer
 from comments.serializers import CommentSerializer
 
 
@@ -21,22 +25,58 @@ class CommentList(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     queryset = Comment.objects.all()
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['post']
+    filterset_fields = ['post', 'parent']
     pagination_class = CommentPagination
 
     def get_queryset(self):
-        return Comment.objects.filter(parent__isnull=True).order_by("-created_at")
+        queryset = Comment.objects.select_related('owner__profile').order_by(
+            "-created_at", "-id"
+        )
+        if 'parent' in self.request.query_params:
+            return queryset
+        return queryset.filter(parent__isnull=True)
+
+    def get_thread_limit(self, param):
+        value = self.request.query_params.get(param)
+        if value in (None, ''):
+            return None
+        try:
+            value = int(value)
+        except ValueError:
+            value = -1
+        if value < 0:
+            raise ValidationError({param: "Must be a non-negative integer."})
+        return value
+
+    def get_serializer_context(self):
+        """
+        ``max_depth`` limits how many reply levels are nested, at most
+        ``MAX_DEPTH_LIMIT``, and ``replies_preview`` how many replies are
+        shown per comment. Truncated comments link to the rest via
+        ``replies_next``.
+        """
+        context = super().get_serializer_context()
+        if self.request.method == 'GET':
+            max_depth = self.get_thread_limit('max_depth')
+            if max_depth is not None:
+                max_depth = min(max_depth, MAX_DEPTH_LIMIT)
+            context['max_depth'] = max_depth
+            context['replies_preview'] = self.get_thread_limit('replies_preview')
+        return context
 
     def perform_create(self, serializer):
-        comment = serializer.save(owner=self.request.user)
+        with transaction.atomic():
+            comment = serializer.save(owner=self.request.user)
+            increment_post_counter(comment.post_id, 'comments_count')
 
         if comment.post.author != self.request.user:
-            Notification.objects.create(
+            notify(
                 user=comment.post.author,
                 type="comment",
                 message=f"{self.request.user.username} commented on your post: “{comment.content[:30]}...”",
                 post=comment.post,
-                comment=comment
+                comment=comment,
+                sender_profile=self.request.user.profile
             )
 
 
@@ -51,7 +91,12 @@ class CommentDetail(generics.RetrieveUpdateDestroyAPIView):
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         post = instance.post
-        self.perform_destroy(instance)
+        with transaction.atomic():
+            # Deleting a comment cascades to its replies.
+            _, deleted = instance.delete()
+            removed = deleted.get(Comment._meta.label, 0)
+            if removed:
+                decrement_post_counter(post.id, 'comments_count', removed)
 
         post.save(update_fields=[])
 
@@ -63,24 +108,29 @@ class ToggleCommentLike(APIView):
 
     def post(self, request, pk):
         comment = get_object_or_404(Comment, pk=pk)
+        liked, changed, likes_count = toggle_comment_like(request.user.id, comment.id)
 
-        if request.user in comment.likes.all():
-            comment.likes.remove(request.user)
-            liked = False
-        else:
-            comment.likes.add(request.user)
-            liked = True
-
-            if request.user != comment.owner:
-                Notification.objects.create(
+        # A like a concurrent request added first was already notified.
+        if changed and request.user.id != comment.owner_id:
+            if liked:
+                notify(
                     user=comment.owner,
                     type="like",
                     message=f"{request.user.username} liked your comment: “{comment.content[:30]}...”",
                     post=comment.post,
-                    comment=comment
+                    comment=comment,
+                    sender_profile=request.user.profile
+                )
+            else:
+                retract(
+                    user_id=comment.owner_id,
+                    type="like",
+                    post_id=comment.post_id,
+                    comment=comment,
+                    sender_profile=request.user.profile
                 )
 
         return Response({
             "liked": liked,
-            "likes_count": comment.likes.count(),
+            "likes_count": likes_count,
         }, status=status.HTTP_200_OK)
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .models import Job
+
+
+@register(Tags.database)
+def check_stuck_jobs(app_configs, databases=None, **kwargs):
+    """
+    Warn about jobs that have been due for longer than
+    ``JOBS_LOCK_TIMEOUT``, which is what a missing worker looks like.
+    Runs with ``manage.py check --database default`` and ``migrate``.
+    """
+    if not databases:
+        return []
+    cutoff = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    try:
+        stuck = Job.objects.filter(status="queued", run_at__lt=cutoff).count()
+    except DatabaseError:
+        # Not migrated yet.
+        return []
+    if not stuck:
+        return []
+    return [Warning(
+        f"{stuck} job(s) have been due for more than {settings.JOBS_LOCK_TIMEOUT} seconds.",
+        hint=(
+            "No worker seems to be running them. Start `manage.py run_worker` "
+            "(heroku ps:scale worker=1), or set JOBS_MODE=inline to run new "
+            "jobs in the web process."
+        ),
+        id="jobs.W001",
+    )]
@@ -0,0 +1,78 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from jobs.service import claim, purge_finished, release_stale, run, worker_name
+
+# Seconds between two sweeps for stale and old finished jobs.
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued jobs until stopped. SIGTERM and SIGINT let the "
+        "current batch finish first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10,
+            help="Number of jobs claimed at a time.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help="Seconds to sleep when no job is due.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit as soon as no job is due.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        self.stopping = False
+        if not options["once"]:
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        worker = worker_name()
+        succeeded = failed = 0
+        last_maintenance = 0
+        while not self.stopping:
+            if time.monotonic() - last_maintenance > MAINTENANCE_INTERVAL:
+                released = release_stale()
+                purged = purge_finished(settings.JOBS_KEEP_DONE_DAYS)
+                if options["verbosity"] > 1 and (released or purged):
+                    self.stdout.write(f"Released {released} stale job(s), purged {purged} finished job(s).")
+                last_maintenance = time.monotonic()
+
+            jobs = claim(worker, options["batch_size"])
+            for job in jobs:
+                if run(job):
+                    succeeded += 1
+                else:
+                    failed += 1
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"Job {job.pk} {job.name}: attempt {job.attempts}")
+            close_old_connections()
+
+            if not jobs:
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Worker {worker} stopped: {succeeded} job(s) succeeded, {failed} failed."
+        ))
+
+    def stop(self, signum, frame):
+        self.stopping = True
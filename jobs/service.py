@@ -0,0 +1,160 @@
+"""
+A job queue in the database, for work that should not hold up a request.
+
+``enqueue(func, **payload)`` stores a ``Job`` in the current transaction,
+so the job exists exactly when the work that asked for it commits.
+``manage.py run_worker`` then claims jobs in batches:
+
+* on Postgres with ``SELECT ... FOR UPDATE SKIP LOCKED``, so concurrent
+  workers never wait on or run each other's jobs;
+* elsewhere (SQLite) with one conditional ``UPDATE`` that tags the rows
+  it moved from queued to running, which the database serializes.
+
+A job that raises is retried with exponential backoff until it has used
+``max_attempts``, then left as failed. A job left running by a worker
+that died is queued again once it is ``JOBS_LOCK_TIMEOUT`` seconds old.
+
+``JOBS_MODE = "inline"`` runs each job in the enqueuing process as soon
+as its transaction commits, for development without a worker; failed
+jobs still stay queued for a worker to retry.
+"""
+import logging
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between two attempts of a job.
+MAX_BACKOFF = 3600
+
+
+def job_name(func):
+    if isinstance(func, str):
+        return func
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def enqueue(func, *, delay=0, max_attempts=None, **payload):
+    """
+    Queue a call of ``func``, a module-level function or its dotted path,
+    with the JSON-serializable keyword arguments ``payload``.
+    """
+    job = Job.objects.create(
+        name=job_name(func),
+        payload=payload,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+    if settings.JOBS_MODE == "inline":
+        transaction.on_commit(lambda: run_inline(job.pk))
+    return job
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim(worker, limit):
+    """
+    Move up to ``limit`` due jobs from queued to running for ``worker``
+    and return them.
+    """
+    now = timezone.now()
+    token = f"{worker}:{uuid.uuid4().hex[:8]}"
+    due = Job.objects.filter(status="queued", run_at__lte=now).order_by("run_at", "id")
+    claimed = {"status": "running", "locked_by": token, "locked_at": now, "attempts": F("attempts") + 1}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list("pk", flat=True)[:limit])
+            Job.objects.filter(pk__in=ids).update(**claimed)
+    else:
+        ids = list(due.values_list("pk", flat=True)[:limit])
+        # Jobs another worker claimed in between are no longer queued.
+        Job.objects.filter(pk__in=ids, status="queued").update(**claimed)
+    return list(Job.objects.filter(locked_by=token, status="running").order_by("run_at", "id"))
+
+
+def run_inline(job_id):
+    now = timezone.now()
+    token = f"{worker_name()}:inline"
+    if Job.objects.filter(pk=job_id, status="queued").update(
+        status="running", locked_by=token, locked_at=now, attempts=F("attempts") + 1
+    ):
+        run(Job.objects.get(pk=job_id))
+
+
+def backoff(attempts):
+    return min(settings.JOBS_RETRY_BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF)
+
+
+def run(job):
+    """
+    Run a claimed job and record the outcome. Returns True on success.
+    """
+    try:
+        func = import_string(job.name)
+    except ImportError as exc:
+        logger.error("Job %s names an unknown function %s", job.pk, job.name)
+        finish(job, "failed", error=str(exc))
+        return False
+
+    try:
+        func(**job.payload)
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed, attempt %d of %d", job.pk, job.name, job.attempts, job.max_attempts)
+        if job.attempts >= job.max_attempts:
+            finish(job, "failed", error=repr(exc))
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status="queued",
+                run_at=timezone.now() + timedelta(seconds=backoff(job.attempts)),
+                locked_by="",
+                locked_at=None,
+                last_error=repr(exc),
+            )
+        return False
+    finish(job, "done")
+    return True
+
+
+def finish(job, status, error=""):
+    Job.objects.filter(pk=job.pk).update(
+        status=status, finished_at=timezone.now(), last_error=error
+    )
+
+
+def release_stale(timeout=None):
+    """
+    Queue again the jobs whose worker stopped without finishing them, or
+    fail them when they have no attempts left. Returns how many were
+    released.
+    """
+    timeout = settings.JOBS_LOCK_TIMEOUT if timeout is None else timeout
+    stale = Job.objects.filter(
+        status="running", locked_at__lt=timezone.now() - timedelta(seconds=timeout)
+    )
+    stale.filter(attempts__gte=F("max_attempts")).update(
+        status="failed", finished_at=timezone.now(), last_error="Worker stopped before finishing."
+    )
+    return stale.update(status="queued", locked_by="", locked_at=None)
+
+
+def purge_finished(days):
+    """
+    Delete jobs that succeeded more than ``days`` days ago. Failed jobs
+    stay for inspection.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(status="done", finished_at__lt=cutoff).delete()
+    return deleted
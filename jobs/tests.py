@@ -0,0 +1,126 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs.checks import check_stuck_jobs
+from jobs.models import Job
+from jobs.service import claim, enqueue, purge_finished, release_stale, run
+
+calls = []
+
+
+def record(value):
+    calls.append(value)
+
+
+def explode():
+    raise RuntimeError("boom")
+
+
+# Test Job Queue
+
+@override_settings(JOBS_MODE="worker", JOBS_MAX_ATTEMPTS=3, JOBS_RETRY_BACKOFF=30)
+class JobQueueTestCase(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def run_worker(self):
+        out = StringIO()
+        call_command("run_worker", once=True, stdout=out)
+        return out.getvalue()
+
+    def test_worker_runs_queued_jobs_in_order(self):
+        enqueue(record, value="first")
+        enqueue("jobs.tests.record", value="second")
+        enqueue(record, value="later", delay=60)
+
+        output = self.run_worker()
+
+        self.assertEqual(calls, ["first", "second"])
+        self.assertIn("2 job(s) succeeded", output)
+        self.assertEqual(Job.objects.filter(status="done").count(), 2)
+        self.assertEqual(Job.objects.get(status="queued").payload, {"value": "later"})
+
+    def test_claimed_jobs_are_not_claimed_again(self):
+        enqueue(record, value="once")
+        first = claim("worker-a", 10)
+        second = claim("worker-b", 10)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(first[0].attempts, 1)
+        self.assertEqual(first[0].status, "running")
+        self.assertEqual(second, [])
+
+    def test_failed_job_is_retried_with_backoff_then_failed(self):
+        job = enqueue(explode)
+        before = timezone.now()
+        self.assertFalse(run(claim("worker", 1)[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "queued")
+        self.assertEqual(job.attempts, 1)
+        self.assertIn("boom", job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=30))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        run(claim("worker", 1)[0])
+        job.refresh_from_db()
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=60))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        run(claim("worker", 1)[0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.attempts, 3)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_unknown_function_fails_at_once(self):
+        job = enqueue("jobs.tests.missing")
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.attempts, 1)
+
+    def test_stale_running_jobs_are_released(self):
+        stale = enqueue(record, value="stale")
+        spent = enqueue(record, value="spent", max_attempts=1)
+        claim("dead-worker", 10)
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(release_stale(timeout=600), 1)
+        stale.refresh_from_db()
+        spent.refresh_from_db()
+        self.assertEqual(stale.status, "queued")
+        self.assertEqual(stale.locked_by, "")
+        self.assertEqual(spent.status, "failed")
+
+        self.run_worker()
+        self.assertEqual(calls, ["stale"])
+
+    def test_purge_keeps_recent_and_failed_jobs(self):
+        old = timezone.now() - timedelta(days=10)
+        Job.objects.create(name="jobs.tests.record", status="done", finished_at=old)
+        Job.objects.create(name="jobs.tests.record", status="failed", finished_at=old)
+        Job.objects.create(name="jobs.tests.record", status="done", finished_at=timezone.now())
+        self.assertEqual(purge_finished(7), 1)
+        self.assertEqual(Job.objects.count(), 2)
+
+    @override_settings(JOBS_MODE="inline")
+    def test_inline_mode_runs_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = enqueue(record, value="inline")
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, ["inline"])
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+
+    def test_check_warns_about_jobs_nobody_runs(self):
+        self.assertEqual(check_stuck_jobs(None, databases=["default"]), [])
+        job = enqueue(record, value="waiting")
+        self.assertEqual(check_stuck_jobs(None, databases=["default"]), [])
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now() - timedelta(hours=1))
+        warnings = check_stuck_jobs(None, databases=["default"])
+        self.assertEqual([warning.id for warning in warnings], ["jobs.W001"])
+        self.assertEqual(check_stuck_jobs(None), [])
@@ -0,0 +1,176 @@
+"""
+The single write path for post and comment likes.
+
+Post likes live in ``likes.Like`` and comment likes in
+``likes.CommentLike``, the through table of ``Comment.likes``; both have
+a unique constraint on (owner, object). Adding a like is one ``INSERT ... ON CONFLICT DO NOTHING
+RETURNING`` statement, removing it one ``DELETE ... RETURNING``
+statement, and the counter column on the post or comment is moved by an
+``UPDATE ... RETURNING`` in the same transaction, so concurrent requests
+can neither create duplicate likes nor let the counter drift.
+
+Because raw SQL bypasses the ORM, the Like and CommentLike model signals
+are sent explicitly so activity entries, KPI snapshots and the anonymous
+response cache stay in sync.
+"""
+from typing import NamedTuple
+
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from comments.models import Comment
+from posts.models import Post
+from .models import CommentLike, Like
+
+
+class LikeState(NamedTuple):
+    """
+    Outcome of a like write. ``changed`` is False when the like already
+    was in the requested state, for instance because a concurrent
+    request added it first, so callers only notify when it is True.
+    """
+    liked: bool
+    changed: bool
+    likes_count: int
+
+
+def _insert(model, values, conflict_fields):
+    """
+    Insert a row unless it violates the unique constraint on
+    ``conflict_fields``. Returns the new id or None.
+    """
+    columns = ", ".join(values)
+    placeholders = ", ".join(["%s"] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {model._meta.db_table} ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT ({', '.join(conflict_fields)}) DO NOTHING RETURNING id",
+            list(values.values()),
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _delete(model, where):
+    """
+    Delete the row matching ``where``. Returns its id or None.
+    """
+    condition = " AND ".join(f"{column} = %s" for column in where)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {model._meta.db_table} WHERE {condition} RETURNING id",
+            list(where.values()),
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _move_counter(model, pk, field, amount):
+    """
+    Add ``amount`` to a counter column, never going below zero, and
+    return the new value in the same statement.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {model._meta.db_table} SET {field} = "
+            f"CASE WHEN {field} + %s < 0 THEN 0 ELSE {field} + %s END "
+            f"WHERE id = %s RETURNING {field}",
+            [amount, amount, pk],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def _like_created(model, **fields):
+    like = model(**fields)
+    like._state.adding = False
+    post_save.send(
+        sender=model, instance=like, created=True, update_fields=None,
+        raw=False, using=connection.alias,
+    )
+    return like
+
+
+def _like_deleted(model, **fields):
+    like = model(**fields)
+    post_delete.send(sender=model, instance=like, using=connection.alias, origin=like)
+
+
+def _insert_like(model, key):
+    created_at = timezone.now()
+    like_id = _insert(model, {
+        **key,
+        "created_at": connection.ops.adapt_datetimefield_value(created_at),
+    }, list(key))
+    return like_id, created_at
+
+
+def _add_like(model, key, target, target_id):
+    like_id, created_at = _insert_like(model, key)
+    if like_id is None:
+        # Already liked, possibly by a concurrent request; report the current state.
+        return LikeState(True, False, _move_counter(target, target_id, "likes_count", 0))
+    likes_count = _move_counter(target, target_id, "likes_count", 1)
+    _like_created(model, id=like_id, created_at=created_at, **key)
+    return LikeState(True, True, likes_count)
+
+
+def _remove_like(model, key, target, target_id):
+    like_id = _delete(model, key)
+    if like_id is None:
+        return LikeState(False, False, _move_counter(target, target_id, "likes_count", 0))
+    likes_count = _move_counter(target, target_id, "likes_count", -1)
+    _like_deleted(model, id=like_id, **key)
+    return LikeState(False, True, likes_count)
+
+
+def _add_post_like(user_id, post_id):
+    return _add_like(Like, {"owner_id": user_id, "post_id": post_id}, Post, post_id)
+
+
+def _remove_post_like(user_id, post_id):
+    return _remove_like(Like, {"owner_id": user_id, "post_id": post_id}, Post, post_id)
+
+
+def add_post_like(user_id, post_id):
+    """
+    Like a post. Returns a ``LikeState``, not changed if the user
+    already liked it.
+    """
+    with transaction.atomic():
+        return _add_post_like(user_id, post_id)
+
+
+def remove_post_like(user_id, post_id):
+    """
+    Unlike a post. Returns a ``LikeState``, not changed if the user had
+    not liked it.
+    """
+    with transaction.atomic():
+        return _remove_post_like(user_id, post_id)
+
+
+def toggle_post_like(user_id, post_id):
+    """
+    Like the post if the user has not liked it yet, otherwise unlike it.
+    Returns a ``LikeState``.
+    """
+    with transaction.atomic():
+        state = _remove_post_like(user_id, post_id)
+        if state.changed:
+            return state
+        return _add_post_like(user_id, post_id)
+
+
+def toggle_comment_like(user_id, comment_id):
+    """
+    Like the comment if the user has not liked it yet, otherwise unlike
+    it. Returns a ``LikeState``.
+    """
+    key = {"owner_id": user_id, "comment_id": comment_id}
+    with transaction.atomic():
+        state = _remove_like(CommentLike, key, Comment, comment_id)
+        if state.changed:
+            return state
+        return _add_like(CommentLike, key, Comment, comment_id)
@@ -1,3 +1,176 @@
-from django.test import TestCase
+import threading
+import time
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from comments.models import Comment
+from likes.models import CommentLike, Like
+from likes.store import add_post_like, toggle_comment_like, toggle_post_like
+from notifications.models import Notification
+from posts.cache import get_cache_version
+from posts.models import Post
+from profiles.models import Activity
+
+User = get_user_model()
+
+
+# Test Post Likes
+class PostLikeTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author", email="author@example.com", password="password123")
+        self.user = User.objects.create_user(username="fan", email="fan@example.com", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(author=self.author, title="Cats", category="general", description="Cats")
+        self.url = f"/api/posts/{self.post.id}/like/"
+
+    def likes_count(self):
+        self.post.refresh_from_db()
+        return self.post.likes_count
+
+    def test_like_is_stored_and_notified_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"liked": True, "likes_count": 1})
+        like = Like.objects.get(owner=self.user, post=self.post)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url)
+        self.assertEqual(response.data, {"liked": True, "likes_count": 1})
+        self.assertEqual(Like.objects.filter(post=self.post).count(), 1)
+        self.assertEqual(self.likes_count(), 1)
+        self.assertEqual(Notification.objects.filter(user=self.author, type="like").count(), 1)
+        self.assertTrue(Activity.objects.filter(type="like", source_id=like.id, user=self.user).exists())
+
+    def test_like_lost_to_a_concurrent_request_is_not_changed(self):
+        self.assertTrue(add_post_like(self.user.id, self.post.id).changed)
+        state = add_post_like(self.user.id, self.post.id)
+        self.assertEqual(state, (True, False, 1))
+        self.assertEqual(toggle_post_like(self.user.id, self.post.id), (False, True, 0))
+
+    def test_unlike(self):
+        self.client.post(self.url)
+        like_id = Like.objects.get().id
+        version = get_cache_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(self.url)
+        self.assertEqual(response.data, {"liked": False, "likes_count": 0})
+        self.assertEqual(self.client.delete(self.url).data, {"liked": False, "likes_count": 0})
+        self.assertFalse(Like.objects.exists())
+        self.assertEqual(self.likes_count(), 0)
+        self.assertFalse(Activity.objects.filter(type="like", source_id=like_id).exists())
+        self.assertGreater(get_cache_version(), version)
+
+
+# Test Like Toggles
+class LikeToggleTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", email="author@example.com", password="password123")
+        self.user = User.objects.create_user(username="fan", email="fan@example.com", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(author=self.author, title="Cats", category="general", description="Cats")
+        self.comment = Comment.objects.create(owner=self.author, post=self.post, content="Cute")
+
+    def test_post_toggle(self):
+        url = f"/api/posts/{self.post.id}/like/toggle/"
+        response = self.client.post(url)
+        self.assertEqual(response.data, {"liked": True, "likes_count": 1})
+        self.assertTrue(Like.objects.filter(owner=self.user, post=self.post).exists())
+
+        response = self.client.post(url)
+        self.assertEqual(response.data, {"liked": False, "likes_count": 0})
+        self.assertFalse(Like.objects.exists())
+
+    def test_comment_toggle(self):
+        url = f"/api/comments/{self.comment.id}/like/"
+        response = self.client.post(url)
+        self.assertEqual(response.data, {"liked": True, "likes_count": 1})
+        self.assertTrue(self.comment.likes.filter(pk=self.user.pk).exists())
+        like = CommentLike.objects.get(owner=self.user, comment=self.comment)
+        self.assertTrue(Activity.objects.filter(type="like_comment", source_id=like.id).exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url)
+        self.assertEqual(response.data, {"liked": False, "likes_count": 0})
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.likes_count, 0)
+        self.assertFalse(Activity.objects.filter(type="like_comment").exists())
+        # Load the comment, delete the like row, update the counter, then
+        # the receivers drop the activity entry and look up the post
+        # author whose KPIs change.
+        statements = [q["sql"] for q in queries if "SAVEPOINT" not in q["sql"]]
+        self.assertEqual(len(statements), 5)
+
+
+class ConcurrentLikeTestCase(TransactionTestCase):
+    """
+    Hammer the like store from several threads, each with its own
+    database connection, and check rows and counters agree.
+    """
+    threads = 8
+
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", email="author@example.com", password="password123")
+        self.users = [
+            User.objects.create_user(username=f"fan{i}", email=f"fan{i}@example.com", password="password123")
+            for i in range(self.threads)
+        ]
+        self.post = Post.objects.create(author=self.author, title="Cats", category="general", description="Cats")
+        self.comment = Comment.objects.create(owner=self.author, post=self.post, content="Cute")
+
+    def run_concurrently(self, target, args_list):
+        barrier = threading.Barrier(len(args_list))
+        errors = []
+
+        def worker(*args):
+            try:
+                barrier.wait()
+                for attempt in range(50):
+                    try:
+                        return target(*args)
+                    except OperationalError:
+                        # SQLite allows one writer at a time; retry when locked.
+                        time.sleep(0.01 * (attempt + 1))
+                raise AssertionError("database stayed locked")
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=args) for args in args_list]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_double_clicks_create_one_like(self):
+        user = self.users[0]
+        self.run_concurrently(add_post_like, [(user.id, self.post.id)] * self.threads)
+        self.post.refresh_from_db()
+        self.assertEqual(Like.objects.filter(post=self.post).count(), 1)
+        self.assertEqual(self.post.likes_count, 1)
+
+    def test_concurrent_toggles_keep_counters_consistent(self):
+        args = [(user.id, self.post.id) for user in self.users]
+        self.run_concurrently(toggle_post_like, args)
+        self.run_concurrently(toggle_post_like, args[::2])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, Like.objects.filter(post=self.post).count())
+        self.assertEqual(self.post.likes_count, self.threads // 2)
+
+        args = [(user.id, self.comment.id) for user in self.users]
+        self.run_concurrently(toggle_comment_like, args)
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.likes_count, self.threads)
+        self.assertEqual(self.comment.likes.count(), self.threads)
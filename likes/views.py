@@ -3,33 +3,54 @@ from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.shortcuts import get_object_or_404
 from posts.models import Post
-from likes.models import Like
-from notifications.models import Notification 
-from likes.serializers import LikeSerializer
+from likes.store import add_post_like, remove_post_like, toggle_post_like
+from notifications.service import notify, retract
 
 class PostLikeAPIView(APIView):
+    """
+    POST likes a post and DELETE unlikes it. Safe to repeat and to race:
+    the unique constraint on (owner, post) decides the outcome, and every
+    call answers with the resulting state and the count from the same
+    transaction.
+    """
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, post_id):
         post = get_object_or_404(Post, id=post_id)
-        like, created = Like.objects.get_or_create(owner=request.user, post=post)
-        if not created:
-            return Response({"detail": "You already liked this post."}, status=status.HTTP_400_BAD_REQUEST)
+        return self.respond(request, post, add_post_like(request.user.id, post.id))
 
-        if post.author != request.user:
-            Notification.objects.create(
-                user=post.author,
-                type="like",
-                post=post,
-                message=f"{request.user.username} liked your post."
-            )
+    def delete(self, request, post_id):
+        post = get_object_or_404(Post, id=post_id)
+        return self.respond(request, post, remove_post_like(request.user.id, post.id))
 
-        return Response(LikeSerializer(like).data, status=status.HTTP_201_CREATED)
+    def respond(self, request, post, state):
+        # Only the request that actually added or removed the like
+        # notifies, or takes the notification back.
+        if state.changed and post.author_id != request.user.id:
+            if state.liked:
+                notify(
+                    user_id=post.author_id,
+                    type="like",
+                    post=post,
+                    message=f"{request.user.username} liked your post.",
+                    sender_profile=request.user.profile
+                )
+            else:
+                retract(user_id=post.author_id, type="like", post=post, sender_profile=request.user.profile)
 
-    def delete(self, request, post_id):
+        return Response({
+            "liked": state.liked,
+            "likes_count": state.likes_count,
+        }, status=status.HTTP_200_OK)
+
+
+class PostLikeToggleAPIView(PostLikeAPIView):
+    """
+    Like or unlike a post in one request, with the same response as
+    PostLikeAPIView.
+    """
+    http_method_names = ["post", "options"]
+
+    def post(self, request, post_id):
         post = get_object_or_404(Post, id=post_id)
-        like = Like.objects.filter(owner=request.user, post=post).first()
-        if like:
-            like.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response({"detail": "Like not found."}, status=status.HTTP_404_NOT_FOUND)
+        return self.respond(request, post, toggle_post_like(request.user.id, post.id))
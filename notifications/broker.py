@@ -0,0 +1,108 @@
+"""
+Pub/sub used to push new notifications to the SSE stream.
+
+``publish()`` is called from synchronous code (the notification writer,
+possibly on its worker thread); ``subscribe()`` is an async generator
+consumed by the stream view on the ASGI event loop.
+
+``LocalBroker`` only reaches subscribers in the same process, which is
+enough for a single web process, development and tests.
+``RedisBroker`` goes through Redis pub/sub so every web process sees
+every notification. ``NOTIFICATIONS_BROKER`` names the class to use.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def channel_name(user_id):
+    return f"notifications:{user_id}"
+
+
+class LocalBroker:
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, messages):
+        """
+        Deliver ``(user_id, payload)`` pairs to the user's subscribers.
+        Safe to call from any thread.
+        """
+        for user_id, payload in messages:
+            with self._lock:
+                subscribers = list(self._subscribers.get(user_id, ()))
+            for loop, queue in subscribers:
+                try:
+                    loop.call_soon_threadsafe(queue.put_nowait, payload)
+                except RuntimeError:
+                    # The subscriber's event loop is already closed.
+                    pass
+
+    async def subscribe(self, user_id):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers[user_id].add(subscriber)
+        try:
+            while True:
+                yield await subscriber[1].get()
+        finally:
+            with self._lock:
+                self._subscribers[user_id].discard(subscriber)
+                if not self._subscribers[user_id]:
+                    del self._subscribers[user_id]
+
+
+class RedisBroker:
+    def __init__(self, url=None):
+        import redis
+
+        self.url = url or settings.NOTIFICATIONS_REDIS_URL
+        self.client = redis.Redis.from_url(self.url)
+
+    def publish(self, messages):
+        pipeline = self.client.pipeline(transaction=False)
+        for user_id, payload in messages:
+            pipeline.publish(channel_name(user_id), json.dumps(payload, default=str))
+        pipeline.execute()
+
+    async def subscribe(self, user_id):
+        from redis import asyncio as aioredis
+
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(channel_name(user_id))
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield json.loads(message["data"])
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.NOTIFICATIONS_BROKER)()
+
+
+def publish(messages):
+    """
+    Publish without letting a broker outage fail the caller; the
+    notifications are stored either way and clients catch up on their
+    next fetch.
+    """
+    if not messages:
+        return
+    try:
+        get_broker().publish(messages)
+    except Exception:
+        logger.exception("Could not publish %d notifications", len(messages))
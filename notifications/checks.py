@@ -0,0 +1,43 @@
+import os
+
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+from django.utils.module_loading import import_string
+
+from .broker import LocalBroker
+
+
+def web_concurrency():
+    try:
+        return int(os.environ.get("WEB_CONCURRENCY", 1))
+    except ValueError:
+        return 1
+
+
+@register()
+def check_stream_broker(app_configs, **kwargs):
+    """
+    The in-process broker only reaches the SSE streams of the process
+    that publishes. Refuse it when the job worker writes notifications,
+    and warn when several web processes serve the streams.
+    """
+    if not issubclass(import_string(settings.NOTIFICATIONS_BROKER), LocalBroker):
+        return []
+    hint = "Set REDIS_URL (or NOTIFICATIONS_BROKER) to use notifications.broker.RedisBroker."
+    errors = []
+    if getattr(settings, "NOTIFICATIONS_DELIVERY", "request") == "job":
+        errors.append(Error(
+            "NOTIFICATIONS_DELIVERY is 'job', but the job worker cannot reach "
+            "the notification streams through the in-process broker.",
+            hint=hint,
+            id="notifications.E001",
+        ))
+    if web_concurrency() > 1:
+        errors.append(Warning(
+            f"WEB_CONCURRENCY is {web_concurrency()}, but the in-process broker "
+            "only reaches the notification streams of the web process that "
+            "wrote the notification.",
+            hint=hint,
+            id="notifications.W001",
+        ))
+    return errors
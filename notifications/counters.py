@@ -0,0 +1,65 @@
+from django.db.models import Case, F, OuterRef, Value, When
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from catsitting.counters import count_rows
+from profiles.models import Profile
+from .models import Notification
+
+
+def increment_unread_counts(amounts):
+    """
+    Atomically add ``amounts[user_id]`` to the unread notifications
+    counter of each user, in a single UPDATE statement.
+    """
+    amounts = {user_id: amount for user_id, amount in amounts.items() if amount}
+    if not amounts:
+        return 0
+    return Profile.objects.filter(user_id__in=amounts).update(
+        unread_notifications_count=F("unread_notifications_count") + Case(
+            *[When(user_id=user_id, then=Value(amount)) for user_id, amount in amounts.items()],
+            default=Value(0),
+        )
+    )
+
+
+def decrement_unread_count(user_id, amount=1):
+    """
+    Atomically subtract ``amount`` from the unread notifications counter
+    of a user, never going below zero.
+    """
+    if not amount:
+        return 0
+    updated = Profile.objects.filter(
+        user_id=user_id, unread_notifications_count__gte=amount
+    ).update(unread_notifications_count=F("unread_notifications_count") - amount)
+    if not updated:
+        updated = Profile.objects.filter(user_id=user_id).update(unread_notifications_count=0)
+    return updated
+
+
+def get_unread_count(user):
+    return (
+        Profile.objects.filter(user=user)
+        .values_list("unread_notifications_count", flat=True)
+        .first()
+    ) or 0
+
+
+def actual_unread_count():
+    return count_rows(Notification.objects.filter(user_id=OuterRef("user_id"), is_read=False))
+
+
+def recompute_unread_counts(queryset=None):
+    """
+    Recompute the unread notifications counter of the given profiles in
+    a single UPDATE statement. Returns the number of updated rows.
+    """
+    queryset = Profile.objects.all() if queryset is None else queryset
+    return queryset.update(unread_notifications_count=actual_unread_count())
+
+
+@receiver(post_delete, sender=Notification)
+def discount_deleted_notification(sender, instance, **kwargs):
+    if not instance.is_read:
+        decrement_unread_count(instance.user_id)
@@ -0,0 +1,108 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from notifications.models import Notification
+from notifications.retention import expired_notifications, prune_batch, users_over_cap
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete, or archive with --archive, read notifications older than "
+        "--days and trim every user to their newest --max-per-user "
+        "notifications, in batches of bounded size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.NOTIFICATIONS_RETENTION_DAYS,
+            help="Prune read notifications older than this many days.",
+        )
+        parser.add_argument(
+            "--max-per-user",
+            type=int,
+            default=settings.NOTIFICATIONS_MAX_PER_USER,
+            help="Keep at most this many notifications per user, read or not. 0 keeps all.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of notifications removed per transaction.",
+        )
+        parser.add_argument(
+            "--archive",
+            action="store_true",
+            help="Copy pruned notifications to the archive table before deleting them.",
+        )
+        parser.add_argument(
+            "--start-id",
+            type=int,
+            default=0,
+            help="Resume the age-based pass after this notification id.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        self.batch_size = options["batch_size"]
+        self.archive = options["archive"]
+        self.verbosity = options["verbosity"]
+        started = time.perf_counter()
+
+        expired = self.prune_expired(options["days"], options["start_id"])
+        capped = 0
+        if options["max_per_user"] > 0:
+            capped = self.prune_over_cap(options["max_per_user"])
+
+        total = expired + capped
+        elapsed = time.perf_counter() - started
+        action = "Archived" if self.archive else "Deleted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {total} notification(s): {expired} expired, {capped} over the per-user cap, "
+            f"in {elapsed:.1f}s ({self.rate(total, elapsed)} rows/s)."
+        ))
+
+    @staticmethod
+    def rate(rows, elapsed):
+        return f"{rows / elapsed:.0f}" if elapsed > 0 else "-"
+
+    def report(self, message, rows, started):
+        if self.verbosity > 1:
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{message}: {rows} rows ({self.rate(rows, elapsed)} rows/s)")
+
+    def prune_expired(self, days, start_id):
+        started = time.perf_counter()
+        last_id = start_id
+        pruned = 0
+        while True:
+            batch = list(
+                expired_notifications(days, last_id)
+                .values_list("pk", flat=True)[:self.batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1]
+            pruned += prune_batch(batch, archive=self.archive)
+            self.report(f"Expired, up to id {last_id}", pruned, started)
+        return pruned
+
+    def prune_over_cap(self, max_per_user):
+        started = time.perf_counter()
+        pruned = 0
+        for user_id in list(users_over_cap(max_per_user)):
+            while True:
+                batch = list(
+                    Notification.objects.filter(user_id=user_id)
+                    .order_by("-created_at", "-id")
+                    .values_list("pk", flat=True)[max_per_user:max_per_user + self.batch_size]
+                )
+                if not batch:
+                    break
+                pruned += prune_batch(batch, archive=self.archive, user_ids=[user_id])
+            self.report(f"Over the cap, up to user {user_id}", pruned, started)
+        return pruned
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0007_notification_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('user_id', models.BigIntegerField()),
+                ('message', models.TextField()),
+                ('is_read', models.BooleanField()),
+                ('created_at', models.DateTimeField()),
+                ('type', models.CharField(max_length=20)),
+                ('post_id', models.BigIntegerField(null=True)),
+                ('sitting_request_id', models.BigIntegerField(null=True)),
+                ('sender_profile_id', models.BigIntegerField(null=True)),
+                ('comment_id', models.BigIntegerField(null=True)),
+                ('actor_count', models.PositiveIntegerField(default=1)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', '-created_at'], name='archived_notif_user_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+def backfill_actors(apps, schema_editor):
+    """
+    Record the sender of every like and comment notification as its
+    actor. The other people counted in actor_count were never stored.
+    """
+    Notification = apps.get_model('notifications', 'Notification')
+    Actor = Notification.actors.through
+    rows = (
+        Notification.objects.filter(type__in=['like', 'comment'], sender_profile__isnull=False)
+        .order_by('pk').values_list('pk', 'sender_profile_id')
+    )
+    last_pk = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last_pk)[:1000])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        Actor.objects.bulk_create(
+            [Actor(notification_id=pk, profile_id=profile_id) for pk, profile_id in batch],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0008_archivednotification'),
+        ('profiles', '0009_remove_activity_message_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actors',
+            field=models.ManyToManyField(blank=True, related_name='+', to='profiles.profile'),
+        ),
+        migrations.RunPython(backfill_actors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:02
+
+from django.db import migrations
+
+
+def detach_comment_aggregates(apps, schema_editor):
+    """
+    Coalesced comment notifications pointed at the latest comment, so
+    deleting it deleted the whole aggregate. They are about the post.
+    """
+    Notification = apps.get_model('notifications', 'Notification')
+    Notification.objects.filter(
+        type='comment', actor_count__gt=1, comment__isnull=False
+    ).update(comment=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0009_notification_actors'),
+    ]
+
+    operations = [
+        migrations.RunPython(detach_comment_aggregates, migrations.RunPython.noop),
+    ]
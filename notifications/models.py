@@ -47,6 +47,51 @@ class Notification(models.Model):
         null=True,
         blank=True
     )
+    # The distinct people behind a coalesced like/comment notification,
+    # see notifications.service. actor_count is their number and
+    # sender_profile the most recent of them.
+    actors = models.ManyToManyField(Profile, related_name='+', blank=True)
+    actor_count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # A user's notification list, newest first, see AllNotificationsView.
+            models.Index(fields=['user', '-created_at', '-id'], name='notification_user_feed_idx'),
+            # The same for unread rows only, which are the ones usually asked for.
+            models.Index(
+                fields=['user', '-created_at', '-id'],
+                condition=models.Q(is_read=False),
+                name='notification_unread_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Notification for {self.user.username} - {self.message[:20]}"
+
+
+class ArchivedNotification(models.Model):
+    """
+    A notification moved out of the live table by ``prune_notifications
+    --archive``. It keeps the original id, and the references are plain
+    ids because the rows they pointed to may be deleted later.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user_id = models.BigIntegerField()
+    message = models.TextField()
+    is_read = models.BooleanField()
+    created_at = models.DateTimeField()
+    type = models.CharField(max_length=20)
+    post_id = models.BigIntegerField(null=True)
+    sitting_request_id = models.BigIntegerField(null=True)
+    sender_profile_id = models.BigIntegerField(null=True)
+    comment_id = models.BigIntegerField(null=True)
+    actor_count = models.PositiveIntegerField(default=1)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_id', '-created_at'], name='archived_notif_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived notification {self.id} for user {self.user_id}"
@@ -0,0 +1,88 @@
+"""
+Bulk removal of old notifications, see the prune_notifications command.
+
+Rows are deleted with a plain ``DELETE ... WHERE id IN (...)`` rather
+than ``QuerySet.delete()``, which would load every row to send
+``post_delete``. Callers that remove unread rows recompute the unread
+counters of the affected users instead.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from profiles.models import Profile
+from .counters import recompute_unread_counts
+from .models import ArchivedNotification, Notification
+
+ARCHIVED_FIELDS = [
+    "id", "user_id", "message", "is_read", "created_at", "type", "post_id",
+    "sitting_request_id", "sender_profile_id", "comment_id", "actor_count",
+]
+
+
+def expired_notifications(days, start_id=0):
+    """
+    Read notifications older than ``days``, in id order from ``start_id``.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    return Notification.objects.filter(
+        pk__gt=start_id, is_read=True, created_at__lt=cutoff
+    ).order_by("pk")
+
+
+def users_over_cap(max_per_user):
+    """
+    Ids of the users storing more than ``max_per_user`` notifications.
+    """
+    return (
+        Notification.objects.values("user_id")
+        .annotate(total=Count("pk"))
+        .filter(total__gt=max_per_user)
+        .order_by("user_id")
+        .values_list("user_id", flat=True)
+    )
+
+
+def archive_notifications(ids):
+    """
+    Copy the notifications to the archive. Rows archived by an earlier,
+    interrupted run are skipped.
+    """
+    rows = Notification.objects.filter(pk__in=ids).values(*ARCHIVED_FIELDS)
+    return len(ArchivedNotification.objects.bulk_create(
+        [ArchivedNotification(**row) for row in rows], ignore_conflicts=True
+    ))
+
+
+def delete_notifications(ids):
+    if not ids:
+        return 0
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {Notification.actors.through._meta.db_table} "
+            f"WHERE notification_id IN ({placeholders})",
+            list(ids),
+        )
+        cursor.execute(
+            f"DELETE FROM {Notification._meta.db_table} WHERE id IN ({placeholders})",
+            list(ids),
+        )
+        return cursor.rowcount
+
+
+def prune_batch(ids, archive=False, user_ids=()):
+    """
+    Archive (optionally) and delete one batch in its own transaction,
+    recomputing the unread counters of ``user_ids``. Returns the number
+    of deleted rows.
+    """
+    with transaction.atomic():
+        if archive:
+            archive_notifications(ids)
+        deleted = delete_notifications(ids)
+        if user_ids:
+            recompute_unread_counts(Profile.objects.filter(user_id__in=user_ids))
+    return deleted
@@ -0,0 +1,431 @@
+"""
+The single write path for notifications.
+
+``notify()`` never inserts on its own. The notification is handed over
+with ``transaction.on_commit``, so work that is rolled back never
+notifies anyone, and then:
+
+* inside a request (``NotificationMiddleware``) it is buffered and every
+  notification of the request is written with one ``bulk_create`` once
+  the response is ready;
+* outside a request (management commands, shell) it is written as soon
+  as the surrounding transaction commits.
+
+``NOTIFICATIONS_DELIVERY = "thread"`` hands each batch to a background
+worker thread instead, so the request does not wait for the INSERT, and
+``"job"`` queues it for the job worker (see jobs.service), where it
+survives restarts and is retried.
+
+Likes and comments are coalesced: a new one for the same recipient and
+post (or liked comment) as an unread notification from the last
+``NOTIFICATIONS_COALESCE_WINDOW`` seconds is merged into it, so a burst
+produces one "alice and 41 others liked your post." row instead of 42.
+The people merged into a notification are kept in ``actors``, so
+someone who likes twice counts once, and ``retract()`` takes an unliking
+sender back out; it travels the same way as ``notify()``, so it never
+overtakes the notification it undoes.
+
+Once stored, new and updated notifications are published to the
+recipients' SSE streams, see notifications.broker.
+"""
+import logging
+import queue
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from jobs.service import enqueue
+from .broker import publish
+from .counters import increment_unread_counts
+from .models import Notification
+from .serializers import NotificationSerializer
+
+logger = logging.getLogger(__name__)
+
+_buffer = ContextVar("notification_buffer", default=None)
+
+Actor = Notification.actors.through
+
+
+def notify(**fields):
+    """
+    Queue a notification. Takes the same keyword arguments as
+    ``Notification.objects.create``.
+    """
+    notification = Notification(**fields)
+    transaction.on_commit(lambda: _enqueue(notification))
+    return notification
+
+
+def retract(**fields):
+    """
+    Take back a like, with the keyword arguments its ``notify()`` had:
+    the sender stops counting in the unread notification it was merged
+    into, which is deleted once nobody is left.
+    """
+    # Never stored: an actor_count of 0 marks a retraction on its way to
+    # write(), which keeps it in order with the notifications.
+    notification = Notification(actor_count=0, **fields)
+    transaction.on_commit(lambda: _enqueue(notification))
+    return notification
+
+
+def _enqueue(notification):
+    buffered = _buffer.get()
+    if buffered is None:
+        deliver([notification])
+    else:
+        buffered.append(notification)
+
+
+# The fields, besides recipient and type, that identify what a
+# coalescable notification is about.
+COALESCE_KEYS = {
+    "like": ("post_id", "comment_id"),
+    "comment": ("post_id",),
+}
+
+
+def coalesce_key(notification):
+    fields = COALESCE_KEYS.get(notification.type)
+    if fields is None or notification.sender_profile_id is None or notification.post_id is None:
+        return None
+    return (notification.user_id, notification.type) + tuple(
+        getattr(notification, field) for field in fields
+    )
+
+
+def detach(aggregate):
+    """
+    Stop an aggregate of several people pointing at the comment of just
+    one of them. It is about the post, and deleting that comment would
+    take the whole aggregate with it.
+    """
+    if "comment_id" not in COALESCE_KEYS[aggregate.type]:
+        aggregate.comment_id = None
+
+
+def action(notification):
+    if notification.type == "comment":
+        return "commented on your post"
+    if notification.comment_id:
+        return "liked your comment"
+    return "liked your post"
+
+
+def actors_message(notification, actor_count):
+    """
+    "alice and 3 others liked your post.", for an aggregate whose
+    latest actor sent ``notification``.
+    """
+    username = notification.sender_profile.user.username
+    others = actor_count - 1
+    if not others:
+        return f"{username} {action(notification)}."
+    return (
+        f"{username} and {others} "
+        f"{'other' if others == 1 else 'others'} {action(notification)}."
+    )
+
+
+def coalesced_message(notification, actor_count):
+    """
+    Message of an aggregate whose latest actor sent ``notification``.
+    """
+    if actor_count == 1:
+        return notification.message
+    return actors_message(notification, actor_count)
+
+
+def count_actors(notifications):
+    counts = dict(
+        Actor.objects.filter(notification__in=notifications)
+        .values("notification").annotate(total=Count("pk"))
+        .values_list("notification", "total")
+    )
+    return {notification.pk: counts.get(notification.pk, 0) for notification in notifications}
+
+
+def coalesce(groups, window):
+    """
+    Merge each group of new notifications into the matching unread
+    aggregate, adding its senders to the aggregate's actors and updating
+    all aggregates with one query. Returns the updated aggregates, the
+    rows still to be inserted, one per group without an aggregate, and
+    the ``(row, actor ids)`` pairs to record once they are.
+    """
+    now = timezone.now()
+    keys = list(groups)
+    candidates = Notification.objects.select_for_update().filter(
+        user_id__in={key[0] for key in keys},
+        type__in={key[1] for key in keys},
+        post_id__in={key[2] for key in keys},
+        is_read=False,
+        created_at__gte=now - timedelta(seconds=window),
+    ).order_by("created_at", "id")
+    # Later rows overwrite earlier ones, so the newest aggregate wins.
+    aggregates = {coalesce_key(row): row for row in candidates}
+
+    merged, created, merged_actors, created_actors = [], [], [], []
+    for key, batch in groups.items():
+        latest = batch[-1]
+        senders = {notification.sender_profile_id for notification in batch}
+        aggregate = aggregates.get(key)
+        if aggregate is None:
+            latest.actor_count = len(senders)
+            latest.message = coalesced_message(latest, latest.actor_count)
+            if latest.actor_count > 1:
+                detach(latest)
+            created.append(latest)
+            created_actors.append((latest, senders))
+            continue
+        aggregate.sender_profile_id = latest.sender_profile_id
+        aggregate.created_at = now
+        detach(aggregate)
+        merged.append((aggregate, latest))
+        merged_actors.append((aggregate, senders))
+
+    if merged:
+        add_actors(merged_actors)
+        counts = count_actors([aggregate for aggregate, _ in merged])
+        for aggregate, latest in merged:
+            aggregate.actor_count = counts[aggregate.pk]
+            aggregate.message = coalesced_message(latest, aggregate.actor_count)
+        merged = [aggregate for aggregate, _ in merged]
+        Notification.objects.bulk_update(
+            merged, ["actor_count", "sender_profile", "comment", "message", "created_at"]
+        )
+    return merged, created, created_actors
+
+
+def add_actors(actors):
+    Actor.objects.bulk_create(
+        [
+            Actor(notification_id=notification.pk, profile_id=profile_id)
+            for notification, profile_ids in actors
+            for profile_id in profile_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def withdraw(retractions):
+    """
+    Remove the senders of ``retractions`` from the actors of the unread
+    aggregates they were merged into. Aggregates left without actors are
+    deleted, the others recounted. Returns the updated aggregates.
+    """
+    links = []
+    for retraction in retractions:
+        key = coalesce_key(retraction)
+        if key is None:
+            continue
+        links += Actor.objects.filter(
+            profile_id=retraction.sender_profile_id,
+            notification__user_id=retraction.user_id,
+            notification__type=retraction.type,
+            notification__post_id=retraction.post_id,
+            notification__comment_id=retraction.comment_id,
+            notification__is_read=False,
+        ).values_list("pk", "notification_id")
+    if not links:
+        return []
+
+    Actor.objects.filter(pk__in=[pk for pk, _ in links]).delete()
+    aggregates = list(
+        Notification.objects.select_for_update()
+        .filter(pk__in={notification_id for _, notification_id in links})
+    )
+    counts = count_actors(aggregates)
+    empty = [aggregate for aggregate in aggregates if not counts[aggregate.pk]]
+    updated = [aggregate for aggregate in aggregates if counts[aggregate.pk]]
+
+    # Unread counters follow through notifications.counters.
+    Notification.objects.filter(pk__in=[aggregate.pk for aggregate in empty]).delete()
+
+    # The most recent remaining actor becomes the sender.
+    latest = {}
+    for notification_id, profile_id in (
+        Actor.objects.filter(notification__in=updated)
+        .order_by("pk").values_list("notification", "profile")
+    ):
+        latest[notification_id] = profile_id
+    for aggregate in updated:
+        aggregate.actor_count = counts[aggregate.pk]
+        aggregate.sender_profile_id = latest[aggregate.pk]
+        aggregate.message = actors_message(aggregate, aggregate.actor_count)
+    Notification.objects.bulk_update(updated, ["actor_count", "sender_profile", "message"])
+    return updated
+
+
+def write(notifications):
+    """
+    Store a batch of notifications: one query to find the aggregates to
+    coalesce into, three to add their actors and update them, one to
+    insert the rest with one for their actors, and one to bump the
+    recipients' unread counters. Retractions are applied last.
+    """
+    if not notifications:
+        return
+    window = getattr(settings, "NOTIFICATIONS_COALESCE_WINDOW", 0)
+    groups, rows, retractions = {}, [], []
+    for notification in notifications:
+        if not notification.actor_count:
+            retractions.append(notification)
+            continue
+        key = coalesce_key(notification) if window else None
+        if key is None:
+            rows.append(notification)
+        else:
+            groups.setdefault(key, []).append(notification)
+
+    with transaction.atomic():
+        merged, actors = [], []
+        if groups:
+            merged, created, actors = coalesce(groups, window)
+            rows += created
+        Notification.objects.bulk_create(rows)
+        add_actors(actors)
+        unread = Counter(row.user_id for row in rows if not row.is_read)
+        increment_unread_counts(unread)
+        if retractions:
+            merged += withdraw(retractions)
+        changed = rows + merged
+        transaction.on_commit(lambda: publish([
+            (notification.user_id, NotificationSerializer(notification).data)
+            for notification in changed
+        ]))
+
+
+def write_queued(notifications):
+    """
+    Job entry point: ``notifications`` are the field values of each
+    notification, see ``deliver()``.
+    """
+    write([Notification(**fields) for fields in notifications])
+
+
+def deliver(notifications):
+    if not notifications:
+        return
+    mode = getattr(settings, "NOTIFICATIONS_DELIVERY", "request")
+    if mode == "thread":
+        _worker.submit(notifications)
+    elif mode == "job":
+        enqueue(write_queued, notifications=[
+            {
+                field.attname: getattr(notification, field.attname)
+                for field in Notification._meta.concrete_fields
+                if not field.primary_key
+            }
+            for notification in notifications
+        ])
+    else:
+        write(notifications)
+
+
+@contextmanager
+def buffered():
+    """
+    Collect the notifications committed inside the block and deliver
+    them together when it exits.
+    """
+    notifications = []
+    token = _buffer.set(notifications)
+    try:
+        yield notifications
+    finally:
+        _buffer.reset(token)
+        flush(notifications)
+
+
+def flush(notifications):
+    try:
+        deliver(notifications)
+    except Exception:
+        logger.exception("Could not write %d notifications", len(notifications))
+
+
+class NotificationWorker:
+    """
+    Daemon thread draining a queue of notification batches.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, notifications):
+        self.start()
+        self.queue.put(notifications)
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name="notification-worker", daemon=True
+                )
+                self.thread.start()
+
+    def run(self):
+        while True:
+            notifications = self.queue.get()
+            try:
+                write(notifications)
+            except Exception:
+                logger.exception("Could not write %d notifications", len(notifications))
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+    def join(self):
+        """
+        Block until every submitted batch has been written.
+        """
+        self.queue.join()
+
+
+_worker = NotificationWorker()
+
+
+def wait_for_delivery():
+    _worker.join()
+
+
+class NotificationMiddleware:
+    """
+    Buffer the notifications of a request and write them in one batch.
+    Under ASGI, sync views run on another thread with a copy of the
+    request's context, which still holds the same buffer.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with buffered():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        notifications = []
+        token = _buffer.set(notifications)
+        try:
+            return await self.get_response(request)
+        finally:
+            _buffer.reset(token)
+            await sync_to_async(flush)(notifications)
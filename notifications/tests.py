@@ -1,3 +1,525 @@
-from django.test import TestCase
+import asyncio
+import os
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from comments.models import Comment
+from jobs.models import Job
+from notifications.checks import check_stream_broker
+from notifications.counters import get_unread_count, recompute_unread_counts
+from notifications.models import ArchivedNotification, Notification
+from notifications.service import buffered, notify, retract, wait_for_delivery, write
+from notifications.views import NotificationFeedPagination
+from notifications.views_stream import issue_ticket, ticket_user
+from posts.models import Post
+
+User = get_user_model()
+
+
+def notification_inserts(queries):
+    return [
+        query for query in queries.captured_queries
+        if query["sql"].startswith('INSERT INTO "notifications_notification"')
+    ]
+
+
+# Test Notification Service
+class NotificationServiceTestCase(TransactionTestCase):
+    def setUp(self):
+        User.objects.create_user(username="author", email="author@example.com", password="password123")
+        User.objects.create_user(username="sitter", email="sitter@example.com", password="password123")
+        # Reload so the profile picture is a Cloudinary resource, not the default string.
+        self.author = User.objects.get(username="author")
+        self.sitter = User.objects.get(username="sitter")
+        self.post = Post.objects.create(author=self.author, title="Cats", category="offer", description="Cats")
+
+    def test_request_notifications_are_written_in_one_batch(self):
+        client = APIClient()
+        client.force_authenticate(user=self.sitter)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(f"/api/posts/{self.post.id}/request/", {"post": self.post.id, "message": "Hi"})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # The post_save signal and the view each notify the author.
+        self.assertEqual(Notification.objects.filter(user=self.author, type="request").count(), 2)
+        self.assertEqual(len(notification_inserts(queries)), 1)
+
+    async def test_asgi_request_notifications_are_written_in_one_batch(self):
+        token = await sync_to_async(AccessToken.for_user)(self.sitter)
+        with patch("notifications.service.write", wraps=write) as batch:
+            response = await self.async_client.post(
+                f"/api/posts/{self.post.id}/request/",
+                {"post": self.post.id, "message": "Hi"},
+                headers={"authorization": f"Bearer {token}"},
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        count = await Notification.objects.filter(user=self.author, type="request").acount()
+        self.assertEqual(count, 2)
+        self.assertEqual(batch.call_count, 1)
+
+    def test_rolled_back_notifications_are_dropped(self):
+        with buffered():
+            try:
+                with transaction.atomic():
+                    notify(user=self.author, type="like", post=self.post, message="Liked")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            notify(user=self.author, type="comment", post=self.post, message="Commented")
+
+        self.assertEqual(list(Notification.objects.values_list("type", flat=True)), ["comment"])
+
+    def test_nothing_is_written_before_the_buffer_is_flushed(self):
+        with buffered():
+            notify(user=self.author, type="like", post=self.post, message="Liked")
+            self.assertFalse(Notification.objects.exists())
+        self.assertTrue(Notification.objects.exists())
+
+    def test_notify_outside_a_request_writes_on_commit(self):
+        with transaction.atomic():
+            notify(user=self.author, type="like", post=self.post, message="Liked")
+            self.assertFalse(Notification.objects.exists())
+        self.assertTrue(Notification.objects.exists())
+
+    @override_settings(NOTIFICATIONS_DELIVERY="thread")
+    def test_thread_delivery(self):
+        with buffered():
+            notify(user=self.author, type="like", post=self.post, message="Liked")
+            notify(user=self.author, type="comment", post=self.post, message="Commented")
+        wait_for_delivery()
+
+        self.assertEqual(Notification.objects.filter(user=self.author).count(), 2)
+
+    @override_settings(NOTIFICATIONS_DELIVERY="job", JOBS_MODE="worker")
+    def test_job_delivery(self):
+        with buffered():
+            notify(user=self.author, type="like", post=self.post, message="Liked")
+            notify(user=self.author, type="comment", post=self.post, message="Commented")
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(Job.objects.count(), 1)
+
+        call_command("run_worker", once=True, stdout=StringIO())
+
+        self.assertEqual(
+            sorted(Notification.objects.filter(user=self.author).values_list("type", flat=True)),
+            ["comment", "like"],
+        )
+        self.assertEqual(get_unread_count(self.author), 2)
+
+
+# Test Notification Coalescing
+class NotificationCoalescingTestCase(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", email="author@example.com", password="password123")
+        self.fans = [
+            User.objects.create_user(username=f"fan{i}", email=f"fan{i}@example.com", password="password123")
+            for i in range(4)
+        ]
+        self.post = Post.objects.create(author=self.author, title="Cats", category="offer", description="Cats")
+        self.client = APIClient()
+
+    def like(self, user):
+        self.client.force_authenticate(user=User.objects.get(pk=user.pk))
+        response = self.client.post(f"/api/posts/{self.post.id}/like/toggle/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_likes_on_a_post_are_merged_into_one_notification(self):
+        for fan in self.fans:
+            self.like(fan)
+
+        notification = Notification.objects.get(user=self.author)
+        self.assertEqual(notification.actor_count, 4)
+        self.assertEqual(notification.sender_profile, self.fans[-1].profile)
+        self.assertEqual(notification.message, "fan3 and 3 others liked your post.")
+
+        self.client.force_authenticate(user=self.author)
+        response = self.client.get("/api/notifications/")
+        self.assertEqual(response.data["results"][0]["actor_count"], 4)
+
+    def notify_like(self, fan):
+        with buffered():
+            notify(user=self.author, type="like", post=self.post, message="Liked", sender_profile=fan.profile)
+
+    def test_repeated_actor_is_counted_once(self):
+        self.notify_like(self.fans[0])
+        self.notify_like(self.fans[1])
+        self.notify_like(self.fans[0])
+        self.notify_like(self.fans[1])
+
+        notification = Notification.objects.get(user=self.author)
+        self.assertEqual(notification.actor_count, 2)
+        self.assertEqual(notification.message, "fan1 and 1 other liked your post.")
+        self.assertCountEqual(notification.actors.all(), [self.fans[0].profile, self.fans[1].profile])
+
+    def test_unlike_is_retracted(self):
+        for fan in self.fans[:3]:
+            self.like(fan)
+        self.like(self.fans[2])
+
+        notification = Notification.objects.get(user=self.author)
+        self.assertEqual(notification.actor_count, 2)
+        self.assertEqual(notification.sender_profile, self.fans[1].profile)
+        self.assertEqual(notification.message, "fan1 and 1 other liked your post.")
+
+        self.like(self.fans[1])
+        notification.refresh_from_db()
+        self.assertEqual(notification.actor_count, 1)
+        self.assertEqual(notification.message, "fan0 liked your post.")
+
+        self.like(self.fans[0])
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(get_unread_count(self.author), 0)
+
+    @override_settings(NOTIFICATIONS_DELIVERY="job", JOBS_MODE="worker")
+    def test_queued_retraction_follows_its_like(self):
+        profile = self.fans[0].profile
+        with buffered():
+            notify(user=self.author, type="like", post=self.post, message="Liked", sender_profile=profile)
+        with buffered():
+            retract(user=self.author, type="like", post=self.post, sender_profile=profile)
+        self.assertEqual(Job.objects.count(), 2)
+
+        call_command("run_worker", once=True, stdout=StringIO())
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(get_unread_count(self.author), 0)
+
+    def test_unlike_of_a_read_notification_keeps_it(self):
+        self.like(self.fans[0])
+        Notification.objects.update(is_read=True)
+        self.like(self.fans[0])
+        self.assertEqual(Notification.objects.get().actor_count, 1)
+
+    def test_read_notifications_are_not_reopened(self):
+        self.like(self.fans[0])
+        Notification.objects.update(is_read=True)
+        self.like(self.fans[1])
+
+        self.assertEqual(
+            sorted(Notification.objects.values_list("is_read", "actor_count")),
+            [(False, 1), (True, 1)],
+        )
+
+    def test_deleting_the_latest_comment_keeps_the_aggregate(self):
+        comments = []
+        for fan in self.fans[:2]:
+            self.client.force_authenticate(user=User.objects.get(pk=fan.pk))
+            response = self.client.post("/api/comments/", {"post": self.post.id, "content": "Cute"})
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            comments.append(response.data["id"])
+
+        notification = Notification.objects.get(user=self.author, type="comment")
+        self.assertEqual(notification.actor_count, 2)
+        self.assertIsNone(notification.comment_id)
+
+        Comment.objects.get(pk=comments[-1]).delete()
+        self.assertTrue(Notification.objects.filter(pk=notification.pk).exists())
+
+    @override_settings(NOTIFICATIONS_COALESCE_WINDOW=60)
+    def test_window(self):
+        self.like(self.fans[0])
+        Notification.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        self.like(self.fans[1])
+
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_batch_with_mixed_targets(self):
+        comment = Comment.objects.create(owner=self.author, post=self.post, content="Cute")
+        with buffered():
+            for fan in self.fans:
+                profile = fan.profile
+                notify(user=self.author, type="like", post=self.post, message="Liked", sender_profile=profile)
+                notify(user=self.author, type="like", post=self.post, comment=comment,
+                       message="Liked comment", sender_profile=profile)
+                notify(user=self.author, type="follow", message="Followed", sender_profile=profile)
+
+        self.assertCountEqual(
+            Notification.objects.values_list("type", "comment", "actor_count"),
+            [("follow", None, 1)] * 4 + [("like", None, 4), ("like", comment.id, 4)],
+        )
+        self.assertEqual(
+            Notification.objects.get(comment=comment).message,
+            "fan3 and 3 others liked your comment.",
+        )
+
+
+# Test Unread Count
+class UnreadCountTestCase(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", email="author@example.com", password="password123")
+        self.fan = User.objects.create_user(username="fan", email="fan@example.com", password="password123")
+        self.post = Post.objects.create(author=self.author, title="Cats", category="offer", description="Cats")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.author)
+
+    def notify_author(self, count, **fields):
+        with buffered():
+            for i in range(count):
+                notify(user=self.author, type="follow", message=f"Follow {i}", **fields)
+
+    def unread_count(self, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/notifications/unread-count/", headers=headers)
+        self.assertEqual(len(queries), 1)
+        return response
+
+    def test_counter_follows_creation_and_reads(self):
+        self.notify_author(3)
+        self.assertEqual(self.unread_count().data, {"unread_count": 3})
+
+        notification = Notification.objects.first()
+        self.client.post(f"/api/notifications/{notification.id}/mark-read/")
+        self.client.post(f"/api/notifications/{notification.id}/mark-read/")
+        self.assertEqual(self.unread_count().data["unread_count"], 2)
+
+        self.client.post("/api/notifications/mark-all-read/")
+        self.assertEqual(self.unread_count().data["unread_count"], 0)
+
+    def test_coalesced_notifications_count_once(self):
+        profile = self.fan.profile
+        for _ in range(2):
+            with buffered():
+                notify(user=self.author, type="like", post=self.post, message="Liked", sender_profile=profile)
+        self.assertEqual(self.unread_count().data["unread_count"], 1)
+
+    def test_deleted_notifications_are_discounted(self):
+        self.notify_author(1)
+        self.notify_author(1, post=self.post)
+        self.post.delete()
+        self.assertEqual(self.unread_count().data["unread_count"], 1)
+
+    def test_etag(self):
+        self.notify_author(1)
+        response = self.unread_count()
+        etag = response["ETag"]
+
+        self.assertEqual(self.unread_count(if_none_match=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.notify_author(1)
+        response = self.unread_count(if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_unknown_notification(self):
+        response = self.client.post("/api/notifications/999/mark-read/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+# Test Notification Stream
+class NotificationStreamTestCase(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", email="author@example.com", password="password123")
+        self.ticket = issue_ticket(self.author)
+
+    def notify_author(self):
+        with buffered():
+            notify(user=self.author, type="follow", message="fan started following you.")
+
+    async def test_stream_pushes_new_notifications(self):
+        response = await self.async_client.get("/api/notifications/stream/", {"ticket": self.ticket})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 5000\n\n")
+        pending = asyncio.ensure_future(anext(stream))
+        # Let the stream subscribe before anything is published.
+        await asyncio.sleep(0.1)
+        await sync_to_async(self.notify_author)()
+
+        event = (await asyncio.wait_for(pending, 5)).decode()
+        self.assertTrue(event.startswith("id: "))
+        self.assertIn("event: notification", event)
+        self.assertIn("fan started following you.", event)
+        await stream.aclose()
+
+    @override_settings(NOTIFICATIONS_STREAM_HEARTBEAT=0)
+    async def test_heartbeat(self):
+        response = await self.async_client.get("/api/notifications/stream/", {"ticket": self.ticket})
+        stream = aiter(response.streaming_content)
+        await anext(stream)
+        self.assertEqual(await asyncio.wait_for(anext(stream), 5), b": keep-alive\n\n")
+        await stream.aclose()
+
+    async def test_invalid_ticket(self):
+        response = await self.async_client.get("/api/notifications/stream/", {"ticket": "nope"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.async_client.get("/api/notifications/stream/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_access_token_is_not_accepted_in_the_url(self):
+        token = await sync_to_async(AccessToken.for_user)(self.author)
+        response = await self.async_client.get("/api/notifications/stream/", {"token": str(token)})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.async_client.get("/api/notifications/stream/", {"ticket": str(token)})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(NOTIFICATIONS_STREAM_TICKET_AGE=30)
+    async def test_expired_ticket(self):
+        with patch("time.time", return_value=time.time() + 31):
+            response = await self.async_client.get("/api/notifications/stream/", {"ticket": self.ticket})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_ticket_endpoint(self):
+        client = APIClient()
+        response = client.post("/api/notifications/stream/ticket/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        client.force_authenticate(user=self.author)
+        response = client.post("/api/notifications/stream/ticket/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ticket_user(response.data["ticket"]), self.author)
+
+
+# Test Notification List
+class NotificationListTestCase(TestCase):
+    def setUp(self):
+        User.objects.create_user(username="author", email="author@example.com", password="password123")
+        self.author = User.objects.get(username="author")
+        fan = User.objects.create_user(username="fan", email="fan@example.com", password="password123")
+        post = Post.objects.create(author=self.author, title="Cats", category="offer", description="Cats")
+        comment = Comment.objects.create(owner=fan, post=post, content="Cute")
+        self.notifications = Notification.objects.bulk_create([
+            Notification(
+                user=self.author,
+                type=["like", "comment", "follow"][i % 3],
+                message=f"Notification {i}",
+                is_read=i % 2 == 0,
+                post=post,
+                comment=comment,
+                sender_profile=fan.profile,
+            )
+            for i in range(7)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.author)
+
+    def get(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data, len(queries)
+
+    def test_list_is_one_query_with_foreign_key_ids(self):
+        data, queries = self.get("/api/notifications/")
+        self.assertEqual(queries, 1)
+        self.assertEqual(len(data["results"]), 7)
+        first = data["results"][0]
+        self.assertEqual(first["id"], self.notifications[-1].id)
+        self.assertEqual(first["post_id"], self.notifications[-1].post_id)
+        self.assertEqual(first["comment_id"], self.notifications[-1].comment_id)
+        self.assertEqual(first["sender_profile_id"], self.notifications[-1].sender_profile_id)
+
+    @patch.object(NotificationFeedPagination, "page_size", 3)
+    def test_cursor_pagination_walks_every_row(self):
+        seen = []
+        url = "/api/notifications/"
+        while url:
+            data, queries = self.get(url)
+            self.assertEqual(queries, 1)
+            seen += [item["id"] for item in data["results"]]
+            url = data["next"]
+        self.assertEqual(seen, [n.id for n in reversed(self.notifications)])
+
+    def test_filters(self):
+        data, _ = self.get("/api/notifications/", {"is_read": "false"})
+        self.assertEqual(
+            [item["id"] for item in data["results"]],
+            [n.id for n in reversed(self.notifications) if not n.is_read],
+        )
+        data, _ = self.get("/api/notifications/", {"is_read": "true", "type": "like"})
+        self.assertEqual({(item["is_read"], item["type"]) for item in data["results"]}, {(True, "like")})
+
+    def test_page_number_opt_in(self):
+        data, _ = self.get("/api/notifications/", {"page": 1})
+        self.assertEqual(data["count"], 7)
+
+    def test_overview_query_count(self):
+        data, queries = self.get("/api/notifications/overview/")
+        self.assertEqual(queries, 2)
+        self.assertEqual(len(data["notifications"]), 3)
+        self.assertEqual(data["comments"][0]["post_title"], "Cats")
+
+
+# Test Prune Notifications Command
+class PruneNotificationsTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", email="author@example.com", password="password123")
+        self.fan = User.objects.create_user(username="fan", email="fan@example.com", password="password123")
+        old = timezone.now() - timedelta(days=100)
+        self.notifications = Notification.objects.bulk_create([
+            Notification(user=self.author, type="follow", message=f"Old {i}", is_read=i % 2 == 0)
+            for i in range(6)
+        ] + [
+            Notification(user=self.fan, type="follow", message=f"New {i}")
+            for i in range(5)
+        ])
+        Notification.objects.filter(user=self.author).update(created_at=old)
+        recompute_unread_counts()
+
+    def prune(self, **options):
+        out = StringIO()
+        call_command("prune_notifications", batch_size=2, max_per_user=0, stdout=out, **options)
+        return out.getvalue()
+
+    def test_deletes_expired_read_notifications(self):
+        output = self.prune(days=90)
+        self.assertIn("Deleted 3 notification(s)", output)
+        self.assertIn("rows/s", output)
+        self.assertFalse(Notification.objects.filter(user=self.author, is_read=True).exists())
+        self.assertEqual(Notification.objects.count(), 8)
+        self.assertFalse(ArchivedNotification.objects.exists())
+
+    def test_archive_and_resume(self):
+        start_id = self.notifications[1].id
+        self.prune(days=90, archive=True, start_id=start_id)
+        archived = set(ArchivedNotification.objects.values_list("id", flat=True))
+        self.assertEqual(archived, {n.id for n in self.notifications[2:6:2]})
+        self.assertTrue(Notification.objects.filter(pk=self.notifications[0].id).exists())
+        self.assertEqual(ArchivedNotification.objects.get(pk=self.notifications[2].id).message, "Old 2")
+
+    def test_per_user_cap_keeps_newest_and_recomputes_unread(self):
+        out = StringIO()
+        call_command("prune_notifications", days=1000, max_per_user=2, batch_size=2, stdout=out)
+        self.assertEqual(
+            list(Notification.objects.filter(user=self.fan).values_list("id", flat=True).order_by("id")),
+            [n.id for n in self.notifications[-2:]],
+        )
+        self.assertEqual(Notification.objects.filter(user=self.author).count(), 2)
+        self.assertEqual(get_unread_count(self.fan), 2)
+        self.assertEqual(
+            get_unread_count(self.author),
+            Notification.objects.filter(user=self.author, is_read=False).count(),
+        )
+
+
+# Test Broker Checks
+class BrokerCheckTestCase(SimpleTestCase):
+    def check_ids(self):
+        return [message.id for message in check_stream_broker(None)]
+
+    @override_settings(NOTIFICATIONS_BROKER="notifications.broker.LocalBroker", NOTIFICATIONS_DELIVERY="job")
+    def test_job_delivery_needs_a_shared_broker(self):
+        self.assertEqual(self.check_ids(), ["notifications.E001"])
+        with override_settings(NOTIFICATIONS_BROKER="notifications.broker.RedisBroker"):
+            self.assertEqual(self.check_ids(), [])
+
+    @override_settings(NOTIFICATIONS_BROKER="notifications.broker.LocalBroker", NOTIFICATIONS_DELIVERY="request")
+    def test_several_web_processes_need_a_shared_broker(self):
+        with patch.dict(os.environ, {"WEB_CONCURRENCY": "2"}):
+            self.assertEqual(self.check_ids(), ["notifications.W001"])
+        with patch.dict(os.environ, {"WEB_CONCURRENCY": "1"}):
+            self.assertEqual(self.check_ids(), [])
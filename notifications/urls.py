@@ -1,11 +1,16 @@
 from django.urls import path
 from .views import DashboardOverviewView
 from .views import AllNotificationsView, MarkNotificationReadView, MarkAllNotificationsReadView
+from .views import UnreadNotificationsCountView
+from .views_stream import StreamTicketView, notification_stream
 
 urlpatterns = [
     path('', AllNotificationsView.as_view(), name='notifications-feed'), 
     path('all/', AllNotificationsView.as_view(), name='all-notifications'),
     path('<int:notification_id>/mark-read/', MarkNotificationReadView.as_view(), name='mark-notification-read'),
     path('mark-all-read/', MarkAllNotificationsReadView.as_view(), name='mark-all-notifications-read'),
+    path('unread-count/', UnreadNotificationsCountView.as_view(), name='notifications-unread-count'),
+    path('stream/', notification_stream, name='notifications-stream'),
+    path('stream/ticket/', StreamTicketView.as_view(), name='notifications-stream-ticket'),
     path('overview/', DashboardOverviewView.as_view(), name='dashboard-overview'),
 ]
@@ -1,13 +1,19 @@
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.generics import ListAPIView
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
+from notifications.counters import decrement_unread_count, get_unread_count
 from notifications.models import Notification
 from comments.models import Comment
 from comments.serializers import CommentSerializer
 from .serializers import NotificationSerializer
-from posts.models import Post
+from posts.pagination import KeysetPagination, OptInPageNumberMixin
 
 
 class DashboardOverviewView(APIView):
@@ -15,12 +21,15 @@ class DashboardOverviewView(APIView):
 
     def get(self, request):
         # Unread notifications (max. 3)
-        notifications = Notification.objects.filter(user=request.user, is_read=False).order_by('-created_at')[:3]
+        notifications = Notification.objects.filter(
+            user=request.user, is_read=False
+        ).order_by('-created_at', '-id')[:3]
         notifications_data = NotificationSerializer(notifications, many=True).data
 
         # Newest comments to own post (max. 3)
-        own_posts = Post.objects.filter(author=request.user)
-        comments = Comment.objects.filter(post__in=own_posts).order_by('-created_at')[:3]
+        comments = Comment.objects.filter(
+            post__author=request.user
+        ).select_related('post').order_by('-created_at')[:3]
 
         # Additional fields on top
         comments_data = [
@@ -40,72 +49,27 @@ class DashboardOverviewView(APIView):
         })
 
 
-class AllNotificationsView(ListAPIView):
-    """
-    API View to return all notifications for the logged-in user, sorted by created_at.
-    """
-    serializer_class = NotificationSerializer
-    permission_classes = [IsAuthenticated]
-
-    def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user).order_by('-created_at')
+class NotificationFeedPagination(KeysetPagination):
+    page_size = 50
+    default_ordering = ('-created_at',)
 
 
-class MarkNotificationReadView(APIView):
+class AllNotificationsView(OptInPageNumberMixin, ListAPIView):
     """
-    API View to mark a specific notification as read.
-    """
-    permission_classes = [IsAuthenticated]
-
-    def post(self, request, notification_id):
-        try:
-            notification = Notification.objects.get(pk=notification_id, user=request.user)
-            notification.is_read = True
-            notification.save()
-            return Response({'message': 'Notification marked as read.'}, status=status.HTTP_200_OK)
-        except Notification.DoesNotExist:
-            return Response({'error': 'Notification not found.'}, status=status.HTTP_404_NOT_FOUND)
-
-
-class DashboardOverviewView(APIView):
-    permission_classes = [IsAuthenticated]
-
-    def get(self, request):
-        # Unread notifications (max. 3)
-        notifications = Notification.objects.filter(user=request.user, is_read=False).order_by('-created_at')[:3]
-        notifications_data = NotificationSerializer(notifications, many=True).data
-
-        # Newest comments to own post (max. 3)
-        own_posts = Post.objects.filter(author=request.user)
-        comments = Comment.objects.filter(post__in=own_posts).order_by('-created_at')[:3]
-
-        # Additional fields on top
-        comments_data = [
-            {
-                "id": c.id,
-                "content": c.content,
-                "created_at": c.created_at,
-                "post_id": c.post.id,
-                "post_title": c.post.title
-            }
-            for c in comments
-        ]
-
-        return Response({
-            "notifications": notifications_data,
-            "comments": comments_data
-        })
-
-
-class AllNotificationsView(ListAPIView):
-    """
-    API View to return all notifications for the logged-in user, sorted by created_at.
+    API View to return all notifications for the logged-in user, newest
+    first, with keyset pagination (``?cursor=``) over the (user,
+    created_at, id) index; ``?page=`` keeps the page-number pagination.
+    ``?is_read=false`` is served from the partial index on unread rows.
     """
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = NotificationFeedPagination
+    page_number_pagination_class = PageNumberPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['is_read', 'type']
 
     def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user).order_by('-created_at')
+        return Notification.objects.filter(user=self.request.user).order_by('-created_at', '-id')
 
 
 class MarkNotificationReadView(APIView):
@@ -115,13 +79,13 @@ class MarkNotificationReadView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, notification_id):
-        try:
-            notification = Notification.objects.get(pk=notification_id, user=request.user)
-            notification.is_read = True
-            notification.save()
-            return Response({'message': 'Notification marked as read.'}, status=status.HTTP_200_OK)
-        except Notification.DoesNotExist:
-            return Response({'error': 'Notification not found.'}, status=status.HTTP_404_NOT_FOUND)
+        notifications = Notification.objects.filter(pk=notification_id, user=request.user)
+        with transaction.atomic():
+            if notifications.filter(is_read=False).update(is_read=True):
+                decrement_unread_count(request.user.id)
+            elif not notifications.exists():
+                return Response({'error': 'Notification not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'message': 'Notification marked as read.'}, status=status.HTTP_200_OK)
 
 
 class MarkAllNotificationsReadView(APIView):
@@ -129,5 +93,25 @@ class MarkAllNotificationsReadView(APIView):
 
     def post(self, request):
         notifications = Notification.objects.filter(user=request.user, is_read=False)
-        notifications.update(is_read=True)
+        with transaction.atomic():
+            decrement_unread_count(request.user.id, notifications.update(is_read=True))
         return Response({'message': 'All notifications marked as read.'}, status=status.HTTP_200_OK)
+
+
+class UnreadNotificationsCountView(APIView):
+    """
+    Number of unread notifications of the logged-in user, read from the
+    counter on their profile. The ETag is derived from the count, so
+    polling clients sending If-None-Match get a 304 until it changes.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        unread_count = get_unread_count(request.user)
+        etag = quote_etag(f"unread-{unread_count}")
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response({'unread_count': unread_count}, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
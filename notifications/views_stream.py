@@ -0,0 +1,116 @@
+import asyncio
+import json
+from contextlib import suppress
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .broker import get_broker
+
+# Keeps stream tickets from passing for any other signed value.
+TICKET_SALT = "notifications.stream"
+
+
+def issue_ticket(user):
+    return signing.TimestampSigner(salt=TICKET_SALT).sign(str(user.pk))
+
+
+def ticket_user(ticket):
+    try:
+        user_id = signing.TimestampSigner(salt=TICKET_SALT).unsign(
+            ticket, max_age=settings.NOTIFICATIONS_STREAM_TICKET_AGE
+        )
+    except signing.BadSignature:
+        return None
+    return get_user_model().objects.filter(pk=user_id).first()
+
+
+class StreamTicketView(APIView):
+    """
+    Ticket for opening the notification stream, for clients that cannot
+    send an Authorization header with it (EventSource). It only opens
+    the stream, and only for NOTIFICATIONS_STREAM_TICKET_AGE seconds, so
+    the stream URLs kept in proxy and access logs are soon useless; a
+    client fetches a new one for every reconnect.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response({
+            "ticket": issue_ticket(request.user),
+            "expires_in": settings.NOTIFICATIONS_STREAM_TICKET_AGE,
+        })
+
+
+@sync_to_async
+def authenticate(request):
+    """
+    The user of the JWT access token in the Authorization header or of
+    the stream ticket in the ``ticket`` query parameter.
+    """
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        return None
+    if result is not None:
+        return result[0]
+    ticket = request.GET.get("ticket")
+    return ticket_user(ticket) if ticket else None
+
+
+def format_event(payload):
+    return f"id: {payload['id']}\nevent: notification\ndata: {json.dumps(payload)}\n\n"
+
+
+async def event_stream(user_id, heartbeat):
+    """
+    Yield each notification published for the user as an SSE event, and
+    a comment line after ``heartbeat`` idle seconds so proxies keep the
+    connection open.
+    """
+    subscription = get_broker().subscribe(user_id)
+    next_payload = asyncio.ensure_future(anext(subscription))
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            done, _ = await asyncio.wait({next_payload}, timeout=heartbeat)
+            if not done:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_event(next_payload.result())
+            next_payload = asyncio.ensure_future(anext(subscription))
+    finally:
+        next_payload.cancel()
+        with suppress(asyncio.CancelledError):
+            await next_payload
+        await subscription.aclose()
+
+
+async def notification_stream(request):
+    """
+    Server-Sent Events stream of the logged-in user's new notifications.
+    Needs an ASGI server; every worker keeps one open response per
+    connected client.
+    """
+    user = await authenticate(request)
+    if user is None or not user.is_active:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided or are invalid."},
+            status=401,
+        )
+    response = StreamingHttpResponse(
+        event_stream(user.id, settings.NOTIFICATIONS_STREAM_HEARTBEAT),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx-style proxies from buffering the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
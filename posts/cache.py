@@ -0,0 +1,96 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = 'posts:anonymous-cache:version'
+STATS_KEYS = {
+    'hits': 'posts:anonymous-cache:hits',
+    'misses': 'posts:anonymous-cache:misses',
+}
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+def get_cache_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def invalidate_anonymous_cache():
+    """
+    Invalidate every cached anonymous response by moving to a new cache
+    version. Old entries are never read again and expire on their own.
+
+    The version moves once the current transaction commits; moving it
+    earlier would let a concurrent anonymous GET cache the data from
+    before the write under the new version.
+    """
+    transaction.on_commit(lambda: _incr(VERSION_KEY))
+
+
+def record(outcome):
+    _incr(STATS_KEYS[outcome])
+
+
+def cache_stats():
+    counts = cache.get_many(STATS_KEYS.values())
+    stats = {
+        name: counts.get(key, 0) for name, key in STATS_KEYS.items()
+    }
+    total = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / total, 4) if total else None
+    stats['version'] = get_cache_version()
+    return stats
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Cache successful GET responses for anonymous users per full URL.
+    Entries are invalidated through ``invalidate_anonymous_cache`` by
+    the post, like and comment signals in posts.signals.
+    """
+    anonymous_cache_timeout = None
+
+    def get_anonymous_cache_timeout(self):
+        if self.anonymous_cache_timeout is not None:
+            return self.anonymous_cache_timeout
+        return getattr(settings, 'ANONYMOUS_RESPONSE_CACHE_TIMEOUT', 0)
+
+    def get_anonymous_cache_key(self, request):
+        url = request.build_absolute_uri().encode('utf-8')
+        digest = hashlib.md5(url).hexdigest()
+        return f'posts:anonymous-cache:{get_cache_version()}:{digest}'
+
+    def get(self, request, *args, **kwargs):
+        timeout = self.get_anonymous_cache_timeout()
+        if not timeout or request.user.is_authenticated:
+            return super().get(request, *args, **kwargs)
+
+        key = self.get_anonymous_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            record('hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record('misses')
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, timeout)
+        response['X-Cache'] = 'MISS'
+        return response
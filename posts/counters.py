@@ -0,0 +1,60 @@
+from django.db.models import F, OuterRef, Q
+
+from catsitting.counters import count_rows
+from comments.models import Comment
+from likes.models import Like
+from .models import Post
+
+
+def increment_post_counter(post_id, field, amount=1):
+    """
+    Atomically add ``amount`` to a counter column of a post.
+    """
+    return Post.objects.filter(pk=post_id).update(**{field: F(field) + amount})
+
+
+def decrement_post_counter(post_id, field, amount=1):
+    """
+    Atomically subtract ``amount`` from a counter column of a post,
+    never going below zero.
+    """
+    updated = Post.objects.filter(pk=post_id, **{f'{field}__gte': amount}).update(
+        **{field: F(field) - amount}
+    )
+    if not updated:
+        updated = Post.objects.filter(pk=post_id).update(**{field: 0})
+    return updated
+
+
+def actual_likes_count():
+    return count_rows(Like.objects.filter(post=OuterRef('pk')))
+
+
+def actual_comments_count():
+    return count_rows(Comment.objects.filter(post=OuterRef('pk')))
+
+
+def drifted_posts(queryset=None):
+    """
+    Posts whose stored counters differ from the rows they count.
+    """
+    queryset = Post.objects.all() if queryset is None else queryset
+    return queryset.annotate(
+        actual_likes=actual_likes_count(),
+        actual_comments=actual_comments_count(),
+    ).filter(
+        ~Q(likes_count=F('actual_likes')) |
+        ~Q(comments_count=F('actual_comments'))
+    )
+
+
+def recompute_post_counters(queryset=None):
+    """
+    Recompute the like and comment counters of the given posts in a
+    single UPDATE statement. Returns the number of updated rows.
+    """
+    queryset = Post.objects.all() if queryset is None else queryset
+    return queryset.update(
+        likes_count=actual_likes_count(),
+        comments_count=actual_comments_count(),
+    )
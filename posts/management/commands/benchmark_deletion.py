@@ -0,0 +1,109 @@
+import json
+import secrets
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from catsitting.deletion import delete_account
+from comments.models import Comment
+from likes.models import Like
+from notifications.models import Notification
+from posts.models import Post
+from profiles.counters import Follow
+from profiles.models import Profile
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Create a heavy account, then delete it once with Django's "
+        "cascade and once with catsitting.deletion, reporting time and "
+        "query counts. Everything is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=200)
+        parser.add_argument("--fans", type=int, default=50, help="Users interacting with the account.")
+        parser.add_argument("--likes-per-post", type=int, default=5)
+        parser.add_argument("--comments-per-post", type=int, default=5)
+        parser.add_argument("--notifications", type=int, default=1000)
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        if options["fans"] < 1:
+            raise CommandError("--fans must be at least 1.")
+        results = {}
+        with transaction.atomic():
+            user_id = self.seed(options)
+            for name, delete in [
+                ("cascade", lambda user: user.delete()),
+                ("set-based", delete_account),
+            ]:
+                savepoint = transaction.savepoint()
+                user = User.objects.get(pk=user_id)
+                started = time.perf_counter()
+                with CaptureQueriesContext(connection) as queries:
+                    delete(user)
+                results[name] = {
+                    "ms": round((time.perf_counter() - started) * 1000, 1),
+                    "queries": len(queries),
+                }
+                transaction.savepoint_rollback(savepoint)
+            transaction.set_rollback(True)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results))
+            return
+        for name, result in results.items():
+            self.stdout.write(f"{name:<10} {result['ms']:>10.1f} ms {result['queries']:>8} queries")
+
+    def seed(self, options):
+        prefix = f"heavy{secrets.token_hex(3)}"
+        password = make_password(None)
+        users = User.objects.bulk_create([
+            User(username=f"{prefix}_{i}", email=f"{prefix}_{i}@example.com", password=password)
+            for i in range(options["fans"] + 1)
+        ])
+        profiles = Profile.objects.bulk_create([Profile(user=user) for user in users])
+        heavy, fans = users[0], users[1:]
+        heavy_profile, fan_profiles = profiles[0], profiles[1:]
+
+        posts = Post.objects.bulk_create([
+            Post(author=heavy, title=f"Post {i}", category="general", description="Cats")
+            for i in range(options["posts"])
+        ])
+        fan_posts = Post.objects.bulk_create([
+            Post(author=fan, title="Fan post", category="general", description="Cats")
+            for fan in fans
+        ])
+        Like.objects.bulk_create([
+            Like(owner=fans[(post_index + i) % len(fans)], post=post)
+            for post_index, post in enumerate(posts)
+            for i in range(min(options["likes_per_post"], len(fans)))
+        ] + [Like(owner=heavy, post=post) for post in fan_posts])
+        comments = Comment.objects.bulk_create([
+            Comment(owner=fans[(post_index + i) % len(fans)], post=post, content="Cute")
+            for post_index, post in enumerate(posts)
+            for i in range(options["comments_per_post"])
+        ] + [Comment(owner=heavy, post=post, content="Cute") for post in fan_posts])
+        Notification.objects.bulk_create([
+            Notification(
+                user=heavy,
+                type="comment",
+                message="New comment",
+                post=posts[i % len(posts)] if posts else None,
+                comment=comments[i % len(comments)] if comments else None,
+                sender_profile=fan_profiles[i % len(fan_profiles)],
+            )
+            for i in range(options["notifications"])
+        ])
+        Follow.objects.bulk_create(
+            [Follow(from_profile=heavy_profile, to_profile=profile) for profile in fan_profiles]
+            + [Follow(from_profile=profile, to_profile=heavy_profile) for profile in fan_profiles]
+        )
+        return heavy.pk
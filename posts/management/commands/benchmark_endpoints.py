@@ -0,0 +1,120 @@
+import json
+import math
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from notifications.models import Notification
+from posts.models import Post
+
+User = get_user_model()
+
+
+def percentile(values, percent):
+    """
+    Nearest-rank percentile of a non-empty list.
+    """
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the main API endpoints in-process and report p50/p95 "
+        "latency and query counts per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50, help="Requests per endpoint.")
+        parser.add_argument("--warmup", type=int, default=3, help="Untimed requests per endpoint.")
+        parser.add_argument(
+            "--user",
+            help="Username to authenticate as. Defaults to the user with the most notifications.",
+        )
+        parser.add_argument(
+            "--clear-cache",
+            action="store_true",
+            help="Clear the cache before every request to measure uncached responses.",
+        )
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"User {username!r} does not exist.")
+        busiest = (
+            Notification.objects.values("user")
+            .annotate(total=Count("pk")).order_by("-total").first()
+        )
+        user = User.objects.filter(pk=busiest["user"]).first() if busiest else User.objects.first()
+        if user is None:
+            raise CommandError("No users to benchmark with, run seed_catsitting first.")
+        return user
+
+    def get_endpoints(self):
+        post = Post.objects.order_by("-comments_count", "-id").first()
+        endpoints = {
+            "post-feed": "/api/posts/feed/",
+            "activity-feed": "/api/profiles/activity/",
+            "profile-kpis": "/api/profiles/kpis/",
+            "notifications-feed": "/api/notifications/",
+            "notifications-unread-count": "/api/notifications/unread-count/",
+        }
+        if post is not None:
+            endpoints["comments-list"] = f"/api/comments/?post={post.pk}"
+        return endpoints
+
+    def measure(self, client, url, count, warmup, clear_cache):
+        for _ in range(warmup):
+            client.get(url)
+        timings, queries = [], []
+        for _ in range(count):
+            if clear_cache:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f"{url} returned {response.status_code}.")
+            queries.append(len(captured))
+        return {
+            "url": url,
+            "requests": count,
+            "p50_ms": round(percentile(timings, 50), 2),
+            "p95_ms": round(percentile(timings, 95), 2),
+            "mean_ms": round(sum(timings) / count, 2),
+            "queries": max(queries),
+        }
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1:
+            raise CommandError("--requests must be at least 1.")
+        user = self.get_user(options["user"])
+        client = APIClient(SERVER_NAME="localhost")
+        client.force_authenticate(user=user)
+
+        results = {
+            name: self.measure(client, url, options["requests"], options["warmup"], options["clear_cache"])
+            for name, url in self.get_endpoints().items()
+        }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"Benchmarking as {user.username}, {options['requests']} requests per endpoint")
+        self.stdout.write(f"{'endpoint':<22}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'queries':>9}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<22}{result['p50_ms']:>10}{result['p95_ms']:>10}"
+                f"{result['mean_ms']:>10}{result['queries']:>9}"
+            )
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import drifted_posts, recompute_post_counters
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the denormalized likes_count and comments_count "
+        "columns on posts and repair the ones that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of posts checked per transaction.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report drifted posts, do not update them.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+        last_id = 0
+        checked = 0
+        repaired = 0
+
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_id)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1]
+            checked += len(batch)
+
+            with transaction.atomic():
+                drifted = list(
+                    drifted_posts(Post.objects.filter(pk__in=batch))
+                    .values_list("pk", flat=True)
+                )
+                if drifted and not dry_run:
+                    recompute_post_counters(Post.objects.filter(pk__in=drifted))
+            repaired += len(drifted)
+
+        action = "Found" if dry_run else "Repaired"
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {repaired} drifted post(s) out of {checked} checked."
+        ))
@@ -0,0 +1,279 @@
+import random
+import secrets
+import time
+from itertools import islice
+from typing import NamedTuple
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from comments.models import Comment
+from likes.models import Like
+from notifications.counters import recompute_unread_counts
+from notifications.models import Notification
+from posts.counters import recompute_post_counters
+from posts.models import Post, SittingRequest
+from posts.search import get_search_backend
+from profiles.activity import rebuild_activities
+from profiles.counters import Follow, recompute_followers_counts
+from profiles.models import FollowRequest, Profile
+
+User = get_user_model()
+
+CATEGORIES = ["offer", "search", "general"]
+WORDS = (
+    "cat kitten sitter holiday weekend feeding litter garden flat cozy "
+    "playful shy senior tabby siamese maine coon vet medication brush "
+    "window balcony toys treats calm friendly indoor outdoor"
+).split()
+
+
+def sentence(rng, words=8):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+class IdRange(NamedTuple):
+    """
+    The primary keys of the rows a step created. Rows inserted in one
+    run get consecutive keys as long as nothing else writes to the same
+    tables meanwhile, so only the first and last key are kept.
+    """
+    first: int
+    last: int
+
+    def __len__(self):
+        return self.last - self.first + 1
+
+    def choice(self, rng):
+        return rng.randint(self.first, self.last)
+
+    def filter(self, model):
+        return model.objects.filter(pk__range=(self.first, self.last))
+
+
+def unique_pairs(rng, count, left, right, exclude_equal=False):
+    """
+    Up to ``count`` distinct random (left, right) pairs of ids from two
+    ``IdRange``. ``exclude_equal`` skips pairs of the same position, for
+    pairs drawn twice from one range.
+    """
+    if not left or not right:
+        return
+    width = len(right) - 1 if exclude_equal else len(right)
+    total = len(left) * width
+    # Sampling pair numbers keeps only integers in memory, never the pairs.
+    for number in rng.sample(range(total), min(count, total)):
+        i, j = divmod(number, width)
+        if exclude_equal and j >= i:
+            j += 1
+        yield left.first + i, right.first + j
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate synthetic users, posts, likes, threaded comments, "
+        "follows and notifications for load testing and benchmarks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--posts", type=int, default=5000)
+        parser.add_argument("--likes", type=int, default=20000)
+        parser.add_argument("--comments", type=int, default=10000)
+        parser.add_argument(
+            "--reply-ratio",
+            type=float,
+            default=0.5,
+            help="Share of comments created as replies to other comments.",
+        )
+        parser.add_argument("--follows", type=int, default=5000)
+        parser.add_argument("--follow-requests", type=int, default=2000)
+        parser.add_argument("--sitting-requests", type=int, default=1000)
+        parser.add_argument("--notifications", type=int, default=10000)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=None, help="Random seed.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        started = time.perf_counter()
+
+        users, profiles = self.create_users(options["users"])
+        if not users:
+            self.stdout.write("Nothing to seed.")
+            return
+        posts = self.create_posts(users, options["posts"])
+        self.create_likes(users, posts, options["likes"])
+        comments = self.create_comments(users, posts, options["comments"], options["reply_ratio"])
+        self.create_follows(profiles, options["follows"])
+        self.create_follow_requests(profiles, options["follow_requests"])
+        self.create_sitting_requests(users, posts, options["sitting_requests"])
+        self.create_notifications(users, posts, comments, profiles, options["notifications"])
+
+        self.step("Recomputing counters and indexes")
+        if posts:
+            recompute_post_counters(posts.filter(Post))
+        recompute_followers_counts(profiles.filter(Profile))
+        recompute_unread_counts(profiles.filter(Profile))
+        get_search_backend().rebuild()
+        rebuild_activities(batch_size=self.batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded in {time.perf_counter() - started:.1f}s."
+        ))
+
+    def step(self, message):
+        self.stdout.write(f"{message}...")
+
+    def bulk_create(self, model, objects):
+        """
+        Insert the objects of an iterable ``batch_size`` at a time, so only
+        one batch is ever in memory. Returns the ``IdRange`` of the new
+        rows, or None when there were none.
+        """
+        objects = iter(objects)
+        first = last = None
+        while batch := list(islice(objects, self.batch_size)):
+            with transaction.atomic():
+                created = model.objects.bulk_create(batch)
+            if first is None:
+                first = created[0].pk
+            last = created[-1].pk
+        return None if first is None else IdRange(first, last)
+
+    def batches(self, ids):
+        """
+        Chunk an iterable of ids into lists of ``batch_size``.
+        """
+        ids = iter(ids)
+        while batch := list(islice(ids, self.batch_size)):
+            yield batch
+
+    def create_users(self, count):
+        self.step(f"Creating {count} users")
+        prefix = f"seed{secrets.token_hex(3)}"
+        password = make_password("password123")
+        users = self.bulk_create(User, (
+            User(
+                username=f"{prefix}_{i}",
+                email=f"{prefix}_{i}@example.com",
+                first_name=self.rng.choice(WORDS).capitalize(),
+                password=password,
+            )
+            for i in range(count)
+        ))
+        if not users:
+            return None, None
+        # bulk_create skips the post_save signal that creates profiles.
+        profiles = self.bulk_create(Profile, (
+            Profile(user_id=user, bio=sentence(self.rng))
+            for user in range(users.first, users.last + 1)
+        ))
+        return users, profiles
+
+    def create_posts(self, users, count):
+        self.step(f"Creating {count} posts")
+        return self.bulk_create(Post, (
+            Post(
+                author_id=users.choice(self.rng),
+                title=sentence(self.rng, 4),
+                category=self.rng.choice(CATEGORIES),
+                description=sentence(self.rng, 30),
+            )
+            for _ in range(count)
+        ))
+
+    def create_likes(self, users, posts, count):
+        self.step(f"Creating {count} likes")
+        self.bulk_create(Like, (
+            Like(owner_id=owner, post_id=post)
+            for owner, post in unique_pairs(self.rng, count, users, posts)
+        ))
+
+    def create_comments(self, users, posts, count, reply_ratio):
+        count = count if posts else 0
+        top_level = max(1, int(count * (1 - reply_ratio))) if count else 0
+        self.step(f"Creating {count} comments ({count - top_level} replies)")
+        comments = self.bulk_create(Comment, (
+            Comment(
+                owner_id=users.choice(self.rng),
+                post_id=posts.choice(self.rng),
+                content=sentence(self.rng, 12),
+            )
+            for _ in range(top_level)
+        ))
+        # Replies are created in waves so they can nest below earlier replies.
+        remaining = count - top_level
+        while remaining > 0 and comments:
+            wave = min(remaining, max(1, len(comments) // 2))
+            replies = self.bulk_create(Comment, self.replies(users, comments, wave))
+            comments = IdRange(comments.first, replies.last)
+            remaining -= wave
+        return comments
+
+    def replies(self, users, comments, count):
+        parents = (comments.choice(self.rng) for _ in range(count))
+        for batch in self.batches(parents):
+            posts = dict(Comment.objects.filter(pk__in=batch).values_list("pk", "post_id"))
+            for parent in batch:
+                yield Comment(
+                    owner_id=users.choice(self.rng),
+                    post_id=posts[parent],
+                    parent_id=parent,
+                    content=sentence(self.rng, 12),
+                )
+
+    def create_follows(self, profiles, count):
+        self.step(f"Creating {count} follows")
+        self.bulk_create(Follow, (
+            Follow(from_profile_id=profile, to_profile_id=follower)
+            for profile, follower in unique_pairs(self.rng, count, profiles, profiles, True)
+        ))
+
+    def create_follow_requests(self, profiles, count):
+        self.step(f"Creating {count} follow requests")
+        self.bulk_create(FollowRequest, (
+            FollowRequest(
+                sender_id=sender,
+                receiver_id=receiver,
+                status=self.rng.choice(["pending", "accepted", "declined"]),
+            )
+            for sender, receiver in unique_pairs(self.rng, count, profiles, profiles, True)
+        ))
+
+    def create_sitting_requests(self, users, posts, count):
+        self.step(f"Creating {count} sitting requests")
+        if posts:
+            self.bulk_create(SittingRequest, self.sitting_requests(users, posts, count))
+
+    def sitting_requests(self, users, posts, count):
+        chosen = (posts.choice(self.rng) for _ in range(count))
+        for batch in self.batches(chosen):
+            authors = dict(Post.objects.filter(pk__in=batch).values_list("pk", "author_id"))
+            for post in batch:
+                sender = users.choice(self.rng)
+                if sender != authors[post]:
+                    yield SittingRequest(
+                        sender_id=sender,
+                        receiver_id=authors[post],
+                        post_id=post,
+                        message=sentence(self.rng),
+                    )
+
+    def create_notifications(self, users, posts, comments, profiles, count):
+        self.step(f"Creating {count} notifications")
+        types = [choice for choice, _ in Notification.TYPE_CHOICES]
+        self.bulk_create(Notification, (
+            Notification(
+                user_id=users.choice(self.rng),
+                type=self.rng.choice(types),
+                message=sentence(self.rng, 6),
+                is_read=self.rng.random() < 0.7,
+                post_id=posts.choice(self.rng) if posts else None,
+                comment_id=comments.choice(self.rng) if comments else None,
+                sender_profile_id=profiles.choice(self.rng),
+            )
+            for _ in range(count)
+        ))
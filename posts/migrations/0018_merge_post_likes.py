@@ -0,0 +1,74 @@
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def merge_post_likes(apps, schema_editor):
+    """
+    Copy likes that only exist in the Post.likes M2M into likes.Like,
+    then recompute likes_count and add the activity rows of the copied
+    likes. Only historical models are used.
+    """
+    Post = apps.get_model('posts', 'Post')
+    Like = apps.get_model('likes', 'Like')
+    PostLike = Post.likes.through
+    likes_before = Like.objects.count()
+
+    rows = PostLike.objects.order_by('pk').values_list('pk', 'user_id', 'post_id')
+    last_pk = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last_pk)[:1000])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        Like.objects.bulk_create(
+            [Like(owner_id=user_id, post_id=post_id) for _, user_id, post_id in batch],
+            ignore_conflicts=True,
+        )
+
+    Post.objects.update(
+        likes_count=Coalesce(
+            Subquery(
+                Like.objects.filter(post=OuterRef('pk'))
+                .order_by().values('post')
+                .annotate(total=Count('pk')).values('total'),
+                output_field=IntegerField(),
+            ),
+            0,
+        ),
+    )
+
+    if Like.objects.count() != likes_before:
+        Activity = apps.get_model('profiles', 'Activity')
+        rows = Like.objects.order_by('pk').values_list('pk', 'owner_id', 'created_at', 'post_id')
+        last_pk = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk)[:1000])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            # Likes that already had a row are skipped by the unique
+            # (type, source_id) constraint.
+            Activity.objects.bulk_create(
+                [
+                    Activity(
+                        user_id=owner_id, type='like', source_id=pk, created_at=created_at,
+                        message='You liked a post', data={'post_id': post_id},
+                    )
+                    for pk, owner_id, created_at, post_id in batch
+                ],
+                ignore_conflicts=True,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_feed_indexes'),
+        ('likes', '0003_commentlike'),
+        ('profiles', '0005_activity'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_post_likes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_merge_post_likes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='post',
+            name='likes',
+        ),
+    ]
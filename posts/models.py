@@ -6,8 +6,10 @@ from django.db.models.signals import post_delete
 from django.dispatch import receiver
 from django.apps import apps
 
+from catsitting.counters import CounterFieldsMixin
 
-class Post(models.Model):
+
+class Post(CounterFieldsMixin, models.Model):
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -32,16 +34,30 @@ class Post(models.Model):
         )
     )
     description = models.TextField(blank=False, max_length=1000)
-    likes = models.ManyToManyField(
-        settings.AUTH_USER_MODEL,
-        related_name='post_likes',
-        blank=True
-    )
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Maintained with atomic F() updates, see posts.counters.
+    COUNTER_FIELDS = ('likes_count', 'comments_count')
+
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            # Feed orderings, see posts.views.FEED_ORDERINGS.
+            models.Index(fields=['-updated_at', '-id'], name='post_recent_idx'),
+            models.Index(fields=['-created_at', '-id'], name='post_newest_idx'),
+            models.Index(fields=['-likes_count', '-id'], name='post_most_liked_idx'),
+            models.Index(fields=['-comments_count', '-id'], name='post_most_commented_idx'),
+            # The same orderings within a category filter.
+            models.Index(fields=['category', '-updated_at', '-id'], name='post_cat_recent_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='post_cat_newest_idx'),
+            models.Index(fields=['category', '-likes_count', '-id'], name='post_cat_most_liked_idx'),
+            models.Index(fields=['category', '-comments_count', '-id'], name='post_cat_most_commented_idx'),
+            # Posts of one author, newest first.
+            models.Index(fields=['author', '-created_at'], name='post_author_newest_idx'),
+        ]
 
     def __str__(self):
         return self.title
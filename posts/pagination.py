@@ -0,0 +1,163 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class PostFeedPagination(PageNumberPagination):
+    page_size = 10
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over the queryset's ordering.
+
+    The cursor stores the ordering values of the last row on the page, so
+    the next page is a plain range query: no COUNT(*) and no OFFSET, and
+    deep pages cost the same as the first one. The ordering is taken from
+    the queryset and always ends with the primary key to keep it stable.
+    """
+    page_size = 10
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    default_ordering = ('-created_at',)
+
+    def get_ordering(self, queryset):
+        ordering = [
+            field for field in queryset.query.order_by
+            if isinstance(field, str)
+        ] or list(self.default_ordering)
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    def encode_cursor(self, obj):
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            values.append(value)
+        raw = json.dumps(values).encode('ascii')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def get_cursor_fields(self, model):
+        """
+        The model fields whose types the cursor values must have, one per
+        ordering field.
+        """
+        fields = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            fields.append(model._meta.pk if name == 'pk' else model._meta.get_field(name))
+        return fields
+
+    def decode_cursor(self, request, model=None):
+        """
+        The ordering values stored in the cursor, converted to the types
+        of their model fields so a tampered cursor never reaches the
+        database.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                field.to_python(value)
+                for field, value in zip(self.get_cursor_fields(model), values)
+            ]
+        except (TypeError, ValueError, ValidationError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_seek_filter(self, values):
+        """
+        Build the lexicographic "after this row" condition, e.g. for
+        (-updated_at, -id): updated_at < v0 OR (updated_at = v0 AND id < v1).
+        """
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {
+                previous.lstrip('-'): values[position]
+                for position, previous in enumerate(self.ordering[:index])
+            }
+            condition |= Q(**equal, **{f'{name}__{lookup}': values[index]})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        values = self.decode_cursor(request, queryset.model)
+        if values is not None:
+            queryset = queryset.filter(self.get_seek_filter(values))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class PostFeedCursorPagination(KeysetPagination):
+    page_size = 10
+    default_ordering = ('-updated_at',)
+
+
+class OptInPageNumberMixin:
+    """
+    Use the view's keyset ``pagination_class`` unless the client sends a
+    ``page`` query parameter, in which case the classic page-number
+    pagination is used so existing clients keep working.
+    """
+    page_number_pagination_class = None
+
+    def use_page_number_pagination(self):
+        return 'page' in self.request.query_params
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.pagination_class
+            if (
+                self.page_number_pagination_class is not None
+                and self.use_page_number_pagination()
+            ):
+                pagination_class = self.page_number_pagination_class
+            self._paginator = pagination_class() if pagination_class else None
+        return self._paginator
@@ -0,0 +1,188 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+SEARCH_CONFIG = 'english'
+SEARCH_INDEX_NAME = 'posts_post_search_idx'
+FTS_TABLE = 'posts_post_fts'
+
+TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query):
+    """
+    Split a raw search string into plain word terms, dropping any
+    operator syntax so user input can't break the full-text query.
+    """
+    return TERM_PATTERN.findall(query or '')[:10]
+
+
+class BaseSearchBackend:
+    """
+    Interface for post search backends. ``search`` filters a Post
+    queryset and annotates a ``search_rank`` (higher is better).
+    """
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def remove_posts(self, post_ids):
+        for post_id in post_ids:
+            self.remove_post(post_id)
+
+    def rebuild(self):
+        pass
+
+
+class SubstringSearchBackend(BaseSearchBackend):
+    """
+    Unindexed ``icontains`` matching, for databases without full-text
+    search support.
+    """
+
+    def search(self, queryset, query):
+        condition = Q()
+        for term in search_terms(query):
+            condition &= Q(title__icontains=term) | Q(description__icontains=term)
+        return queryset.filter(condition).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    PostgreSQL full-text search. Matching uses the same SearchVector as
+    the GIN expression index created in the posts migrations, ranking
+    weights title matches above description matches.
+    """
+
+    @staticmethod
+    def search_vector():
+        from django.contrib.postgres.search import SearchVector
+        return SearchVector('title', 'description', config=SEARCH_CONFIG)
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import (
+            SearchQuery, SearchRank, SearchVector,
+        )
+        terms = search_terms(query)
+        if not terms:
+            return queryset.none()
+        search_query = SearchQuery(
+            ' & '.join(f'{term}:*' for term in terms),
+            search_type='raw',
+            config=SEARCH_CONFIG,
+        )
+        weighted = (
+            SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+            SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        )
+        return queryset.annotate(
+            search_document=self.search_vector(),
+        ).filter(
+            search_document=search_query,
+        ).annotate(
+            search_rank=SearchRank(weighted, search_query),
+        )
+
+
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    """
+    SQLite FTS5 search for local development and tests. The FTS table
+    is kept in sync with posts by the signals in posts.signals.
+    """
+
+    def match_expression(self, query):
+        return ' '.join(f'"{term}"*' for term in search_terms(query))
+
+    def search(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none()
+        table = queryset.model._meta.db_table
+        matches = RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [expression],
+        )
+        # bm25() is lower for better matches, so negate it.
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+            [expression],
+            output_field=FloatField(),
+        )
+        return queryset.filter(id__in=matches).annotate(search_rank=rank)
+
+    def index_post(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description) '
+                f'VALUES (%s, %s, %s)',
+                [post.pk, post.title, post.description],
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+    def remove_posts(self, post_ids):
+        post_ids = sorted(post_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(post_ids), 500):
+                chunk = post_ids[start:start + 500]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(
+                    f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', chunk
+                )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description) '
+                f'SELECT id, title, description FROM posts_post'
+            )
+
+
+VENDOR_BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteFTSSearchBackend,
+}
+
+
+def get_search_backend():
+    """
+    Return the configured search backend. ``POSTS_SEARCH_BACKEND`` may
+    name a backend class; otherwise it is chosen by database vendor,
+    falling back to substring matching when SQLite was built without
+    FTS5 and the migration could not create the index table.
+    """
+    path = getattr(settings, 'POSTS_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    backend_class = VENDOR_BACKENDS.get(connection.vendor, SubstringSearchBackend)
+    if backend_class is SQLiteFTSSearchBackend and not fts_table_exists():
+        backend_class = SubstringSearchBackend
+    return backend_class()
+
+
+def fts_table_exists():
+    if connection.alias not in _fts_tables:
+        _fts_tables[connection.alias] = (
+            FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[connection.alias]
+
+
+_fts_tables = {}
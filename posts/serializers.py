@@ -1,10 +1,49 @@
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 from .models import Post, SittingRequest, SittingResponseMessage
-from comments.models import Comment
 from likes.models import Like
 from profiles.serializers import ProfileMiniSerializer
 
 
+def prefetch_post_metadata(posts, request=None):
+    """
+    Resolve author profiles and the viewer's like ids for a batch of
+    posts in a fixed number of queries, independent of the batch size.
+    Values are stored on the post instances so that PostSerializer can
+    read them without querying per row.
+    """
+    posts = [post for post in posts if isinstance(post, Post)]
+    if not posts:
+        return posts
+
+    prefetch_related_objects(posts, 'author__profile')
+    post_ids = [post.id for post in posts]
+
+    like_ids = {}
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        like_ids = dict(
+            Like.objects.filter(owner=user, post_id__in=post_ids)
+            .values_list('post', 'id')
+        )
+    for post in posts:
+        post.viewer_like_id = like_ids.get(post.id)
+
+    return posts
+
+
+class PostListSerializer(serializers.ListSerializer):
+    """
+    List serializer for posts that prefetches all per-post metadata
+    for the whole page before serializing the rows.
+    """
+    def to_representation(self, data):
+        iterable = data.all() if hasattr(data, 'all') else data
+        posts = list(iterable)
+        prefetch_post_metadata(posts, self.context.get('request'))
+        return [self.child.to_representation(post) for post in posts]
+
+
 class PostSerializer(serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='author.username')
     author_profile = ProfileMiniSerializer(
@@ -13,8 +52,8 @@ class PostSerializer(serializers.ModelSerializer):
     )
     image = serializers.ImageField(required=False)
     description = serializers.CharField(max_length=1000)
-    likes_count = serializers.SerializerMethodField()
-    comments_count = serializers.SerializerMethodField()
+    likes_count = serializers.ReadOnlyField()
+    comments_count = serializers.ReadOnlyField()
     has_liked = serializers.SerializerMethodField()
     like_id = serializers.SerializerMethodField()
     is_owner = serializers.SerializerMethodField()
@@ -26,31 +65,22 @@ class PostSerializer(serializers.ModelSerializer):
             'author_profile', 'likes_count', 'has_liked', 'like_id',
             'comments_count', 'created_at', 'updated_at', 'is_owner'
         ]
+        list_serializer_class = PostListSerializer
 
-    def get_likes_count(self, obj):
-        return obj.post_likes.count()
-
-    def get_comments_count(self, obj):
-        return Comment.objects.filter(post=obj).count()
+    def _ensure_metadata(self, obj):
+        if not hasattr(obj, 'viewer_like_id'):
+            prefetch_post_metadata([obj], self.context.get("request"))
 
     def get_like_id(self, obj):
-        user = self.context.get("request").user
-        if user.is_authenticated:
-            like = Like.objects.filter(owner=user, post=obj).first()
-            return like.id if like else None
-        return None
+        self._ensure_metadata(obj)
+        return obj.viewer_like_id
 
     def get_has_liked(self, obj):
-        request = self.context.get("request")
-        return (
-            request
-            and request.user.is_authenticated
-            and obj.post_likes.filter(owner=request.user).exists()
-        )
+        return self.get_like_id(obj) is not None
 
     def get_is_owner(self, obj):
         request = self.context.get("request")
-        return request and request.user == obj.author
+        return bool(request) and request.user.id == obj.author_id
 
     def validate_image(self, value):
         if value.size > 10 * 1024 * 1024:
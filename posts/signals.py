@@ -1,28 +1,38 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.apps import apps
+from .cache import invalidate_anonymous_cache
 from .models import Post, SittingRequest
+from .search import get_search_backend
 from comments.models import Comment
-from notifications.models import Notification
+from likes.models import Like
+from notifications.service import notify
 
 
 @receiver(post_save, sender=SittingRequest)
 def create_sitting_request_notification(sender, instance, created, **kwargs):
     if created:
-        Notification.objects.create(
+        notify(
             user=instance.receiver,
             type="request",
             sitting_request=instance,
             message=f"{instance.sender.username} sent you a sitting request."
         )
 
+@receiver(post_save, sender=Post)
+def index_post_for_search(sender, instance, **kwargs):
+    get_search_backend().index_post(instance)
+
+
 @receiver(post_delete, sender=Post)
-def delete_post_notifications(sender, instance, **kwargs):
-    Notification = apps.get_model('notifications', 'Notification')
-    Notification.objects.filter(post=instance).delete()
+def remove_post_from_search(sender, instance, **kwargs):
+    get_search_backend().remove_post(instance.pk)
 
 
-@receiver(post_delete, sender=SittingRequest)
-def delete_sitting_request_notifications(sender, instance, **kwargs):
-    Notification = apps.get_model('notifications', 'Notification')
-    Notification.objects.filter(sitting_request=instance).delete()
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_cached_feed(sender, **kwargs):
+    invalidate_anonymous_cache()
@@ -1,9 +1,21 @@
-from rest_framework.test import APIClient
+import base64
+import json
+from io import StringIO
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework import status
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.urls import reverse
-from posts.models import Post, Comment, SittingRequest
+from posts.counters import recompute_post_counters
+from posts.models import Post, SittingRequest
+from posts.views import PostFeedView
+from comments.models import Comment
+from likes.models import Like
 
 User = get_user_model()
 
@@ -78,7 +90,7 @@ class PostInteractionTestCase(TestCase):
     def test_like_post(self):
         response = self.client.post(f'/api/posts/{self.post.id}/like/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(self.post.likes.count(), 1)
+        self.assertEqual(self.post.post_likes.count(), 1)
 
     def test_add_comment(self):
         data = {"content": "This is a test comment"}
@@ -195,3 +207,382 @@ class SittingRequestManagementTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.sitting_request.refresh_from_db()
         self.assertEqual(self.sitting_request.status, 'declined')
+
+# Test Feed Query Count
+class PostFeedQueryCountTestCase(TestCase):
+    def setUp(self):
+        self.user = create_test_user(email="testuser@example.com", username="testuser")
+        self.other = create_test_user(email="other@example.com", username="other")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_posts(self, amount):
+        for i in range(amount):
+            post = Post.objects.create(
+                author=self.other if i % 2 else self.user,
+                title=f"Post {i}",
+                category="general",
+                description="This is a test post",
+            )
+            Like.objects.create(owner=self.user, post=post)
+            Comment.objects.create(owner=self.other, post=post, content="Nice")
+        recompute_post_counters()
+
+    def feed_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/posts/feed/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(queries)
+
+    def test_query_count_is_independent_of_page_size(self):
+        self.create_posts(2)
+        _, small_page = self.feed_queries()
+
+        self.create_posts(8)
+        response, full_page = self.feed_queries()
+
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(small_page, full_page)
+
+    def test_feed_uses_prefetched_metadata(self):
+        self.create_posts(3)
+        response, _ = self.feed_queries()
+        for item in response.data['results']:
+            post = Post.objects.get(pk=item['id'])
+            like = Like.objects.get(owner=self.user, post=post)
+            self.assertEqual(item['likes_count'], 1)
+            self.assertEqual(item['comments_count'], 1)
+            self.assertTrue(item['has_liked'])
+            self.assertEqual(item['like_id'], like.id)
+            self.assertEqual(item['author_profile']['id'], post.author.profile.id)
+
+# Test Feed Cursor Pagination
+class PostFeedCursorPaginationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_test_user(email="testuser@example.com", username="testuser")
+        self.client = APIClient()
+
+        for i in range(15):
+            Post.objects.create(
+                author=self.user,
+                title=f"Post {i}",
+                category="general",
+                description="This is a test post",
+            )
+
+    def collect_ids(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_cursor_walks_whole_feed_once(self):
+        ids = self.collect_ids('/api/posts/feed/')
+        expected = list(
+            Post.objects.order_by('-updated_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_cursor_with_ascending_ordering(self):
+        ids = self.collect_ids('/api/posts/feed/?ordering=created_at')
+        expected = list(
+            Post.objects.order_by('created_at', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_cursor_skips_total_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/posts/feed/')
+        self.assertFalse(
+            any('COUNT(*)' in query['sql'] for query in queries.captured_queries)
+        )
+
+    def test_page_number_is_opt_in(self):
+        response = self.client.get('/api/posts/feed/?page=2')
+        self.assertEqual(response.data['count'], 15)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/posts/feed/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_with_wrongly_typed_values(self):
+        for values in (["yesterday", 1], ["2026-01-01T00:00:00+00:00", "one"], [[1], {}]):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            response = self.client.get(f'/api/posts/feed/?cursor={cursor}')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+# Test Denormalized Post Counters
+class PostCountersTestCase(TestCase):
+    def setUp(self):
+        create_test_user(email="testuser@example.com", username="testuser")
+        # Reload so the profile picture is a Cloudinary resource, not the default string.
+        self.user = User.objects.get(username="testuser")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(
+            author=self.user,
+            title="Test Post",
+            category="general",
+            description="This is a test post"
+        )
+
+    def test_like_and_unlike_update_counter(self):
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+        self.client.delete(f'/api/posts/{self.post.id}/like/')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_comment_create_and_delete_update_counter(self):
+        response = self.client.post('/api/comments/', {"post": self.post.id, "content": "First"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        parent_id = response.data['id']
+        self.client.post('/api/comments/', {"post": self.post.id, "content": "Reply", "parent": parent_id})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+
+        response = self.client.delete(f'/api/comments/{parent_id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_saving_post_keeps_concurrent_counter_updates(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        Like.objects.create(owner=self.user, post=self.post)
+        Post.objects.filter(pk=self.post.pk).update(likes_count=1)
+        stale.title = "Edited"
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+    def test_repair_command_fixes_drifted_counters(self):
+        Like.objects.create(owner=self.user, post=self.post)
+        Comment.objects.create(owner=self.user, post=self.post, content="Hi")
+        Post.objects.filter(pk=self.post.pk).update(likes_count=7, comments_count=0)
+
+        out = StringIO()
+        call_command('repair_post_counters', stdout=out)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertIn("Repaired 1", out.getvalue())
+
+# Test Full-Text Search
+class PostFullTextSearchTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_test_user(email="testuser@example.com", username="testuser")
+        self.client = APIClient()
+        self.in_description = Post.objects.create(
+            author=self.user, title="Weekend help", category="search",
+            description="Looking for a sitter for my cats"
+        )
+        self.in_title = Post.objects.create(
+            author=self.user, title="Sitter available", category="offer",
+            description="Experienced with cats"
+        )
+        Post.objects.create(
+            author=self.user, title="General Tips", category="general",
+            description="Brushing long fur"
+        )
+
+    def search_ids(self, query):
+        response = self.client.get('/api/posts/feed/', {'search': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in response.data['results']]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(
+            self.search_ids('sitter'),
+            [self.in_title.id, self.in_description.id]
+        )
+
+    def test_prefix_search_while_typing(self):
+        self.assertEqual(len(self.search_ids('sit')), 2)
+
+    def test_operators_in_query_are_ignored(self):
+        self.assertEqual(len(self.search_ids('"cats" -* (')), 2)
+
+    def test_index_follows_post_updates_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.in_title.title = "Brushing service"
+            self.in_title.save()
+        self.assertEqual(self.search_ids('sitter'), [self.in_description.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.in_description.delete()
+        self.assertEqual(self.search_ids('sitter'), [])
+        self.assertEqual(len(self.search_ids('brushing')), 2)
+
+# Test Feed Orderings and Indexes
+class PostFeedOrderingIndexTestCase(TestCase):
+    def setUp(self):
+        self.user = create_test_user(email="testuser@example.com", username="testuser")
+        self.client = APIClient()
+        for i in range(5):
+            Post.objects.create(
+                author=self.user,
+                title=f"Post {i}",
+                category="offer" if i % 2 else "search",
+                description="This is a test post",
+            )
+
+    def feed_queryset(self, **params):
+        view = PostFeedView()
+        view.request = Request(APIRequestFactory().get('/api/posts/feed/', params))
+        view.format_kwarg = None
+        return view.get_queryset()
+
+    def test_each_ordering_is_served_by_an_index(self):
+        indexes = {
+            'recent': 'post_recent_idx',
+            'least_recent': 'post_recent_idx',
+            'newest': 'post_newest_idx',
+            'oldest': 'post_newest_idx',
+            'most_liked': 'post_most_liked_idx',
+            'most_commented': 'post_most_commented_idx',
+        }
+        for ordering, index in indexes.items():
+            for category in (None, 'offer'):
+                params = {'ordering': ordering}
+                expected = index
+                if category:
+                    params['category'] = category
+                    expected = index.replace('post_', 'post_cat_', 1)
+                with self.subTest(**params):
+                    plan = self.feed_queryset(**params)[:10].explain()
+                    self.assertIn(expected, plan)
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_author_posts_are_served_by_an_index(self):
+        plan = Post.objects.filter(author=self.user).order_by('-created_at')[:10].explain()
+        self.assertIn('post_author_newest_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_most_liked_ordering(self):
+        liked = Post.objects.first()
+        Post.objects.filter(pk=liked.pk).update(likes_count=3)
+        response = self.client.get('/api/posts/feed/?ordering=most_liked')
+        self.assertEqual(response.data['results'][0]['id'], liked.id)
+
+    def test_legacy_ordering_values_still_work(self):
+        response = self.client.get('/api/posts/feed/?ordering=-created_at')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unsupported_ordering_is_rejected(self):
+        response = self.client.get('/api/posts/feed/?ordering=title')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', response.data)
+
+# Test Anonymous Response Cache
+class AnonymousResponseCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_test_user(email="testuser@example.com", username="testuser")
+        self.user = User.objects.get(username="testuser")
+        self.post = Post.objects.create(
+            author=self.user,
+            title="Test Post",
+            category="general",
+            description="This is a test post"
+        )
+        self.anonymous = APIClient()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_anonymous_feed_is_cached(self):
+        first = self.anonymous.get('/api/posts/feed/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.anonymous.get('/api/posts/feed/')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(second.data, first.data)
+
+    def test_like_and_comment_invalidate_cached_pages(self):
+        self.anonymous.get(f'/api/posts/{self.post.id}/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/posts/{self.post.id}/like/')
+        response = self.anonymous.get(f'/api/posts/{self.post.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['likes_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/comments/', {"post": self.post.id, "content": "Hi"})
+        response = self.anonymous.get(f'/api/posts/{self.post.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['comments_count'], 1)
+
+    def test_invalidation_waits_for_commit(self):
+        self.anonymous.get(f'/api/posts/{self.post.id}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = "Renamed"
+            self.post.save()
+            # Not committed yet: readers still get the old version.
+            response = self.anonymous.get(f'/api/posts/{self.post.id}/')
+            self.assertEqual(response['X-Cache'], 'HIT')
+        response = self.anonymous.get(f'/api/posts/{self.post.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['title'], "Renamed")
+
+    def test_authenticated_requests_bypass_cache(self):
+        response = self.client.get('/api/posts/feed/')
+        self.assertNotIn('X-Cache', response)
+
+    def test_cache_stats(self):
+        self.anonymous.get('/api/posts/feed/')
+        self.anonymous.get('/api/posts/feed/')
+
+        admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="password123")
+        self.client.force_authenticate(user=admin)
+        response = self.client.get('/api/posts/cache-stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['hits'], 1)
+        self.assertEqual(response.data['misses'], 1)
+
+
+# Test Seed and Benchmark Commands
+class SeedAndBenchmarkCommandTestCase(TestCase):
+    def test_seed_then_benchmark(self):
+        import json
+        from profiles.models import Activity, Profile
+
+        call_command(
+            'seed_catsitting', users=8, posts=20, likes=40, comments=30,
+            follows=10, follow_requests=5, sitting_requests=5,
+            notifications=20, batch_size=7, seed=1, stdout=StringIO(),
+        )
+        self.assertEqual(Post.objects.count(), 20)
+        self.assertEqual(Comment.objects.count(), 30)
+        self.assertTrue(Comment.objects.filter(parent__parent__isnull=False).exists())
+        post = Post.objects.order_by('-likes_count').first()
+        self.assertEqual(post.likes_count, Like.objects.filter(post=post).count())
+        self.assertEqual(Activity.objects.filter(type='post').count(), 20)
+        self.assertEqual(Like.objects.count(), 40)
+        self.assertEqual(Profile.objects.filter(user__username__startswith='seed').count(), 8)
+
+        out = StringIO()
+        call_command('benchmark_endpoints', requests=3, warmup=0, json=True, stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertEqual(
+            set(results),
+            {
+                'post-feed', 'activity-feed', 'profile-kpis', 'notifications-feed',
+                'notifications-unread-count', 'comments-list',
+            },
+        )
+        self.assertLessEqual(results['post-feed']['p50_ms'], results['post-feed']['p95_ms'])
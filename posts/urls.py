@@ -1,12 +1,11 @@
 from django.urls import path
-from likes.views import PostLikeAPIView
+from likes.views import PostLikeAPIView, PostLikeToggleAPIView
 from rest_framework.routers import DefaultRouter
 from posts.views_messages import SittingResponseMessageViewSet
 from .views import (
     AuthorPostsList,
     CreatePostView,
     PostFeedView,
-    LikePostView,
     PostDetailView,
     CreateSittingRequestView,
     SittingRequestDetailView,
@@ -14,6 +13,7 @@ from .views import (
     IncomingSittingRequestsView,
     ManageSittingRequestView,
     AllPosts,
+    AnonymousCacheStatsView,
 )
 
 router = DefaultRouter()
@@ -24,6 +24,7 @@ urlpatterns = [
     path('author-posts/', AuthorPostsList.as_view(), name="author-posts"),
     path('all/', AllPosts.as_view(), name='all-posts'),
     path('feed/', PostFeedView.as_view(), name='post-feed'),
+    path('cache-stats/', AnonymousCacheStatsView.as_view(), name='anonymous-cache-stats'),
     path('<int:pk>/', PostDetailView.as_view(), name='post-detail'),
     path('<int:post_id>/request/', CreateSittingRequestView.as_view(), name='create-sitting-request'),
     path("requests/<int:pk>/", SittingRequestDetailView.as_view(), name="sitting-request-detail"),
@@ -31,6 +32,7 @@ urlpatterns = [
     path('requests/incoming/', IncomingSittingRequestsView.as_view(), name='incoming-sitting-requests'),
     path('requests/manage/<int:request_id>/', ManageSittingRequestView.as_view(), name='manage-sitting-request'),
     path('<int:post_id>/like/', PostLikeAPIView.as_view(), name='post-like'),
+    path('<int:post_id>/like/toggle/', PostLikeToggleAPIView.as_view(), name='post-like-toggle'),
 ]
 
 urlpatterns += router.urls
@@ -1,22 +1,36 @@
-from django.db.models import Count, Q
 from rest_framework.views import APIView
-from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework import status, generics, permissions
 from rest_framework.generics import CreateAPIView, ListAPIView, RetrieveUpdateDestroyAPIView
-from rest_framework.pagination import PageNumberPagination
 from profiles.permissions import IsOwnerOrReadOnly
+from catsitting.deletion import delete_posts
 from django.shortcuts import get_object_or_404
+from .cache import AnonymousResponseCacheMixin, cache_stats
 from .models import Post, SittingRequest
 from comments.models import Comment
-from likes.models import Like
+from .pagination import (
+    OptInPageNumberMixin,
+    PostFeedCursorPagination,
+    PostFeedPagination,
+)
+from .search import get_search_backend
 from .serializers import PostSerializer, SittingRequestSerializer
-from notifications.models import Notification
+from notifications.service import notify
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def annotated_posts():
+    """
+    Posts with author profiles joined, so that PostSerializer needs no
+    per-row queries. Like and comment counts are stored on the post.
+    """
+    return Post.objects.select_related('author__profile')
+
+
 class AllPosts(APIView):
     def get(self, request):
         return Response({"message": "All posts endpoint works!"})
@@ -28,18 +42,11 @@ class AuthorPostsList(generics.ListAPIView):
 
     def get_queryset(self):
         author_id = self.request.query_params.get('author')
-        return Post.objects.filter(author_id=author_id).order_by("-created_at")
-
-
-class PostFeedPagination(PageNumberPagination):
-    page_size = 10
+        return annotated_posts().filter(author_id=author_id).order_by("-created_at")
 
 
 class CreatePostView(CreateAPIView):
-    queryset = Post.objects.annotate(
-        likes_count=Count('likes', distinct=True),
-        comments_count=Count('comments', distinct=True)
-    )
+    queryset = annotated_posts()
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
 
@@ -48,93 +55,100 @@ class CreatePostView(CreateAPIView):
         serializer.save(author=self.request.user)
 
 
-class PostFeedView(ListAPIView):
+# Supported feed orderings, each served by one of the Post indexes
+# (plain or prefixed with category). Ascending variants scan the same
+# index backwards.
+FEED_ORDERINGS = {
+    'recent': ('-updated_at', '-id'),
+    'least_recent': ('updated_at', 'id'),
+    'newest': ('-created_at', '-id'),
+    'oldest': ('created_at', 'id'),
+    'most_liked': ('-likes_count', '-id'),
+    'most_commented': ('-comments_count', '-id'),
+}
+# Raw field orderings accepted by earlier versions of the feed.
+FEED_ORDERING_ALIASES = {
+    '-updated_at': 'recent',
+    'updated_at': 'least_recent',
+    '-created_at': 'newest',
+    'created_at': 'oldest',
+    '-likes_count': 'most_liked',
+    '-comments_count': 'most_commented',
+}
+DEFAULT_FEED_ORDERING = 'recent'
+
+
+class PostFeedView(AnonymousResponseCacheMixin, OptInPageNumberMixin, ListAPIView):
+    """
+    Post feed with keyset pagination (``?cursor=``). Clients that still
+    send ``?page=`` get the page-number pagination with a total count.
+    Search results are ordered by relevance and always page by number.
+    """
     serializer_class = PostSerializer
-    pagination_class = PostFeedPagination
+    pagination_class = PostFeedCursorPagination
+    page_number_pagination_class = PostFeedPagination
     permission_classes = [AllowAny]
 
+    def get_ordering(self):
+        ordering = self.request.query_params.get('ordering') or DEFAULT_FEED_ORDERING
+        ordering = FEED_ORDERING_ALIASES.get(ordering, ordering)
+        if ordering not in FEED_ORDERINGS:
+            raise ValidationError({
+                "ordering": (
+                    f"Unsupported ordering. Choose one of: "
+                    f"{', '.join(sorted(FEED_ORDERINGS))}."
+                )
+            })
+        return FEED_ORDERINGS[ordering]
+
     def get_queryset(self):
+        ordering = self.get_ordering()
 
         try:
-            queryset = Post.objects.annotate(
-                likes_count=Count('likes', distinct=True),
-                comments_count=Count('comments', distinct=True)
-            )
-
-            search_query = self.request.query_params.get('search')
-            if search_query:
-                queryset = queryset.filter(
-                    Q(title__icontains=search_query) |
-                    Q(description__icontains=search_query)
-                )
+            queryset = annotated_posts()
 
             category_filter = self.request.query_params.get('category')
             if category_filter:
                 queryset = queryset.filter(category=category_filter)
 
-            ordering = self.request.query_params.get('ordering', '-updated_at')
-            queryset = queryset.order_by(ordering)
+            search_query = self.get_search_query()
+            if search_query:
+                queryset = get_search_backend().search(queryset, search_query)
+                return queryset.order_by('-search_rank', '-updated_at', '-id')
 
-            return queryset
+            return queryset.order_by(*ordering)
 
         except Exception as e:
             logger.error(f"❌ ERROR in get_queryset(): {str(e)}", exc_info=True)
             return Post.objects.none()
 
+    def get_search_query(self):
+        return self.request.query_params.get('search', '').strip()
+
+    def use_page_number_pagination(self):
+        return bool(self.get_search_query()) or super().use_page_number_pagination()
 
-class PostDetailView(RetrieveUpdateDestroyAPIView):
-    queryset = Post.objects.annotate(
-        likes_count=Count('likes', distinct=True),
-        comments_count=Count('comments', distinct=True)
-    ).order_by('-created_at')
+
+class PostDetailView(AnonymousResponseCacheMixin, RetrieveUpdateDestroyAPIView):
+    queryset = annotated_posts().order_by('-created_at')
     serializer_class = PostSerializer
     permission_classes = [IsOwnerOrReadOnly]
 
     def get_serializer_context(self):
         return {"request": self.request}
 
+    def perform_destroy(self, instance):
+        delete_posts([instance.pk])
 
-class LikePostView(APIView):
-    permission_classes = [IsAuthenticated]
-
-    def post(self, request, pk):
-        post = get_object_or_404(Post, pk=pk)
-        existing_like = Like.objects.filter(post=post, user=request.user).first()
-
-        if existing_like:
-            return Response({"detail": "You have already liked this post."}, status=status.HTTP_400_BAD_REQUEST)
-
-        Like.objects.create(post=post, user=request.user)
-        post.likes.add(request.user)
-
-        if post.author != request.user:
-            Notification.objects.create(
-                user=post.author,
-                type="like",
-                message=f"{request.user.username} liked your post “{post.title}”",
-            )
-
-        return Response({
-            "detail": "Post liked!",
-            "likes_count": post.likes.count(),
-            "has_liked": True
-        }, status=status.HTTP_201_CREATED)
-
-    def delete(self, request, pk):
-        post = get_object_or_404(Post, pk=pk)
-        like = Like.objects.filter(post=post, user=request.user)
-
-        if not like.exists():
-            return Response({"detail": "You have not liked this post."}, status=status.HTTP_400_BAD_REQUEST)
 
-        like.delete()
-        post.likes.remove(request.user)
+class AnonymousCacheStatsView(APIView):
+    """
+    Hit/miss counters of the anonymous response cache, for admins.
+    """
+    permission_classes = [IsAdminUser]
 
-        return Response({
-            "detail": "Like removed!",
-            "likes_count": post.likes.count(),
-            "has_liked": False
-        }, status=status.HTTP_200_OK)
+    def get(self, request):
+        return Response(cache_stats())
 
 
 class CreateSittingRequestView(APIView):
@@ -156,7 +170,7 @@ class CreateSittingRequestView(APIView):
             if serializer.is_valid():
                 serializer.save(sender=request.user, receiver=post.author, post=post)
 
-                Notification.objects.create(
+                notify(
                     user=post.author,
                     type="request",
                     sitting_request=serializer.instance,
@@ -221,7 +235,7 @@ class ManageSittingRequestView(APIView):
 
             sitting_request.save()
 
-            Notification.objects.create(
+            notify(
                 user=sitting_request.sender,
                 type="request",
                 sitting_request=sitting_request,
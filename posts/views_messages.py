@@ -3,7 +3,7 @@ from .models import SittingResponseMessage
 from .serializers import SittingResponseMessageSerializer
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
-from notifications.models import Notification
+from notifications.service import notify
 
 
 class SittingResponseMessageViewSet(viewsets.ModelViewSet):
@@ -21,7 +21,7 @@ class SittingResponseMessageViewSet(viewsets.ModelViewSet):
             content=content
         )
 
-        Notification.objects.create(
+        notify(
             user=sitting_request.receiver if self.request.user == sitting_request.sender else sitting_request.sender,
             type="sitting_message",
             sitting_request=sitting_request,
@@ -0,0 +1,183 @@
+"""
+Account deletion off the request path.
+
+``schedule_account_deletion()`` deactivates the account, so its tokens
+and logins stop working at once, and records an ``AccountDeletion``
+that the client polls. Once the request commits the deletion is run:
+
+* the account's posts, with everything hanging off them, are deleted
+  ``ACCOUNT_DELETION_BATCH_SIZE`` at a time, each batch in its own
+  transaction that records its progress;
+* the rest of the account (comments and likes on other posts, follows,
+  notifications, the user and profile) goes in one last transaction.
+
+Every step works from what is still in the database, so a deletion
+interrupted by a restart is picked up again by ``run_account_deletions``.
+
+``ACCOUNT_DELETION_RUNNER = "job"`` queues each deletion for the job
+worker (see jobs.service), which retries failed ones with backoff.
+``"thread"`` runs deletions on a background thread of the web process,
+``"inline"`` runs them when the request commits, which is what the
+tests use.
+"""
+import logging
+import queue
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from catsitting.deletion import delete_account, delete_posts
+from jobs.service import enqueue
+from posts.models import Post
+from .models import AccountDeletion
+
+logger = logging.getLogger(__name__)
+
+
+class AccountDeletionFailed(Exception):
+    pass
+
+
+def schedule_account_deletion(user):
+    """
+    Deactivate the account and queue its deletion. Returns the pending
+    or running ``AccountDeletion`` of the account.
+    """
+    with transaction.atomic():
+        get_user_model().objects.filter(pk=user.pk).update(is_active=False)
+        job = AccountDeletion.objects.filter(
+            user_id=user.pk, status__in=["pending", "running"]
+        ).first()
+        if job is None:
+            job = AccountDeletion.objects.create(user_id=user.pk)
+            if settings.ACCOUNT_DELETION_RUNNER == "job":
+                enqueue(run_queued_account_deletion, deletion_id=str(job.pk))
+            else:
+                transaction.on_commit(lambda: submit(job.pk))
+    return job
+
+
+def submit(job_id):
+    if settings.ACCOUNT_DELETION_RUNNER == "thread":
+        _runner.submit(job_id)
+    else:
+        run_account_deletion(job_id)
+
+
+def claim(job_id, stale_before=None):
+    """
+    Mark the deletion as running. Returns False when it is done, failed,
+    or already running and started after ``stale_before``.
+    """
+    statuses = AccountDeletion.objects.filter(pk=job_id, status="pending")
+    if stale_before is not None:
+        statuses = statuses | AccountDeletion.objects.filter(
+            pk=job_id, status="running", started_at__lt=stale_before
+        )
+    return bool(statuses.update(status="running", started_at=timezone.now()))
+
+
+def add_counts(job, counts):
+    for label, count in counts.items():
+        job.deleted[label] = job.deleted.get(label, 0) + count
+
+
+def run_account_deletion(job_id, stale_before=None):
+    """
+    Delete the account of the deletion in chunked transactions. Returns
+    the ``AccountDeletion``, or None when it could not be claimed.
+    """
+    if not claim(job_id, stale_before):
+        return None
+    job = AccountDeletion.objects.get(pk=job_id)
+    posts = Post.objects.filter(author_id=job.user_id).order_by("pk")
+    try:
+        job.posts_total = job.posts_deleted + posts.count()
+        job.save(update_fields=["posts_total"])
+        while True:
+            batch = list(posts.values_list("pk", flat=True)[:settings.ACCOUNT_DELETION_BATCH_SIZE])
+            if not batch:
+                break
+            with transaction.atomic():
+                add_counts(job, delete_posts(batch))
+                job.posts_deleted += len(batch)
+                job.save(update_fields=["posts_deleted", "deleted"])
+
+        user = get_user_model().objects.filter(pk=job.user_id).first()
+        with transaction.atomic():
+            if user is not None:
+                add_counts(job, delete_account(user))
+            job.status = "done"
+            job.finished_at = timezone.now()
+            job.save(update_fields=["status", "finished_at", "deleted"])
+    except Exception as exc:
+        logger.exception("Could not delete the account of user %s", job.user_id)
+        job.status = "failed"
+        job.error = str(exc)
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "finished_at"])
+    return job
+
+
+def run_queued_account_deletion(deletion_id):
+    """
+    Job queue entry point. Raises when the deletion fails so the queue
+    retries it, and resumes a deletion whose previous attempt was cut
+    short.
+    """
+    AccountDeletion.objects.filter(pk=deletion_id, status="failed").update(status="pending")
+    stale_before = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    deletion = run_account_deletion(deletion_id, stale_before=stale_before)
+    if deletion is not None and deletion.status == "failed":
+        raise AccountDeletionFailed(deletion.error)
+
+
+class AccountDeletionRunner:
+    """
+    Daemon thread running queued account deletions one at a time.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, job_id):
+        self.start()
+        self.queue.put(job_id)
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name="account-deletion-runner", daemon=True
+                )
+                self.thread.start()
+
+    def run(self):
+        while True:
+            job_id = self.queue.get()
+            try:
+                run_account_deletion(job_id)
+            except Exception:
+                logger.exception("Account deletion %s crashed", job_id)
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+    def join(self):
+        """
+        Block until every submitted deletion has finished.
+        """
+        self.queue.join()
+
+
+_runner = AccountDeletionRunner()
+
+
+def wait_for_deletions():
+    _runner.join()
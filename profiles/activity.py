@@ -0,0 +1,402 @@
+import heapq
+from collections import defaultdict
+from itertools import islice
+from typing import Callable, NamedTuple
+
+from cloudinary.models import CloudinaryField
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from comments.models import Comment
+from likes.models import CommentLike, Like
+from posts.models import Post, SittingRequest
+from .models import Activity, FollowRequest
+
+PLACEHOLDER = "https://res.cloudinary.com/daj7vkzdw/image/upload/v1744729686/Placeholder/hshdlbr977dc6dq9gt2o.jpg"
+
+_image_field = CloudinaryField("image")
+
+
+def image_url(image, default=None):
+    """
+    URL of a Cloudinary image, whether it was loaded from the database,
+    just uploaded or is still the field's default string.
+    """
+    if not image:
+        return default
+    if isinstance(image, str):
+        if image.startswith(("http://", "https://")):
+            return image
+        # Parse a bare public id like a value loaded from the database so
+        # both give the same URL.
+        image = _image_field.to_python(image)
+    return getattr(image, "url", default)
+
+
+def truncate(content, length=60):
+    return (content[:length] + "...") if len(content) > length else content
+
+
+def profile_picture(profile):
+    return image_url(getattr(profile, "profile_picture", None), PLACEHOLDER)
+
+
+# Entry builders return the Activity row of a source object; display
+# builders return the message and data shown for it. Only the row is
+# stored: the display fields are built from the live source objects
+# whenever the feed is served, so edits, renames and new pictures show
+# up at once in both feed modes.
+
+def post_entry(post):
+    return dict(user_id=post.author_id, type="post", source_id=post.id, created_at=post.created_at)
+
+
+def post_display(post):
+    return "You created a post", {
+        "post_id": post.id,
+        "title": post.title or "Untitled",
+        "image": image_url(post.image),
+    }
+
+
+def comment_entry(comment):
+    return dict(user_id=comment.owner_id, type="comment", source_id=comment.id, created_at=comment.created_at)
+
+
+def comment_display(comment):
+    post = comment.post
+    return "You commented on a post", {
+        "comment_id": comment.id,
+        "content": truncate(comment.content),
+        "post_id": post.id,
+        "post_title": post.title or "Untitled",
+        "post_image": image_url(post.image, PLACEHOLDER),
+        "post_exists": True,
+    }
+
+
+def like_entry(like):
+    return dict(user_id=like.owner_id, type="like", source_id=like.id, created_at=like.created_at)
+
+
+def like_display(like):
+    post = like.post
+    return "You liked a post", {
+        "post_id": post.id,
+        "title": post.title or "Untitled",
+        "image": image_url(post.image),
+    }
+
+
+def comment_like_entry(comment_like):
+    return dict(
+        user_id=comment_like.owner_id,
+        type="like_comment",
+        source_id=comment_like.id,
+        created_at=comment_like.created_at,
+    )
+
+
+def comment_like_display(comment_like):
+    comment = comment_like.comment
+    return "You liked a comment", {
+        "comment_id": comment.id,
+        "post_id": comment.post_id,
+        "content": truncate(comment.content),
+        "post_title": comment.post.title or "Untitled",
+    }
+
+
+def _profile_data(profile):
+    user = profile.user
+    return {
+        "user_id": profile.id,
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "profile_picture": profile_picture(profile),
+    }
+
+
+def follow_entry(follow_request):
+    return dict(
+        user_id=follow_request.sender.user_id,
+        type="follow",
+        source_id=follow_request.id,
+        created_at=follow_request.created_at,
+    )
+
+
+def follow_display(follow_request):
+    receiver_profile = follow_request.receiver
+    return (
+        f"You sent a follow request to {receiver_profile.user.username}",
+        _profile_data(receiver_profile),
+    )
+
+
+def follow_accepted_entry(follow_request):
+    return dict(
+        user_id=follow_request.receiver.user_id,
+        type="follow_accepted",
+        source_id=follow_request.id,
+        created_at=follow_request.created_at,
+    )
+
+
+def follow_accepted_display(follow_request):
+    sender_profile = follow_request.sender
+    return (
+        f"{sender_profile.user.username} accepted your follow request",
+        _profile_data(sender_profile),
+    )
+
+
+def sitting_entry(sitting_request):
+    return dict(
+        user_id=sitting_request.sender_id,
+        type="sitting",
+        source_id=sitting_request.id,
+        created_at=sitting_request.created_at,
+    )
+
+
+def sitting_display(sitting_request):
+    receiver_user = sitting_request.receiver
+    profile = getattr(receiver_user, "profile", None)
+    return f"You sent a sitting request to {receiver_user.username}", {
+        "sitting_id": sitting_request.id,
+        "receiver_id": profile.id if profile else None,
+        "receiver_username": receiver_user.username,
+        "profile_picture": profile_picture(profile) if profile else PLACEHOLDER,
+    }
+
+
+class ActivitySource(NamedTuple):
+    model: type
+    related: tuple
+    entry: Callable
+    display: Callable
+
+    def queryset(self):
+        return self.model.objects.select_related(*self.related)
+
+
+# Every activity type, in rank order: the position breaks timestamp ties
+# between types in the merged feed.
+SOURCES = {
+    "post": ActivitySource(Post, (), post_entry, post_display),
+    "comment": ActivitySource(Comment, ("post",), comment_entry, comment_display),
+    "like": ActivitySource(Like, ("post",), like_entry, like_display),
+    "like_comment": ActivitySource(
+        CommentLike, ("comment__post",), comment_like_entry, comment_like_display
+    ),
+    "follow": ActivitySource(
+        FollowRequest, ("sender", "receiver__user"), follow_entry, follow_display
+    ),
+    "follow_accepted": ActivitySource(
+        FollowRequest, ("receiver", "sender__user"), follow_accepted_entry, follow_accepted_display
+    ),
+    "sitting": ActivitySource(
+        SittingRequest, ("receiver__profile",), sitting_entry, sitting_display
+    ),
+}
+
+
+def display(activity, source_object):
+    activity.message, activity.data = SOURCES[activity.type].display(source_object)
+    return activity
+
+
+def is_displayed(activity):
+    return "data" in activity.__dict__
+
+
+def resolve_activities(activities):
+    """
+    Attach the message and data of the activity rows that do not have
+    them yet, loading the source objects with one query per activity
+    type. Rows whose source is gone are dropped.
+    """
+    source_ids = defaultdict(set)
+    for activity in activities:
+        if not is_displayed(activity):
+            source_ids[activity.type].add(activity.source_id)
+    objects = {
+        activity_type: SOURCES[activity_type].queryset().in_bulk(ids)
+        for activity_type, ids in source_ids.items()
+    }
+    resolved = []
+    for activity in activities:
+        if not is_displayed(activity):
+            source_object = objects[activity.type].get(activity.source_id)
+            if source_object is None:
+                continue
+            display(activity, source_object)
+        resolved.append(activity)
+    return resolved
+
+
+def activity_sources(user):
+    """
+    The (queryset, type) pair of every activity source of a user, in
+    rank order.
+    """
+    filters = {
+        "post": {"author": user},
+        "comment": {"owner": user},
+        "like": {"owner": user},
+        "like_comment": {"owner": user},
+        "follow": {"sender__user": user},
+        "follow_accepted": {"receiver__user": user, "status": "accepted"},
+        "sitting": {"sender": user},
+    }
+    return [
+        (source.queryset().filter(**filters[activity_type]), activity_type)
+        for activity_type, source in SOURCES.items()
+    ]
+
+
+def _after(rank, created_at, cursor_rank, cursor_id):
+    """
+    Rows of the source with the given rank that come after the cursor in
+    (-created_at, -rank, -id) order.
+    """
+    if rank < cursor_rank:
+        return Q(created_at__lte=created_at)
+    if rank > cursor_rank:
+        return Q(created_at__lt=created_at)
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=cursor_id)
+
+
+def _stream(queryset, activity_type, rank):
+    source = SOURCES[activity_type]
+    for obj in queryset:
+        activity = display(Activity(**source.entry(obj)), obj)
+        activity.rank = rank
+        yield activity
+
+
+def merge_activities(sources, limit, after=None):
+    """
+    Lazily merge the newest ``limit`` entries of every source, newest
+    first, resuming after the ``(created_at, rank, source_id)`` cursor.
+    Each source is read with its own ``ORDER BY ... LIMIT`` query, so at
+    most ``limit`` rows per source are loaded.
+    """
+    streams = []
+    for rank, (queryset, activity_type) in enumerate(sources):
+        if after is not None:
+            queryset = queryset.filter(_after(rank, *after))
+        queryset = queryset.order_by("-created_at", "-id")[:limit]
+        streams.append(_stream(queryset, activity_type, rank))
+    merged = heapq.merge(
+        *streams,
+        key=lambda activity: (activity.created_at, activity.rank, activity.source_id),
+        reverse=True,
+    )
+    return islice(merged, limit)
+
+
+def record_activity(entry):
+    """
+    Write an activity row, replacing any existing row for the same source.
+    """
+    Activity.objects.update_or_create(
+        type=entry.pop("type"),
+        source_id=entry.pop("source_id"),
+        defaults=entry,
+    )
+
+
+def remove_activity(types, source_id):
+    Activity.objects.filter(type__in=types, source_id=source_id).delete()
+
+
+def iter_entries():
+    """
+    Yield the entries of every existing source object.
+    """
+    for activity_type, source in SOURCES.items():
+        queryset = source.queryset()
+        if activity_type == "follow_accepted":
+            queryset = queryset.filter(status="accepted")
+        for obj in queryset.iterator():
+            yield source.entry(obj)
+
+
+def rebuild_activities(batch_size=1000):
+    """
+    Recreate the whole activity table from the source objects.
+    """
+    with transaction.atomic():
+        Activity.objects.all().delete()
+        batch = []
+        for entry in iter_entries():
+            batch.append(Activity(**entry))
+            if len(batch) >= batch_size:
+                Activity.objects.bulk_create(batch)
+                batch = []
+        Activity.objects.bulk_create(batch)
+
+
+@receiver(post_save, sender=Post)
+def record_post_activity(sender, instance, created, **kwargs):
+    if created:
+        record_activity(post_entry(instance))
+
+
+@receiver(post_save, sender=Comment)
+def record_comment_activity(sender, instance, created, **kwargs):
+    if created:
+        record_activity(comment_entry(instance))
+
+
+@receiver(post_save, sender=Like)
+def record_like_activity(sender, instance, created, **kwargs):
+    if created:
+        record_activity(like_entry(instance))
+
+
+@receiver(post_save, sender=CommentLike)
+def record_comment_like_activity(sender, instance, created, **kwargs):
+    if created:
+        record_activity(comment_like_entry(instance))
+
+
+@receiver(post_save, sender=FollowRequest)
+def record_follow_activity(sender, instance, created, **kwargs):
+    if created:
+        record_activity(follow_entry(instance))
+    if instance.status == "accepted":
+        record_activity(follow_accepted_entry(instance))
+    elif not created:
+        remove_activity(["follow_accepted"], instance.id)
+
+
+@receiver(post_save, sender=SittingRequest)
+def record_sitting_activity(sender, instance, created, **kwargs):
+    if created:
+        record_activity(sitting_entry(instance))
+
+
+SOURCE_TYPES = {
+    Post: ["post"],
+    Comment: ["comment"],
+    Like: ["like"],
+    CommentLike: ["like_comment"],
+    FollowRequest: ["follow", "follow_accepted"],
+    SittingRequest: ["sitting"],
+}
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Like)
+@receiver(post_delete, sender=CommentLike)
+@receiver(post_delete, sender=FollowRequest)
+@receiver(post_delete, sender=SittingRequest)
+def remove_source_activity(sender, instance, **kwargs):
+    remove_activity(SOURCE_TYPES[sender], instance.pk)
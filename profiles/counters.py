@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models import F, OuterRef
+
+from catsitting.counters import count_rows
+from .models import Profile
+
+Follow = Profile.followers.through
+
+
+def increment_followers_count(profile_id, amount=1):
+    """
+    Atomically add ``amount`` to the followers counter of a profile.
+    """
+    return Profile.objects.filter(pk=profile_id).update(
+        followers_count=F("followers_count") + amount
+    )
+
+
+def decrement_followers_count(profile_id, amount=1):
+    """
+    Atomically subtract ``amount`` from the followers counter of a
+    profile, never going below zero.
+    """
+    updated = Profile.objects.filter(pk=profile_id, followers_count__gte=amount).update(
+        followers_count=F("followers_count") - amount
+    )
+    if not updated:
+        updated = Profile.objects.filter(pk=profile_id).update(followers_count=0)
+    return updated
+
+
+def add_follower(profile, follower):
+    """
+    Make ``follower`` follow ``profile``. Returns False if it already did.
+    """
+    with transaction.atomic():
+        if profile.followers.filter(pk=follower.pk).exists():
+            return False
+        profile.followers.add(follower)
+        increment_followers_count(profile.pk)
+    return True
+
+
+def remove_follower(profile, follower):
+    """
+    Make ``follower`` stop following ``profile``. Returns False if it
+    did not follow it.
+    """
+    with transaction.atomic():
+        if not profile.followers.filter(pk=follower.pk).exists():
+            return False
+        profile.followers.remove(follower)
+        decrement_followers_count(profile.pk)
+    return True
+
+
+def actual_followers_count():
+    return count_rows(Follow.objects.filter(from_profile_id=OuterRef("pk")))
+
+
+def recompute_followers_counts(queryset=None):
+    """
+    Recompute the followers counter of the given profiles in a single
+    UPDATE statement. Returns the number of updated rows.
+    """
+    queryset = Profile.objects.all() if queryset is None else queryset
+    return queryset.update(followers_count=actual_followers_count())
@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from catsitting.counters import count_rows
+from comments.models import Comment
+from likes.models import CommentLike, Like
+from posts.models import Post, SittingRequest
+from .counters import Follow
+from .models import Profile
+
+KPI_FIELDS = [
+    "total_posts", "followers", "following", "comments",
+    "likes_on_posts", "likes_on_comments", "requests_in", "requests_out",
+]
+
+def compute_kpis(user):
+    """
+    All dashboard counters of a user in a single query.
+    """
+    own_post_comments = Comment.objects.filter(post__author_id=OuterRef("user_id")).exclude(
+        owner_id=OuterRef("user_id")
+    )
+    counts = {
+        "total_posts": count_rows(Post.objects.filter(author_id=OuterRef("user_id"))),
+        "followers": count_rows(Follow.objects.filter(from_profile_id=OuterRef("pk"))),
+        "following": count_rows(Follow.objects.filter(to_profile_id=OuterRef("pk"))),
+        "comments": count_rows(own_post_comments),
+        "likes_on_posts": count_rows(Like.objects.filter(post__author_id=OuterRef("user_id"))),
+        "likes_on_comments": count_rows(CommentLike.objects.filter(
+            comment__post__author_id=OuterRef("user_id"),
+        ).exclude(comment__owner_id=OuterRef("user_id"))),
+        "requests_in": count_rows(SittingRequest.objects.filter(receiver_id=OuterRef("user_id"))),
+        "requests_out": count_rows(SittingRequest.objects.filter(sender_id=OuterRef("user_id"))),
+    }
+    # Prefixed so the names can't clash with Profile fields like "followers".
+    row = Profile.objects.filter(user=user).values(
+        **{f"kpi_{name}": expression for name, expression in counts.items()}
+    ).first() or {}
+    return {name: row.get(f"kpi_{name}", 0) for name in KPI_FIELDS}
+
+
+def kpi_cache_key(user_id):
+    return f"profiles:kpis:{user_id}"
+
+
+def get_kpis(user):
+    """
+    The user's KPI snapshot, served from the cache until one of the
+    contributing objects is created or deleted.
+    """
+    timeout = getattr(settings, "PROFILE_KPI_CACHE_TIMEOUT", 0)
+    if not timeout:
+        return compute_kpis(user)
+    key = kpi_cache_key(user.pk)
+    kpis = cache.get(key)
+    if kpis is None:
+        kpis = compute_kpis(user)
+        cache.set(key, kpis, timeout)
+    return kpis
+
+
+def invalidate_kpis(*user_ids):
+    cache.delete_many([kpi_cache_key(user_id) for user_id in user_ids if user_id])
+
+
+def _post_author_id(post_id):
+    return Post.objects.filter(pk=post_id).values_list("author_id", flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_kpis(sender, instance, created=True, **kwargs):
+    if created:
+        invalidate_kpis(instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def invalidate_post_author_kpis(sender, instance, created=True, **kwargs):
+    if created:
+        invalidate_kpis(_post_author_id(instance.post_id))
+
+
+@receiver(post_save, sender=CommentLike)
+@receiver(post_delete, sender=CommentLike)
+def invalidate_comment_author_kpis(sender, instance, created=True, **kwargs):
+    if created:
+        invalidate_kpis(*Comment.objects.filter(pk=instance.comment_id).values_list(
+            "post__author_id", flat=True
+        ))
+
+
+@receiver(post_save, sender=SittingRequest)
+@receiver(post_delete, sender=SittingRequest)
+def invalidate_sitting_request_kpis(sender, instance, created=True, **kwargs):
+    if created:
+        invalidate_kpis(instance.sender_id, instance.receiver_id)
+
+
+@receiver(m2m_changed, sender=Follow)
+def invalidate_follow_kpis(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    profile_ids = {instance.pk}
+    if pk_set:
+        profile_ids |= set(pk_set)
+    elif action == "pre_clear":
+        related = instance.followers if not reverse else instance.following
+        profile_ids |= set(related.values_list("pk", flat=True))
+    invalidate_kpis(*Profile.objects.filter(pk__in=profile_ids).values_list("user_id", flat=True))
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from profiles.account_deletion import run_account_deletion
+from profiles.models import AccountDeletion
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued account deletions, and resume the ones left running "
+        "for longer than --stale-minutes, e.g. by a restarted web process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--stale-minutes",
+            type=int,
+            default=30,
+            help="Resume running deletions started more than this many minutes ago.",
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Queue failed deletions again before running.",
+        )
+
+    def handle(self, *args, **options):
+        if options["stale_minutes"] < 1:
+            raise CommandError("--stale-minutes must be at least 1.")
+        if options["retry_failed"]:
+            AccountDeletion.objects.filter(status="failed").update(
+                status="pending", error="", finished_at=None
+            )
+        stale_before = timezone.now() - timedelta(minutes=options["stale_minutes"])
+        job_ids = list(
+            AccountDeletion.objects.filter(status__in=["pending", "running"])
+            .order_by("created_at")
+            .values_list("pk", flat=True)
+        )
+        results = {"done": 0, "failed": 0}
+        for job_id in job_ids:
+            job = run_account_deletion(job_id, stale_before=stale_before)
+            if job is not None:
+                results[job.status] += 1
+                self.stdout.write(f"Deletion {job.pk} of user {job.user_id}: {job.status}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{results['done']} account(s) deleted, {results['failed']} failed."
+        ))
@@ -0,0 +1,82 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_activities(apps, schema_editor):
+    """
+    Write an activity row for every existing source object. Frozen: it
+    only uses the historical models, so later changes to the app code
+    do not change what this migration does.
+    """
+    Activity = apps.get_model('profiles', 'Activity')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('comments', 'Comment')
+    Like = apps.get_model('likes', 'Like')
+    CommentLike = apps.get_model('likes', 'CommentLike')
+    FollowRequest = apps.get_model('profiles', 'FollowRequest')
+    SittingRequest = apps.get_model('posts', 'SittingRequest')
+
+    sources = [
+        ('post', Post.objects.values_list('author_id', 'id', 'created_at'),
+         lambda *_: 'You created a post', lambda *_: {}),
+        ('comment', Comment.objects.values_list('owner_id', 'id', 'created_at', 'post_id'),
+         lambda *_: 'You commented on a post', lambda post_id: {'post_id': post_id}),
+        ('like', Like.objects.values_list('owner_id', 'id', 'created_at', 'post_id'),
+         lambda *_: 'You liked a post', lambda post_id: {'post_id': post_id}),
+        ('like_comment', CommentLike.objects.values_list('owner_id', 'id', 'created_at', 'comment_id'),
+         lambda *_: 'You liked a comment', lambda comment_id: {'comment_id': comment_id}),
+        ('follow', FollowRequest.objects.values_list(
+            'sender__user_id', 'id', 'created_at', 'receiver__user__username'),
+         lambda username: f'You sent a follow request to {username}', lambda *_: {}),
+        ('follow_accepted', FollowRequest.objects.filter(status='accepted').values_list(
+            'receiver__user_id', 'id', 'created_at', 'sender__user__username'),
+         lambda username: f'{username} accepted your follow request', lambda *_: {}),
+        ('sitting', SittingRequest.objects.values_list('sender_id', 'id', 'created_at', 'receiver__username'),
+         lambda username: f'You sent a sitting request to {username}', lambda *_: {}),
+    ]
+    batch = []
+    for activity_type, rows, message, data in sources:
+        for user_id, source_id, created_at, *extra in rows.iterator():
+            batch.append(Activity(
+                user_id=user_id, type=activity_type, source_id=source_id,
+                created_at=created_at, message=message(*extra), data=data(*extra),
+            ))
+            if len(batch) >= 1000:
+                Activity.objects.bulk_create(batch)
+                batch = []
+    Activity.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0004_alter_followrequest_receiver_and_more'),
+        ('posts', '0017_feed_indexes'),
+        ('comments', '0004_comment_likes'),
+        ('likes', '0003_commentlike'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Activity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('post', 'Post'), ('comment', 'Comment'), ('like', 'Post Like'), ('like_comment', 'Comment Like'), ('follow', 'Follow Request'), ('follow_accepted', 'Follow Accepted'), ('sitting', 'Sitting Request')], max_length=20)),
+                ('source_id', models.PositiveBigIntegerField()),
+                ('message', models.CharField(max_length=255)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activities', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['user', '-created_at', '-id'], name='activity_user_timeline_idx')],
+                'constraints': [models.UniqueConstraint(fields=('type', 'source_id'), name='unique_activity_source')],
+            },
+        ),
+        migrations.RunPython(backfill_activities, migrations.RunPython.noop),
+    ]
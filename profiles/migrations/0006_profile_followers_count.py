@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:11
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_followers_count(apps, schema_editor):
+    Profile = apps.get_model('profiles', 'Profile')
+    Follow = Profile.followers.through
+    Profile.objects.update(
+        followers_count=Coalesce(
+            Subquery(
+                Follow.objects.filter(from_profile=OuterRef('pk'))
+                .order_by().values('from_profile')
+                .annotate(total=Count('pk')).values('total'),
+                output_field=IntegerField(),
+            ),
+            0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0005_activity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['-followers_count', 'id'], name='profile_top_followed_idx'),
+        ),
+        migrations.RunPython(populate_followers_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:41
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_unread_notifications_count(apps, schema_editor):
+    Profile = apps.get_model('profiles', 'Profile')
+    Notification = apps.get_model('notifications', 'Notification')
+    Profile.objects.update(
+        unread_notifications_count=Coalesce(
+            Subquery(
+                Notification.objects.filter(user=OuterRef('user'), is_read=False)
+                .order_by().values('user')
+                .annotate(total=Count('pk')).values('total'),
+                output_field=IntegerField(),
+            ),
+            0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_notification_actor_count'),
+        ('profiles', '0006_profile_followers_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='unread_notifications_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_unread_notifications_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:28
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0008_accountdeletion'),
+        # The like merge still writes these columns.
+        ('posts', '0018_merge_post_likes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='activity',
+            name='data',
+        ),
+        migrations.RemoveField(
+            model_name='activity',
+            name='message',
+        ),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db.models.signals import post_save
 from django.contrib.auth import get_user_model
 from django.dispatch import receiver
@@ -6,8 +8,10 @@ from django.contrib.auth.models import User
 from django.conf import settings
 from cloudinary.models import CloudinaryField
 
+from catsitting.counters import CounterFieldsMixin
+
 
-class Profile(models.Model):
+class Profile(CounterFieldsMixin, models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='profile')
     bio = models.TextField(blank=True, null=True)
     profile_picture = CloudinaryField(
@@ -15,11 +19,21 @@ class Profile(models.Model):
         default='https://res.cloudinary.com/daj7vkzdw/image/upload/v1737570810/default_profile_uehpos.jpg'
     )
     followers = models.ManyToManyField("self", symmetrical=False, related_name='following', blank=True)
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    unread_notifications_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Maintained with atomic F() updates, see profiles.counters and
+    # notifications.counters.
+    COUNTER_FIELDS = ('followers_count', 'unread_notifications_count')
+
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            # Top-followed leaderboard, see TopFollowedProfilesView.
+            models.Index(fields=['-followers_count', 'id'], name='profile_top_followed_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s profile"
@@ -60,3 +74,99 @@ class FollowRequest(models.Model):
         from_user = getattr(self.sender.user, "username", "unknown")
         to_user = getattr(self.receiver.user, "username", "unknown")
         return f"FollowRequest from {from_user} to {to_user} ({self.status})"
+
+
+class Activity(models.Model):
+    """
+    Append-only timeline entry of something a user did, written when the
+    source object (post, comment, like, follow or sitting request) is
+    created and removed together with it. Only the source is stored; the
+    message and data shown are built from it when the feed is served.
+    See profiles.activity.
+    """
+    TYPE_CHOICES = [
+        ("post", "Post"),
+        ("comment", "Comment"),
+        ("like", "Post Like"),
+        ("like_comment", "Comment Like"),
+        ("follow", "Follow Request"),
+        ("follow_accepted", "Follow Accepted"),
+        ("sitting", "Sitting Request"),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="activities")
+    type = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    source_id = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        constraints = [
+            models.UniqueConstraint(fields=["type", "source_id"], name="unique_activity_source"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-id"], name="activity_user_timeline_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.type} activity of {self.user}"
+
+
+class AccountDeletion(models.Model):
+    """
+    A queued account deletion and its progress, see
+    profiles.account_deletion. The id is what the client polls with, and
+    the user is a plain id because the row outlives the account.
+    """
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user_id = models.BigIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    posts_total = models.PositiveIntegerField(default=0)
+    posts_deleted = models.PositiveIntegerField(default=0)
+    deleted = models.JSONField(default=dict)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="account_deletion_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"Deletion of user {self.user_id} ({self.status})"
+
+    @property
+    def progress(self):
+        """
+        Percentage done. The posts make up most of the work; the rest of
+        the account goes in the last step.
+        """
+        if self.status == "done":
+            return 100
+        return int(99 * self.posts_deleted / self.posts_total) if self.posts_total else 0
+
+
+class PictureUpload(models.Model):
+    """
+    A profile picture waiting for the job worker to upload it, see
+    profiles.tasks. The job only carries the id, and the row goes once
+    the picture is stored.
+    """
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='+')
+    name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    content = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Upload of {self.name} for profile {self.profile_id}"
@@ -1,15 +1,34 @@
+import logging
+
+from django.conf import settings
 from django.core.mail import send_mail
 from django.contrib.auth import get_user_model
 from django.core.validators import RegexValidator
+from django.template.defaultfilters import filesizeformat
 from allauth.account.models import EmailAddress
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from .models import Profile
+from .activity import resolve_activities
+from .models import AccountDeletion, Activity, Profile
+from .tasks import queue_profile_picture
 from posts.models import Post
 
+logger = logging.getLogger(__name__)
+
 User = get_user_model()
 
 
+def check_picture_size(upload):
+    """
+    Refuse profile pictures over PROFILE_PICTURE_MAX_SIZE, which wait in
+    the database until the job worker uploads them.
+    """
+    if upload and upload.size > settings.PROFILE_PICTURE_MAX_SIZE:
+        limit = filesizeformat(settings.PROFILE_PICTURE_MAX_SIZE)
+        raise ValidationError({"profile_picture": f"Profile pictures may be at most {limit}."})
+    return upload
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -53,6 +72,9 @@ class RegisterSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 {"password2": "Passwords must match."}
             )
+        request = self.context.get("request")
+        if request:
+            check_picture_size(request.FILES.get("profile_picture"))
         return data
 
     def validate_email(self, value):
@@ -89,8 +111,7 @@ class RegisterSerializer(serializers.ModelSerializer):
         )
 
         if "profile_picture" in request.FILES:
-            user.profile.profile_picture = request.FILES["profile_picture"]
-            user.profile.save()
+            queue_profile_picture(user.profile, request.FILES["profile_picture"])
         else:
             print("⚠️ No profile_picture found in request.FILES")
 
@@ -100,6 +121,35 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
+def followed_profile_ids(profiles, request=None):
+    """
+    Ids of the given profiles that the viewer follows, in one query.
+    """
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated or not profiles:
+        return set()
+    return set(
+        Profile.followers.through.objects.filter(
+            from_profile_id__in=[profile.id for profile in profiles],
+            to_profile__user=user,
+        ).values_list("from_profile_id", flat=True)
+    )
+
+
+class ProfileListSerializer(serializers.ListSerializer):
+    """
+    List serializer for profiles that resolves the viewer's follow
+    relationships for the whole page before serializing the rows.
+    """
+    def to_representation(self, data):
+        iterable = data.all() if hasattr(data, "all") else data
+        profiles = list(iterable)
+        self.context["followed_profile_ids"] = followed_profile_ids(
+            profiles, self.context.get("request")
+        )
+        return [self.child.to_representation(profile) for profile in profiles]
+
+
 class ProfileSerializer(serializers.ModelSerializer):
     first_name = serializers.CharField(
         source='user.first_name',
@@ -141,6 +191,13 @@ class ProfileSerializer(serializers.ModelSerializer):
             'following_count', 'is_following_accepted', 'is_following',
             'is_owner', 'created_at', 'updated_at'
         ]
+        list_serializer_class = ProfileListSerializer
+
+    def validate(self, data):
+        request = self.context.get("request")
+        if request:
+            check_picture_size(request.FILES.get("profile_picture"))
+        return data
 
     def update(self, instance, validated_data):
         print("🛠️ Incoming validated data:", validated_data)
@@ -152,12 +209,16 @@ class ProfileSerializer(serializers.ModelSerializer):
         if not profile_pic:
             profile_pic = validated_data.pop("profile_picture", None)
 
-        if profile_pic:
-            instance.profile_picture = profile_pic
-            print(f"✅ Profile picture saved: {instance.profile_picture}")
-
         instance.save()
 
+        # Queued after the save, which would otherwise write the old
+        # picture back over one an inline job already stored.
+        if profile_pic:
+            queue_profile_picture(instance, profile_pic)
+            logger.info("Profile picture of %s queued for upload: %s", instance.user_id, profile_pic.name)
+            # Answer with the stored picture, the new one if it is already up.
+            instance.refresh_from_db(fields=["profile_picture"])
+
         if request:
             user = instance.user
             first = request.data.get("first_name")
@@ -174,16 +235,13 @@ class ProfileSerializer(serializers.ModelSerializer):
         return instance
 
     def get_is_following(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.followers.filter(id=request.user.id).exists()
-        return False
+        followed = self.context.get("followed_profile_ids")
+        if followed is None:
+            followed = followed_profile_ids([obj], self.context.get("request"))
+        return obj.id in followed
 
     def get_is_following_accepted(self, obj):
-        request = self.context.get("request")
-        if request and request.user.is_authenticated:
-            return obj.followers.filter(id=request.user.profile.id).exists()
-        return False
+        return self.get_is_following(obj)
 
     def get_is_owner(self, obj):
         request = self.context.get('request')
@@ -207,3 +265,35 @@ class ProfileMiniSerializer(serializers.ModelSerializer):
     class Meta:
         model = Profile
         fields = ['id', 'profile_picture']
+
+
+class ActivityListSerializer(serializers.ListSerializer):
+    """
+    List serializer that loads the source objects of a page of activity
+    rows in bulk before serializing it.
+    """
+    def to_representation(self, data):
+        activities = resolve_activities(list(data.all() if hasattr(data, "all") else data))
+        return [self.child.to_representation(activity) for activity in activities]
+
+
+class ActivitySerializer(serializers.ModelSerializer):
+    timestamp = serializers.DateTimeField(source="created_at", read_only=True)
+    message = serializers.ReadOnlyField()
+    data = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Activity
+        fields = ["type", "message", "timestamp", "data"]
+        list_serializer_class = ActivityListSerializer
+
+
+class AccountDeletionSerializer(serializers.ModelSerializer):
+    progress = serializers.ReadOnlyField()
+
+    class Meta:
+        model = AccountDeletion
+        fields = [
+            "id", "status", "progress", "posts_total", "posts_deleted",
+            "created_at", "started_at", "finished_at",
+        ]
@@ -0,0 +1,84 @@
+"""
+Slow side effects of registration and profile edits, run by the job
+worker instead of inside the request. See jobs.service.
+"""
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from allauth.account.models import EmailAddress
+from allauth.core.context import request_context
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.wsgi import WSGIRequest
+
+from jobs.service import enqueue
+from .models import PictureUpload
+
+
+def base_request(base_url):
+    """
+    A bare GET request on the scheme and host of `base_url`, standing in
+    for the registration request when allauth builds absolute links.
+    """
+    bits = urlsplit(base_url)
+    return WSGIRequest({
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": "/",
+        "HTTP_HOST": bits.netloc,
+        "wsgi.url_scheme": bits.scheme,
+        "wsgi.input": BytesIO(),
+    })
+
+
+def send_confirmation_email(email_address_id, base_url=None):
+    email_address = EmailAddress.objects.filter(pk=email_address_id, verified=False).first()
+    if email_address is None:
+        return
+    if base_url is None:
+        # allauth builds the confirmation link from the current Site
+        # when there is no request.
+        email_address.send_confirmation(None, signup=True)
+        return
+    request = base_request(base_url)
+    with request_context(request):
+        email_address.send_confirmation(request, signup=True)
+
+
+def queue_confirmation_email(user, request):
+    """
+    Queue the confirmation email of a new user. The link in it points at
+    the host the user registered on.
+    """
+    email_address = EmailAddress.objects.filter(user=user, email=user.email).first()
+    if email_address is not None and not email_address.verified:
+        enqueue(
+            send_confirmation_email,
+            email_address_id=email_address.pk,
+            base_url=request.build_absolute_uri("/"),
+        )
+
+
+def upload_profile_picture(upload_id):
+    upload = PictureUpload.objects.select_related("profile").filter(pk=upload_id).first()
+    if upload is None:
+        return
+    profile = upload.profile
+    # Saving an uploaded file uploads it to Cloudinary, see CloudinaryField.
+    profile.profile_picture = SimpleUploadedFile(upload.name, bytes(upload.content), upload.content_type)
+    profile.save(update_fields=["profile_picture", "updated_at"])
+    upload.delete()
+
+
+def queue_profile_picture(profile, upload):
+    """
+    Queue the upload of a new profile picture. The file waits in a
+    PictureUpload row, as the worker does not share the web process's
+    disk, and the job only names that row.
+    """
+    upload.seek(0)
+    pending = PictureUpload.objects.create(
+        profile=profile,
+        name=upload.name,
+        content_type=getattr(upload, "content_type", None) or "application/octet-stream",
+        content=upload.read(),
+    )
+    enqueue(upload_profile_picture, upload_id=pending.pk)
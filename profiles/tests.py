@@ -1,10 +1,22 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
 from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
-from django.test import TestCase
+from django.test import RequestFactory, TestCase, override_settings
 from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth import get_user_model
-from profiles.models import Profile
+from allauth.account.models import EmailAddress
+from jobs.models import Job
+from posts.models import Post
+from profiles.account_deletion import run_account_deletion, schedule_account_deletion
+from profiles.models import AccountDeletion, PictureUpload, Profile
+from profiles.tasks import queue_confirmation_email, queue_profile_picture
 
 User = get_user_model()
 
@@ -222,3 +234,479 @@ class TopFollowedProfilesTestCase(TestCase):
         print(f"Expected: {expected_count}, Actual: {actual_count}")
 
         self.assertEqual(actual_count, expected_count)
+
+
+class FollowersCountTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.users = [
+            User.objects.create_user(email=f"fan{i}@example.com", username=f"fan{i}", password="password123")
+            for i in range(4)
+        ]
+
+    def follow(self, follower, target):
+        self.client.force_authenticate(user=follower)
+        return self.client.post(f"/api/profiles/{target.profile.id}/follow/")
+
+    def test_counter_follows_follow_unfollow_and_requests(self):
+        star = self.users[0]
+        self.follow(self.users[1], star)
+        self.follow(self.users[2], star)
+        star.profile.refresh_from_db()
+        self.assertEqual(star.profile.followers_count, 2)
+
+        self.follow(self.users[1], star)
+        star.profile.refresh_from_db()
+        self.assertEqual(star.profile.followers_count, 1)
+
+        self.client.force_authenticate(user=self.users[3])
+        self.client.post(f"/api/profiles/follow-requests/send/{star.profile.id}/")
+        follow_request = star.profile.received_follow_requests.get()
+        self.client.force_authenticate(user=star)
+        self.client.post(f"/api/profiles/follow-requests/manage/{follow_request.id}/", {"action": "accept"})
+        star.profile.refresh_from_db()
+        self.assertEqual(star.profile.followers_count, 2)
+
+        self.client.force_authenticate(user=self.users[3])
+        self.client.delete(f"/api/profiles/unfollow/{star.profile.id}/")
+        star.profile.refresh_from_db()
+        self.assertEqual(star.profile.followers_count, 1)
+
+    def test_leaderboard_order(self):
+        for follower in self.users[1:]:
+            self.follow(follower, self.users[0])
+        self.follow(self.users[2], self.users[1])
+
+        response = self.client.get("/api/profiles/top-followed/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item["owner"], item["followers_count"]) for item in response.data[:2]],
+            [("fan0", 3), ("fan1", 1)],
+        )
+        self.assertEqual(response.data[0]["following_count"], 0)
+        self.assertEqual(response.data[1]["following_count"], 1)
+
+
+# Test Activity Feed
+
+class ActivityFeedTestCase(TestCase):
+    def setUp(self):
+        from posts.models import Post
+        self.user = User.objects.create_user(username="active", email="active@example.com", password="password123")
+        self.other = User.objects.create_user(username="other", email="other@example.com", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(author=self.other, title="Other Post", category="general", description="Cats")
+
+    def get_feed(self, url="/api/profiles/activity/"):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_entries_written_on_create_and_removed_on_delete(self):
+        from posts.models import Post
+        from comments.models import Comment
+        from likes.models import Like
+
+        own_post = Post.objects.create(author=self.user, title="Mine", category="general", description="Dogs")
+        comment = Comment.objects.create(owner=self.user, post=self.post, content="Nice cat")
+        Like.objects.create(owner=self.user, post=self.post)
+
+        results = self.get_feed()["results"]
+        self.assertEqual([entry["type"] for entry in results], ["like", "comment", "post"])
+        self.assertEqual(results[1]["data"]["comment_id"], comment.id)
+        self.assertEqual(results[2]["data"]["post_id"], own_post.id)
+
+        self.post.delete()
+        results = self.get_feed()["results"]
+        self.assertEqual([entry["type"] for entry in results], ["post"])
+
+    def test_follow_request_accepted(self):
+        request = self.user.profile.sent_follow_requests.create(receiver=self.other.profile)
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual([entry["type"] for entry in self.get_feed()["results"]], ["post"])
+
+        request.status = "accepted"
+        request.save()
+        results = self.get_feed()["results"]
+        self.assertEqual(results[0]["type"], "follow_accepted")
+        self.assertEqual(results[0]["data"]["username"], "active")
+
+        self.client.force_authenticate(user=self.user)
+        results = self.get_feed()["results"]
+        self.assertEqual(results[0]["type"], "follow")
+        self.assertEqual(results[0]["data"]["username"], "other")
+
+    def test_keyset_pagination_constant_queries(self):
+        from likes.models import Like
+        from posts.models import Post
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        posts = Post.objects.bulk_create([
+            Post(author=self.other, title=f"Post {i}", category="general", description="Cats")
+            for i in range(25)
+        ])
+        for post in posts:
+            Like.objects.create(owner=self.user, post=post)
+
+        with CaptureQueriesContext(connection) as first_queries:
+            first = self.get_feed()
+        self.assertEqual(len(first["results"]), 20)
+        self.assertIsNotNone(first["next"])
+
+        with CaptureQueriesContext(connection) as second_queries:
+            second = self.get_feed(first["next"])
+        self.assertEqual(len(second["results"]), 5)
+        self.assertIsNone(second["next"])
+        self.assertEqual(len(first_queries), len(second_queries))
+
+        post_ids = [entry["data"]["post_id"] for entry in first["results"] + second["results"]]
+        self.assertEqual(len(set(post_ids)), 25)
+
+    def test_display_follows_edits(self):
+        from django.test import override_settings
+        from likes.models import Like
+
+        Like.objects.create(owner=self.user, post=self.post)
+        self.user.profile.sent_follow_requests.create(receiver=self.other.profile)
+        self.post.title = "Renamed Post"
+        self.post.save()
+        User.objects.filter(pk=self.other.pk).update(username="renamed")
+
+        for mode in ("timeline", "merge"):
+            with override_settings(ACTIVITY_FEED_MODE=mode):
+                follow, like = self.get_feed()["results"]
+            self.assertEqual(like["data"]["title"], "Renamed Post")
+            self.assertEqual(follow["data"]["username"], "renamed")
+            self.assertEqual(follow["message"], "You sent a follow request to renamed")
+
+    def test_image_url_keeps_absolute_urls(self):
+        from profiles.activity import PLACEHOLDER, image_url
+
+        self.assertEqual(image_url(PLACEHOLDER), PLACEHOLDER)
+        self.assertEqual(image_url("", PLACEHOLDER), PLACEHOLDER)
+        url = image_url("Placeholder/cat")
+        self.assertTrue(url.startswith("http"))
+        self.assertIn("Placeholder/cat", url)
+
+    def test_merge_mode_matches_timeline(self):
+        from django.test import override_settings
+        from comments.models import Comment
+        from likes.models import Like
+        from posts.models import Post
+
+        for i in range(8):
+            post = Post.objects.create(author=self.user, title=f"Mine {i}", category="general", description="Dogs")
+            Comment.objects.create(owner=self.user, post=post, content=f"Comment {i}")
+            Like.objects.create(owner=self.user, post=self.post if i == 0 else post)
+        self.user.profile.sent_follow_requests.create(receiver=self.other.profile)
+
+        def collect():
+            entries, url = [], "/api/profiles/activity/"
+            while url:
+                page = self.get_feed(url)
+                entries += [(entry["type"], entry["data"]) for entry in page["results"]]
+                url = page["next"]
+            return entries
+
+        timeline = collect()
+        with override_settings(ACTIVITY_FEED_MODE="merge"):
+            merged = collect()
+        self.assertEqual(len(merged), 25)
+        self.assertEqual(merged, timeline)
+
+
+# Test Profile KPIs
+
+class ProfileKPITestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from posts.models import Post, SittingRequest
+        from comments.models import Comment
+        from likes.models import CommentLike, Like
+
+        cache.clear()
+        self.user = User.objects.create_user(username="owner", email="owner@example.com", password="password123")
+        self.other = User.objects.create_user(username="fan", email="fan@example.com", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.post = Post.objects.create(author=self.user, title="Mine", category="general", description="Cats")
+        Post.objects.create(author=self.user, title="Mine too", category="general", description="Dogs")
+        self.user.profile.followers.add(self.other.profile)
+        self.comment = comment = Comment.objects.create(owner=self.other, post=self.post, content="Cute")
+        Comment.objects.create(owner=self.user, post=self.post, content="Thanks")
+        Like.objects.create(owner=self.other, post=self.post)
+        CommentLike.objects.create(owner=self.user, comment=comment)
+        SittingRequest.objects.create(sender=self.other, receiver=self.user, post=self.post)
+
+    def get_kpis(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/profiles/kpis/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data, len(queries)
+
+    def test_kpis_in_one_query_then_cached(self):
+        data, queries = self.get_kpis()
+        self.assertEqual(data, {
+            "total_posts": 2,
+            "followers": 1,
+            "following": 0,
+            "comments": 1,
+            "likes": 2,
+            "likes_on_posts": 1,
+            "likes_on_comments": 1,
+            "requests_in": 1,
+            "requests_out": 0,
+        })
+        self.assertEqual(queries, 1)
+
+        cached, queries = self.get_kpis()
+        self.assertEqual(cached, data)
+        self.assertEqual(queries, 0)
+
+    def test_snapshot_invalidated_on_change(self):
+        from likes.models import Like
+
+        self.get_kpis()
+        like = Like.objects.create(owner=self.user, post=self.post)
+        data, _ = self.get_kpis()
+        self.assertEqual(data["likes_on_posts"], 2)
+
+        like.delete()
+        self.user.profile.followers.remove(self.other.profile)
+        data, _ = self.get_kpis()
+        self.assertEqual(data["likes_on_posts"], 1)
+        self.assertEqual(data["followers"], 0)
+
+    def test_comment_likes_count_and_invalidate(self):
+        self.get_kpis()
+        fan = APIClient()
+        fan.force_authenticate(user=User.objects.create_user(username="fan2", email="fan2@example.com", password="password123"))
+        url = f"/api/comments/{self.comment.id}/like/"
+
+        self.assertTrue(fan.post(url).data["liked"])
+        data, _ = self.get_kpis()
+        self.assertEqual(data["likes_on_comments"], 2)
+
+        fan.post(url)
+        data, _ = self.get_kpis()
+        self.assertEqual(data["likes_on_comments"], 1)
+
+
+# Test Follower / Following Lists
+
+class FollowListTestCase(TestCase):
+    def setUp(self):
+        self.viewer = User.objects.create_user(username="viewer", email="viewer@example.com", password="password123")
+        self.star = User.objects.create_user(username="star", email="star@example.com", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(username="viewer"))
+
+    def add_fans(self, count, start=0):
+        fans = [
+            User.objects.create_user(username=f"fan{i}", email=f"fan{i}@example.com", password="password123")
+            for i in range(start, start + count)
+        ]
+        self.star.profile.followers.add(*[fan.profile for fan in fans])
+        return fans
+
+    def get_followers(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/api/profiles/{self.star.profile.id}/followers/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["results"], len(queries)
+
+    def test_is_following_flag(self):
+        fans = self.add_fans(3)
+        # The viewer follows fan0 only; fan1 follows the viewer.
+        fans[0].profile.followers.add(self.viewer.profile)
+        self.viewer.profile.followers.add(fans[1].profile)
+
+        results, _ = self.get_followers()
+        flags = {item["owner"]: item["is_following"] for item in results}
+        self.assertEqual(flags, {"fan0": True, "fan1": False, "fan2": False})
+
+        response = self.client.get(f"/api/profiles/{fans[0].profile.id}/")
+        self.assertTrue(response.data["is_following"])
+
+    def test_query_count_does_not_grow_with_page(self):
+        self.add_fans(2)
+        _, few = self.get_followers()
+        self.add_fans(8, start=2)
+        results, many = self.get_followers()
+        self.assertEqual(len(results), 10)
+        self.assertEqual(few, many)
+
+
+# Test Account Deletion
+
+@override_settings(ACCOUNT_DELETION_RUNNER="inline", ACCOUNT_DELETION_BATCH_SIZE=2)
+class AccountDeletionTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="leaving", email="leaving@example.com", password="password123")
+        self.other = User.objects.create_user(username="staying", email="staying@example.com", password="password123")
+        for i in range(5):
+            Post.objects.create(author=self.user, title=f"Post {i}", category="general", description="Cats")
+        Post.objects.create(author=self.other, title="Other", category="general", description="Cats")
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+
+    def test_delete_queues_and_runs_in_batches(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.delete("/api/profiles/delete/")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "pending")
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_active)
+
+        for callback in callbacks:
+            callback()
+
+        status_response = APIClient().get(response.data["status_url"])
+        self.assertEqual(status_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(status_response.data["status"], "done")
+        self.assertEqual(status_response.data["progress"], 100)
+        self.assertEqual(status_response.data["posts_deleted"], 5)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(Post.objects.count(), 1)
+        job = AccountDeletion.objects.get(pk=response.data["id"])
+        self.assertEqual(job.deleted["posts.Post"], 5)
+
+    def test_status_ignores_stale_credentials(self):
+        job = AccountDeletion.objects.create(user_id=self.user.pk)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Bearer not-a-valid-token")
+        response = client.get(reverse("account-deletion-status", kwargs={"pk": job.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["progress"], 0)
+
+    def test_repeated_request_reuses_pending_deletion(self):
+        first = schedule_account_deletion(self.user)
+        second = schedule_account_deletion(self.user)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(AccountDeletion.objects.count(), 1)
+
+    def test_failure_is_recorded_and_retried(self):
+        job = AccountDeletion.objects.create(user_id=self.user.pk)
+        with patch("profiles.account_deletion.delete_account", side_effect=RuntimeError("boom")):
+            run_account_deletion(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.posts_deleted, 5)
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+
+        out = StringIO()
+        call_command("run_account_deletions", retry_failed=True, stdout=out)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertIn("1 account(s) deleted", out.getvalue())
+
+    @override_settings(ACCOUNT_DELETION_RUNNER="job", JOBS_MODE="worker")
+    def test_job_runner(self):
+        deletion = schedule_account_deletion(self.user)
+        job = Job.objects.get()
+        self.assertEqual(job.payload, {"deletion_id": str(deletion.pk)})
+
+        call_command("run_worker", once=True, stdout=StringIO())
+
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.status, "done")
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+
+    def test_command_resumes_only_stale_running_deletions(self):
+        stale = AccountDeletion.objects.create(
+            user_id=self.user.pk, status="running", started_at=timezone.now() - timedelta(hours=1)
+        )
+        recent = AccountDeletion.objects.create(
+            user_id=self.other.pk, status="running", started_at=timezone.now()
+        )
+        call_command("run_account_deletions", stdout=StringIO())
+        stale.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertEqual(stale.status, "done")
+        self.assertEqual(recent.status, "running")
+        self.assertTrue(User.objects.filter(pk=self.other.pk).exists())
+
+
+# Test Background Jobs
+
+@override_settings(JOBS_MODE="worker")
+class ProfileTasksTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="newcomer", email="newcomer@example.com", password="password123")
+        EmailAddress.objects.create(user=self.user, email=self.user.email, primary=True, verified=False)
+
+    def test_confirmation_email_is_sent_by_the_worker(self):
+        queue_confirmation_email(self.user, RequestFactory().post("/api/profiles/auth/registration/"))
+        self.assertEqual(len(mail.outbox), 0)
+
+        call_command("run_worker", once=True, stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("newcomer@example.com", mail.outbox[0].to)
+
+    @override_settings(ALLOWED_HOSTS=["api.catsitting.test"])
+    def test_confirmation_link_points_at_the_request_host(self):
+        request = RequestFactory().post("/api/profiles/auth/registration/", HTTP_HOST="api.catsitting.test", secure=True)
+        queue_confirmation_email(self.user, request)
+        call_command("run_worker", once=True, stdout=StringIO())
+
+        self.assertIn("https://api.catsitting.test/", mail.outbox[0].body)
+        self.assertNotIn("example.com/", mail.outbox[0].body)
+
+    def test_verified_address_gets_no_email(self):
+        EmailAddress.objects.filter(user=self.user).update(verified=True)
+        queue_confirmation_email(self.user, RequestFactory().post("/api/profiles/auth/registration/"))
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOBS_MODE="inline")
+    def test_edit_keeps_the_uploaded_picture(self):
+        from cloudinary import CloudinaryResource
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        upload = SimpleUploadedFile("cat.png", b"not really a png", content_type="image/png")
+        uploaded = CloudinaryResource("cat_abc", format="png", type="upload", resource_type="image")
+        with patch("cloudinary.models.uploader.upload_resource", return_value=uploaded):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.put("/api/profiles/edit/", {"bio": "Cats", "profile_picture": upload})
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(Job.objects.get().status, "done")
+        profile = Profile.objects.get(user=self.user)
+        self.assertEqual(profile.bio, "Cats")
+        self.assertEqual(profile.profile_picture.public_id, "cat_abc")
+        self.assertFalse(PictureUpload.objects.exists())
+
+    def test_profile_picture_waits_outside_the_job(self):
+        upload = SimpleUploadedFile("cat.png", b"not really a png", content_type="image/png")
+        queue_profile_picture(self.user.profile, upload)
+
+        job = Job.objects.get()
+        pending = PictureUpload.objects.get()
+        self.assertEqual(job.name, "profiles.tasks.upload_profile_picture")
+        self.assertEqual(job.payload, {"upload_id": pending.pk})
+        self.assertEqual(pending.name, "cat.png")
+        self.assertEqual(pending.content_type, "image/png")
+        self.assertEqual(bytes(pending.content), b"not really a png")
+
+    @override_settings(PROFILE_PICTURE_MAX_SIZE=10)
+    def test_oversized_picture_is_refused(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        upload = SimpleUploadedFile("cat.png", b"not really a png", content_type="image/png")
+        response = client.put("/api/profiles/edit/", {"bio": "Cats", "profile_picture": upload})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("profile_picture", response.data)
+        self.assertFalse(Job.objects.exists())
+        self.assertFalse(PictureUpload.objects.exists())
\ No newline at end of file
@@ -16,6 +16,7 @@ from .views import (
     TopFollowedProfilesView,
     ProfileKPIView,
     DeleteProfileView,
+    AccountDeletionStatusView,
 )
 from .views_follow_requests import (
     FollowRequestListView,
@@ -39,6 +40,7 @@ urlpatterns = [
     path('top-followed/', TopFollowedProfilesView.as_view(), name='top-followed-profiles'),
     path('password-change/', CustomPasswordChangeView.as_view(), name='password_change'),
     path("delete/", DeleteProfileView.as_view(), name="delete-profile"),
+    path("delete/<uuid:pk>/", AccountDeletionStatusView.as_view(), name="account-deletion-status"),
 
     # Follow Request Endpoints
     path("follow-requests/", FollowRequestListView.as_view(), name="follow-requests-list"),
@@ -14,10 +14,10 @@ from django.middleware.csrf import get_token
 from django.contrib.auth.views import PasswordChangeView
 from django.contrib.auth import authenticate, logout
 from django.contrib import messages
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.views import View
 from django.shortcuts import redirect, get_object_or_404
-from django.db.models import Count, F, Q
+from django.db.models import F, OuterRef, Q
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 
@@ -26,13 +26,16 @@ from dj_rest_auth.views import LoginView, LogoutView, PasswordResetView
 from dj_rest_auth.registration.views import ResendEmailVerificationView
 from allauth.account.views import ConfirmEmailView
 from allauth.account.models import EmailAddress
-from allauth.account.utils import send_email_confirmation
 
-from likes.models import Like, CommentLike
-from posts.models import Post, SittingRequest
-from comments.models import Comment
-from .models import Profile
-from .serializers import ProfileSerializer, RegisterSerializer
+from catsitting.counters import count_rows
+from notifications.service import notify
+from posts.models import Post
+from .account_deletion import schedule_account_deletion
+from .counters import Follow, add_follower, remove_follower
+from .kpis import get_kpis
+from .models import AccountDeletion, Profile
+from .serializers import AccountDeletionSerializer, ProfileSerializer, RegisterSerializer
+from .tasks import queue_confirmation_email
 from .permissions import IsOwnerOrReadOnly
 
 import logging
@@ -66,7 +69,7 @@ class RegisterView(CreateAPIView):
 
         if serializer.is_valid():
             user = serializer.save()
-            send_email_confirmation(request, user)
+            queue_confirmation_email(user, request)
 
             refresh = RefreshToken.for_user(user)
 
@@ -130,6 +133,18 @@ class CustomLoginView(LoginView):
         return response
 
 
+def with_profile_counts(queryset):
+    """
+    Annotate the post and following counts ProfileSerializer shows as
+    correlated subqueries, which avoids the row multiplication of
+    joining both relations and counting DISTINCT.
+    """
+    return queryset.select_related("user").annotate(
+        total_posts=count_rows(Post.objects.filter(author_id=OuterRef("user_id"))),
+        following_count=count_rows(Follow.objects.filter(to_profile_id=OuterRef("pk"))),
+    )
+
+
 class CurrentUserProfileView(APIView):
     """
     Endpoint to retrieve the profile of the currently authenticated user.
@@ -146,14 +161,12 @@ class UserProfileView(RetrieveAPIView):
     """
     Endpoint to retrieve the profile of a specific user by ID.
     """
-    queryset = Profile.objects.annotate(
-        total_posts=Count('user__user_posts', distinct=True),
-        followers_count=Count('followers', distinct=True),
-        following_count=Count('following', distinct=True)
-    )
     serializer_class = ProfileSerializer
     permission_classes = [IsOwnerOrReadOnly]
 
+    def get_queryset(self):
+        return with_profile_counts(Profile.objects.all())
+
     def get_serializer_context(self):
         """Ensure the request is passed for is_following calculation."""
         context = super().get_serializer_context()
@@ -195,12 +208,28 @@ class EditProfileView(RetrieveUpdateAPIView):
 
 
 class DeleteProfileView(APIView):
+    """
+    Deactivate the account and queue its deletion. The response links to
+    the status of the deletion, which the client polls until it is done.
+    """
     permission_classes = [IsAuthenticated]
 
     def delete(self, request):
-        user = request.user
-        user.delete()
-        return Response({"message": "User and profile deleted."}, status=status.HTTP_204_NO_CONTENT)
+        job = schedule_account_deletion(request.user)
+        data = AccountDeletionSerializer(job).data
+        data["status_url"] = reverse("account-deletion-status", kwargs={"pk": job.pk})
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+class AccountDeletionStatusView(RetrieveAPIView):
+    """
+    Progress of an account deletion. The account is already deactivated,
+    so the unguessable id is the only credential.
+    """
+    queryset = AccountDeletion.objects.all()
+    serializer_class = AccountDeletionSerializer
+    authentication_classes = []
+    permission_classes = [AllowAny]
 
 
 class CustomPasswordChangeView(PasswordChangeView):
@@ -267,15 +296,14 @@ class FollowUserView(APIView):
 
         user_profile = request.user.profile
 
-        if user_profile in target_profile.followers.all():
-            target_profile.followers.remove(user_profile)
+        if remove_follower(target_profile, user_profile):
             message = "Unfollowed successfully."
         else:
-            target_profile.followers.add(user_profile)
+            add_follower(target_profile, user_profile)
             message = "Followed successfully."
 
             if target_profile.user != request.user:
-                Notification.objects.create(
+                notify(
                     user=target_profile.user,
                     type="follow",
                     message=f"{request.user.username} started following you."
@@ -293,11 +321,7 @@ class FollowersListView(ListAPIView):
 
     def get_queryset(self):
         profile_id = self.kwargs.get("pk")
-        return Profile.objects.filter(following__id=profile_id).annotate(
-            total_posts=Count("user__user_posts", distinct=True),
-            followers_count=Count("followers", distinct=True),
-            following_count=Count("following", distinct=True)
-        )
+        return with_profile_counts(Profile.objects.filter(following__id=profile_id))
 
 
 class FollowingListView(ListAPIView):
@@ -309,11 +333,7 @@ class FollowingListView(ListAPIView):
 
     def get_queryset(self):
         profile_id = self.kwargs.get("pk")
-        return Profile.objects.filter(followers__id=profile_id).annotate(
-            total_posts=Count("user__user_posts", distinct=True),
-            followers_count=Count("followers", distinct=True),
-            following_count=Count("following", distinct=True)
-        )
+        return with_profile_counts(Profile.objects.filter(followers__id=profile_id))
 
 
 class TopFollowedProfilesView(ListAPIView):
@@ -325,45 +345,24 @@ class TopFollowedProfilesView(ListAPIView):
     pagination_class = None
 
     def get_queryset(self):
-        return Profile.objects.annotate(
-            total_posts=Count("user__user_posts", distinct=True),
-            followers_count=Count("followers", distinct=True),
-            following_count=Count("following", distinct=True)
-        ).order_by("-followers_count")[:5]
+        # Top 5 straight from the followers_count index; the remaining
+        # counts are subqueries evaluated for those 5 rows only.
+        return with_profile_counts(Profile.objects.order_by("-followers_count", "id"))[:5]
 
 
 class ProfileKPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-
-        total_posts = Post.objects.filter(author=user).count()
-        total_followers = user.profile.followers.count()
-        total_following = user.profile.following.count()
-
-        in_requests = SittingRequest.objects.filter(receiver=user).count()
-        out_requests = SittingRequest.objects.filter(sender=user).count()
-
-        valid_comments = Comment.objects.filter(
-            post__author=user
-        ).exclude(owner=user)
-
-        post_likes = Like.objects.filter(post__author=user).count()
-        comment_ids = Comment.objects.filter(post__author=user).exclude(owner=user).values_list("id", flat=True)
-        comment_likes = CommentLike.objects.filter(comment__in=comment_ids).count()
-        total_likes = post_likes + comment_likes
-
-        total_comments = valid_comments.count()
-
+        kpis = get_kpis(request.user)
         return Response({
-            "total_posts": total_posts,
-            "followers": total_followers,
-            "following": total_following,
-            "comments": total_comments,
-            "likes": total_likes,
-            "likes_on_posts": post_likes,
-            "likes_on_comments": comment_likes,
-            "requests_in": in_requests,
-            "requests_out": out_requests,
+            "total_posts": kpis["total_posts"],
+            "followers": kpis["followers"],
+            "following": kpis["following"],
+            "comments": kpis["comments"],
+            "likes": kpis["likes_on_posts"] + kpis["likes_on_comments"],
+            "likes_on_posts": kpis["likes_on_posts"],
+            "likes_on_comments": kpis["likes_on_comments"],
+            "requests_in": kpis["requests_in"],
+            "requests_out": kpis["requests_out"],
         })
@@ -3,8 +3,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from .counters import add_follower, remove_follower
 from .models import Profile, FollowRequest
-from notifications.models import Notification
+from notifications.service import notify
 
 
 class FollowRequestCreateView(APIView):
@@ -41,7 +42,7 @@ class FollowRequestCreateView(APIView):
             )
             print("✅ FollowRequest created with ID:", follow_request.id)
 
-        Notification.objects.create(
+        notify(
             user=target_profile.user,
             type="follow",
             message=f"{request.user.username} sent you a follow request.",
@@ -59,10 +60,7 @@ class FollowRequestRespondView(APIView):
         follow_request = get_object_or_404(FollowRequest, id=request_id, receiver=request.user.profile)
 
         if action == "accept":
-            sender = follow_request.sender
-            receiver = follow_request.receiver
-
-            sender.following.add(receiver)
+            add_follower(follow_request.receiver, follow_request.sender)
 
             follow_request.status = "accepted"
             follow_request.save()
@@ -118,7 +116,7 @@ class UnfollowView(APIView):
 
     def delete(self, request, target_id):
         profile = get_object_or_404(Profile, pk=target_id)
-        request.user.profile.following.remove(profile)
+        remove_follower(profile, request.user.profile)
         
         FollowRequest.objects.filter(
             sender=request.user.profile,